@@ -0,0 +1,152 @@
+# ai_batch.py
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_client import AIRequestError
+from ai_handler import parse_commands
+
+# Number of AI requests translated at the same time
+BATCH_CONCURRENCY = int(os.getenv('FINANCE_AI_CONCURRENCY', '4'))
+
+# Maximum rate of AI requests, across all concurrent ones
+REQUESTS_PER_MINUTE = int(os.getenv('FINANCE_AI_REQUESTS_PER_MINUTE', '120'))
+
+# Number of non-empty lines sent to the AI together in batch mode
+BATCH_GROUP_LINES = 5
+
+# Retries of a request that was rate limited or hit a server or connection error
+MAX_RETRIES = 4
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+
+def split_into_groups(text, lines_per_group=BATCH_GROUP_LINES, standalone=None):
+    """
+    Splits pasted text into groups of consecutive non-empty lines, translated by one request each.
+
+    Parameters:
+        text (str): The pasted text, one entry per line.
+        lines_per_group (int): Maximum number of lines per group.
+        standalone (function): Lines for which it returns True get a group of their own,
+            e.g. the ones that can be translated without the AI.
+
+    Returns:
+        list of str: The groups, in their original order.
+    """
+    groups = []
+    run = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if standalone is not None and standalone(line):
+            groups.extend("\n".join(run[i:i + lines_per_group]) for i in range(0, len(run), lines_per_group))
+            groups.append(line)
+            run = []
+        else:
+            run.append(line)
+    groups.extend("\n".join(run[i:i + lines_per_group]) for i in range(0, len(run), lines_per_group))
+    return groups
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting how often requests are started.
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        Parameters:
+            rate (float): Tokens added per second.
+            capacity (int): Maximum number of tokens, the size of a burst.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes a token, waiting until one is available.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def is_retryable(error):
+    """
+    Returns:
+        bool: True if the request that raised the error may succeed when retried (429, 5xx or connection errors).
+    """
+    return isinstance(error, AIRequestError) and error.retryable
+
+def retry_delay(error, attempt):
+    """
+    Returns the delay before retrying, honouring a Retry-After header if the server sent one.
+
+    Parameters:
+        error (Exception): The error of the failed attempt.
+        attempt (int): The number of the failed attempt, starting at 0.
+
+    Returns:
+        float: Seconds to wait.
+    """
+    try:
+        return min(float(getattr(error, 'retry_after', None)), RETRY_MAX_DELAY)
+    except (TypeError, ValueError):
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(RETRY_BASE_DELAY * 2 ** attempt, RETRY_MAX_DELAY))
+
+def request_with_retry(messages, bucket=None, request=parse_commands):
+    """
+    Translates one prompt, retrying with backoff on rate limits and transient errors.
+
+    Parameters:
+        messages (list of dict): The chat messages, see ai_handler.build_messages.
+        bucket (TokenBucket): Rate limit shared with the other requests, if any.
+        request (function): Performs the request, raising on failure.
+
+    Returns:
+        List[Command] or None: The parsed commands, or None if the request kept failing.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            return request(messages)
+        except Exception as e:
+            if attempt == MAX_RETRIES or not is_retryable(e):
+                print(f"Error in AI handler: {e}")
+                return None
+            time.sleep(retry_delay(e, attempt))
+
+def translate_concurrently(messages_list, concurrency=BATCH_CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE,
+                           request=parse_commands):
+    """
+    Translates several prompts concurrently, with bounded parallelism and a shared rate limit.
+
+    Parameters:
+        messages_list (list of list of dict): The chat messages of every prompt.
+        concurrency (int): Maximum number of requests in flight.
+        requests_per_minute (int): Maximum rate at which requests are started.
+        request (function): Performs a single request, raising on failure.
+
+    Returns:
+        list: The commands of every prompt, or None for the ones that failed, in the order of messages_list.
+    """
+    if not messages_list:
+        return []
+    bucket = TokenBucket(requests_per_minute / 60, max(1, concurrency))
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(messages_list)))) as executor:
+        # map yields in submission order, whatever order the requests finish in
+        return list(executor.map(lambda messages: request_with_retry(messages, bucket, request), messages_list))
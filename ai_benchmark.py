@@ -0,0 +1,127 @@
+# ai_benchmark.py
+
+import argparse
+import csv
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import ai_context
+import categories_manager
+import executor
+import file_manager
+from ai_client import FakeClient, get_client, set_client
+from ai_handler import build_messages
+from headless_ui import HeadlessUI
+from models import CommandSequence
+
+STAGES = ['build', 'request', 'parse', 'execute', 'refresh', 'total']
+
+def write_ledger(size, seed=0):
+    """
+    Writes a synthetic transactions file of the given size in the current directory.
+    """
+    rng = random.Random(seed)
+    categories = categories_manager.DEFAULT_CATEGORIES
+    with open(file_manager.TRANSACTIONS_FILE, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(file_manager.FIELDNAMES)
+        for index in range(size):
+            amount = rng.randint(-50000, 50000) / 100
+            date = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2020, 2026)}"
+            writer.writerow([f"{amount:.2f}", f"Purchase number {index}", date, rng.choice(categories), index])
+
+def scripted_reply(user_input):
+    """
+    Fake AI reply: a single expense described by the prompt.
+    """
+    return [{'command': 'add', 'amount': -12.34, 'description': user_input[:40], 'date': '17/10/2026',
+             'category': 'Miscellaneous'}]
+
+def run_size(size, runs, latency):
+    """
+    Measures the AI command path on a ledger of the given size.
+
+    Returns:
+        dict: Stage name to the list of durations in seconds.
+    """
+    write_ledger(size)
+    categories_manager.reset_to_default_categories()
+    client = FakeClient(default=scripted_reply, latency=latency, seed=0)
+    set_client(client)
+    app = HeadlessUI()
+
+    # Warm the caches a running application would already have
+    file_manager.get_store().load()
+    executor.refresh_ui(app)
+    ai_context.load_index()
+
+    refresh_times = []
+    original_refresh = executor.refresh_ui
+
+    def timed_refresh(app):
+        start = time.perf_counter()
+        original_refresh(app)
+        refresh_times.append(time.perf_counter() - start)
+
+    executor.refresh_ui = timed_refresh
+    timings = {stage: [] for stage in STAGES}
+    try:
+        for run in range(runs):
+            prompt = f"Bought replacement part {run} for the broken dishwasher"
+            start = time.perf_counter()
+
+            messages = build_messages(prompt)
+            built = time.perf_counter()
+
+            parsed, _ = get_client().complete(messages, CommandSequence)
+            requested = time.perf_counter()
+
+            # What the SDK does with the raw reply, measured on its own
+            CommandSequence.model_validate_json(parsed.model_dump_json())
+            parse_time = time.perf_counter() - requested
+
+            refresh_times.clear()
+            executed = time.perf_counter()
+            executor.execute_commands(parsed.commands, app)
+            end = time.perf_counter()
+
+            refresh_time = sum(refresh_times)
+            timings['build'].append(built - start)
+            timings['request'].append(requested - built)
+            timings['parse'].append(parse_time)
+            timings['execute'].append(end - executed - refresh_time)
+            timings['refresh'].append(refresh_time)
+            timings['total'].append(end - start + parse_time)
+    finally:
+        executor.refresh_ui = original_refresh
+        set_client(None)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measures the latency of the AI command path against a fake AI client, at several ledger sizes."
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000],
+                        help="ledger sizes to measure (default: 100 1000 10000 100000)")
+    parser.add_argument('--runs', type=int, default=20, help="commands per ledger size (default: 20)")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="simulated request latency in seconds (default: 0)")
+    args = parser.parse_args()
+
+    print(f"Median milliseconds per command over {args.runs} runs, fake request latency {args.latency * 1000:.0f} ms")
+    print(f"{'rows':>10}" + "".join(f"{stage:>10}" for stage in STAGES))
+    start_dir = os.getcwd()
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                timings = run_size(size, args.runs, args.latency)
+            finally:
+                os.chdir(start_dir)
+        print(f"{size:>10}" + "".join(f"{statistics.median(timings[stage]) * 1000:>10.2f}" for stage in STAGES))
+
+if __name__ == "__main__":
+    main()
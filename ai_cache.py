@@ -0,0 +1,162 @@
+# ai_cache.py
+
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+
+# File the AI response cache is persisted to
+CACHE_FILE = 'ai_cache.json'
+
+# Maximum number of cached responses, the least recently used are evicted first
+CACHE_SIZE = int(os.getenv('FINANCE_AI_CACHE_SIZE', '256'))
+
+# Seconds a cached response stays valid
+CACHE_TTL = int(os.getenv('FINANCE_AI_CACHE_TTL', str(7 * 24 * 3600)))
+
+def normalize_input(user_input):
+    """
+    Normalizes a prompt so that trivially different spellings share a cache entry.
+
+    Case, whitespace, currency signs, thousands separators, zero cents and
+    trailing punctuation are ignored.
+
+    Parameters:
+        user_input (str): The natural language command entered by the user.
+
+    Returns:
+        str: The normalized prompt.
+    """
+    text = user_input.lower().replace('$', ' ')
+    text = re.sub(r'(?<=\d),(?=\d{3}\b)', '', text)
+    text = re.sub(r'(?<=\d)\.0+\b', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip(' .!?')
+
+def make_key(user_input, context):
+    """
+    Builds the cache key of a prompt.
+
+    Parameters:
+        user_input (str): The natural language command entered by the user.
+        context (list of str): Everything besides the prompt the translation depends on.
+
+    Returns:
+        str: The cache key.
+    """
+    digest = hashlib.sha256()
+    for part in [normalize_input(user_input), *context]:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+class ResponseCache:
+    """
+    Least recently used cache of AI responses with a time to live, persisted as JSON.
+
+    Attributes:
+        path (str): The file the cache is persisted to.
+        hits (int): Number of lookups answered from the cache.
+        misses (int): Number of lookups that weren't.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=CACHE_SIZE, ttl=CACHE_TTL):
+        """
+        Parameters:
+            path (str): The file the cache is persisted to.
+            max_entries (int): Maximum number of cached responses.
+            ttl (int): Seconds a cached response stays valid.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = None  # key -> (time stored, value), least recently used first
+
+    def _load(self):
+        """
+        Reads the cache file on first use. A missing or unreadable file gives an empty cache.
+        """
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        try:
+            with open(self.path, mode='r', encoding='utf-8') as file:
+                data = json.load(file)
+            for key, stored, value in data['entries']:
+                self._entries[key] = (stored, value)
+            self.hits = data.get('hits', 0)
+            self.misses = data.get('misses', 0)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error reading AI cache: {e}")
+
+    def save(self):
+        """
+        Writes the cache file, atomically replacing the old one.
+        """
+        if self._entries is None:
+            return
+        data = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': [[key, stored, value] for key, (stored, value) in self._entries.items()],
+        }
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, mode='w', encoding='utf-8') as file:
+                json.dump(data, file)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Error saving AI cache: {e}")
+
+    def get(self, *keys):
+        """
+        Looks up a response under the first of the keys that has one, counting a single hit or miss.
+
+        Parameters:
+            keys (str): The cache keys to try, see make_key.
+
+        Returns:
+            The cached value, or None if there is none or it expired.
+        """
+        self._load()
+        now = time.time()
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            if now - entry[0] > self.ttl:
+                del self._entries[key]
+                continue
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """
+        Stores a response, evicting the least recently used ones beyond the size limit, and saves the cache.
+
+        Parameters:
+            key (str): The cache key, see make_key.
+            value: The JSON-serializable response.
+        """
+        self._load()
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self.save()
+
+    def clear(self):
+        """
+        Drops every cached response.
+        """
+        self._entries = OrderedDict()
+        self.save()
@@ -0,0 +1,207 @@
+# ai_client.py
+
+import json
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+# AI client used by get_client(), either 'openai' or 'fake'
+AI_CLIENT = os.getenv('FINANCE_AI_CLIENT', 'openai').lower()
+
+# Model used by the OpenAI client
+OPENAI_MODEL = 'gpt-4o-mini'
+
+class AIRequestError(Exception):
+    """
+    A failed AI request, independent of the client that made it.
+
+    Attributes:
+        status_code (int or None): The HTTP status of the response, None if there was no response.
+        retry_after (str or None): The Retry-After header of the response, if any.
+        retryable (bool): True if the request may succeed when retried (429, 5xx or no response).
+    """
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.retryable = status_code is None or status_code == 429 or status_code >= 500
+
+class OpenAIClient:
+    """
+    Client for the OpenAI API.
+    """
+
+    def __init__(self, api_key=None, model=OPENAI_MODEL):
+        """
+        Parameters:
+            api_key (str): The API key, defaults to the OPENAI_API_KEY environment variable or .env file.
+            model (str): The model to use.
+
+        Raises:
+            ValueError: If no API key is configured.
+        """
+        import openai
+        from dotenv import load_dotenv
+
+        # Load environment variables
+        load_dotenv()
+
+        api_key = api_key or os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
+        openai.api_key = api_key
+        self._openai = openai
+        self.model = model
+
+    def complete(self, messages, response_format):
+        """
+        Sends chat messages and parses the reply into a structured response.
+
+        Parameters:
+            messages (list of dict): The chat messages.
+            response_format (type): The pydantic model of the response.
+
+        Returns:
+            tuple: (the parsed response_format instance, the usage of the response).
+
+        Raises:
+            AIRequestError: If the request fails.
+        """
+        openai = self._openai
+        try:
+            response = openai.beta.chat.completions.parse(
+                model=self.model,
+                messages=messages,
+                response_format=response_format,
+            )
+        except openai.APIStatusError as e:
+            headers = getattr(e.response, 'headers', None) or {}
+            raise AIRequestError(str(e), e.status_code, headers.get('retry-after')) from e
+        except openai.APIConnectionError as e:
+            raise AIRequestError(str(e)) from e
+        return response.choices[0].message.parsed, response.usage
+
+class FakeClient:
+    """
+    Offline stand-in for OpenAIClient that returns scripted responses.
+
+    Replies are looked up by the user message (the last chat message). Latency
+    and errors can be injected to exercise the concurrency and retry paths
+    without a network or an API key.
+
+    Attributes:
+        calls (int): Number of requests received, including failed ones.
+    """
+
+    def __init__(self, script=None, default=None, latency=0.0, jitter=0.0, error_rate=0.0, error_status=429,
+                 seed=None):
+        """
+        Parameters:
+            script (dict): User message to the list of command dicts to reply with, or to a function
+                taking the user message and returning that list.
+            default (list or function): Reply for user messages missing from the script, no commands by default.
+            latency (float): Seconds every request takes.
+            jitter (float): Up to this many extra seconds, chosen at random, per request.
+            error_rate (float): Probability that a request fails with error_status.
+            error_status (int): HTTP status of the injected errors.
+            seed (int): Seed of the random latency and errors, for reproducible runs.
+        """
+        self.script = script or {}
+        self.default = default if default is not None else []
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def complete(self, messages, response_format):
+        """
+        Replies like OpenAIClient.complete, from the script.
+
+        Raises:
+            AIRequestError: If an error is injected.
+        """
+        with self._lock:
+            self.calls += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+        time.sleep(delay)
+        if failed:
+            raise AIRequestError(f"Injected error {self.error_status}", self.error_status)
+
+        user_input = messages[-1]['content']
+        reply = self.script.get(user_input.strip(), self.default)
+        if callable(reply):
+            reply = reply(user_input)
+        parsed = response_format.model_validate({'commands': reply})
+
+        prompt_tokens = sum(len(message['content']) for message in messages) // 4
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=len(json.dumps(reply)) // 4,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=0),
+        )
+        return parsed, usage
+
+def fake_client_from_env():
+    """
+    Builds a FakeClient configured by environment variables:
+    FINANCE_AI_FAKE_SCRIPT (a JSON file mapping user messages to lists of command
+    dicts, with "*" for the default reply), FINANCE_AI_FAKE_LATENCY (seconds) and
+    FINANCE_AI_FAKE_ERROR_RATE (0 to 1).
+
+    Returns:
+        FakeClient: The client.
+    """
+    script = {}
+    script_path = os.getenv('FINANCE_AI_FAKE_SCRIPT')
+    if script_path:
+        with open(script_path, mode='r', encoding='utf-8') as file:
+            script = json.load(file)
+    default = script.pop('*', None)
+    return FakeClient(
+        script=script,
+        default=default,
+        latency=float(os.getenv('FINANCE_AI_FAKE_LATENCY', '0')),
+        error_rate=float(os.getenv('FINANCE_AI_FAKE_ERROR_RATE', '0')),
+    )
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Returns the process-wide AI client for the configured AI_CLIENT, creating it on first use.
+
+    Returns:
+        OpenAIClient or FakeClient: The shared client.
+
+    Raises:
+        ValueError: If AI_CLIENT is unknown, or the OpenAI API key is missing.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if AI_CLIENT == 'openai':
+                _client = OpenAIClient()
+            elif AI_CLIENT == 'fake':
+                _client = fake_client_from_env()
+            else:
+                raise ValueError(f"Unknown AI client: {AI_CLIENT}. Expected 'openai' or 'fake'.")
+        return _client
+
+def set_client(client):
+    """
+    Replaces the process-wide AI client, e.g. with a FakeClient in benchmarks.
+
+    Parameters:
+        client (OpenAIClient or FakeClient): The client, or None to create it again from AI_CLIENT on next use.
+    """
+    global _client
+    with _client_lock:
+        _client = client
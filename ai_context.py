@@ -0,0 +1,275 @@
+# ai_context.py
+
+import heapq
+import math
+import operator
+import os
+import re
+from collections import Counter, defaultdict
+
+from ledger_index import IndexCache, LedgerIndex
+from transaction import parse_date, to_cents
+
+# Approximate number of tokens the transaction list of the AI prompt may use
+CONTEXT_TOKEN_BUDGET = int(os.getenv('FINANCE_AI_CONTEXT_TOKENS', '1500'))
+
+# Number of most recent transactions offered to the AI, budget permitting
+RECENT_COUNT = 20
+
+# Maximum number of description keyword matches offered to the AI
+KEYWORD_MATCHES = 25
+
+# BM25 ranking parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+FULL_DATE_PATTERN = re.compile(r'\b(\d{1,2}/\d{1,2}/\d{4})\b')
+DAY_MONTH_PATTERN = re.compile(r'\b(\d{1,2})/(\d{1,2})\b')
+THOUSANDS_PATTERN = re.compile(r'(?<=\d),(?=\d{3}\b)')
+NUMBER_PATTERN = re.compile(r'(?<![\w.])(\d+(?:[.,]\d{1,2})?)(?![\w.])')
+
+TRANSACTION_ID = operator.attrgetter('id')
+
+def estimate_tokens(text):
+    """
+    Roughly estimates the number of tokens of a text, at about four characters per token.
+
+    Parameters:
+        text (str): The text.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return len(text) // 4 + 1
+
+def tokenize(text):
+    """
+    Splits a text into lowercase words for keyword matching.
+
+    Parameters:
+        text (str): The text.
+
+    Returns:
+        list of str: The words.
+    """
+    return WORD_PATTERN.findall(text.lower())
+
+class TransactionIndex(LedgerIndex):
+    """
+    Lookup indexes over the transactions, used to find the ones a request refers to.
+
+    Descriptions and categories are kept in an inverted index ranked with BM25,
+    next to exact indexes by ID, absolute amount in cents, date and day of month.
+    The indexes are kept up to date by difference, see LedgerIndex, and lookups
+    return positions in transactions.
+    """
+
+    def __init__(self, transactions):
+        """
+        Parameters:
+            transactions (list of Transaction): The transactions to index.
+        """
+        self._postings = defaultdict(list)  # word -> [(slot, term frequency)]
+        self._lengths = []
+        self._total_length = 0
+        self._by_id = None
+        self._by_amount = defaultdict(list)
+        self._by_date = defaultdict(list)
+        self._by_day_month = defaultdict(list)
+        self._category_words = {}
+        super().__init__(transactions)
+
+    def _index_slots(self, start):
+        postings = self._postings
+        category_words = self._category_words
+        for slot, txn in enumerate(self._rows[start:], start):
+            code = txn.category_code
+            if code not in category_words:
+                category_words[code] = tokenize(txn.category)
+            words = tokenize(txn.description) + category_words[code]
+            self._lengths.append(len(words))
+            self._total_length += len(words)
+            if len(set(words)) == len(words):
+                for word in words:
+                    postings[word].append((slot, 1))
+            else:
+                for word, frequency in Counter(words).items():
+                    postings[word].append((slot, frequency))
+            self._by_amount[abs(txn.amount_cents)].append(slot)
+            self._by_date[txn.date_value].append(slot)
+            self._by_day_month[txn.date_value % 10000].append(slot)
+
+        if self._by_id is not None:
+            # Appended rows are the last ones, any other change rebuilds the ID index
+            first = len(self.transactions) - (len(self._rows) - start)
+            for position, txn in enumerate(self.transactions[first:], first):
+                self._by_id.setdefault(txn.id, position)
+
+    def _positions_changed(self, removed_slots):
+        # Rows may have been renumbered, the ID index is rebuilt by the next lookup
+        self._by_id = None
+        self._total_length -= sum(map(self._lengths.__getitem__, removed_slots))
+
+    def by_id(self, transaction_id):
+        """
+        Returns:
+            int or None: The position of the transaction with the given ID, or None.
+        """
+        if self._by_id is None:
+            # Built backwards, so the first of duplicate IDs wins
+            count = len(self.transactions)
+            self._by_id = dict(zip(map(TRANSACTION_ID, reversed(self.transactions)), range(count - 1, -1, -1)))
+        return self._by_id.get(transaction_id)
+
+    def by_amount(self, cents):
+        """
+        Returns:
+            list of int: The positions of the transactions of this amount, income or expense.
+        """
+        return self.live_positions(self._by_amount.get(abs(cents), []))
+
+    def by_date(self, date_value):
+        """
+        Returns:
+            list of int: The positions of the transactions on this YYYYMMDD date.
+        """
+        return self.live_positions(self._by_date.get(date_value, []))
+
+    def by_day_month(self, day, month):
+        """
+        Returns:
+            list of int: The positions of the transactions on this day and month of any year.
+        """
+        return self.live_positions(self._by_day_month.get(month * 100 + day, []))
+
+    def search(self, words, limit):
+        """
+        Ranks the transactions against keywords with BM25.
+
+        Parameters:
+            words (list of str): The lowercase keywords.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list of int: The positions of the best matching transactions, best first.
+        """
+        count = len(self.transactions)
+        average_length = self._total_length / count if count else 0
+        positions = self._positions
+        lengths = self._lengths
+        scores = defaultdict(float)
+        for word in set(words):
+            postings = [(positions[slot], lengths[slot], frequency)
+                        for slot, frequency in self._postings.get(word, []) if positions[slot] >= 0]
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, length, frequency in postings:
+                norm = 1 - BM25_B + BM25_B * length / average_length
+                scores[position] += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+        return heapq.nlargest(limit, scores, key=lambda position: (scores[position], position))
+
+# Index of the stored transactions
+_index_cache = IndexCache(TransactionIndex)
+
+def load_index():
+    """
+    Returns the index of the stored transactions, updating it only after the transactions changed.
+
+    Returns:
+        TransactionIndex: The index.
+    """
+    return _index_cache.load()
+
+def referenced_positions(user_input, index):
+    """
+    Finds the transactions a request mentions by ID, amount or date.
+
+    Every number is tried both as an ID and as an amount, since "change 3 to 120"
+    and "the 120 one" can't be told apart without understanding the sentence.
+
+    Parameters:
+        user_input (str): The natural language request.
+        index (TransactionIndex): The index of the transactions.
+
+    Returns:
+        tuple of list of int: Positions matched by ID, and positions matched by amount or date.
+    """
+    by_id = []
+    by_value = []
+
+    for date_str in FULL_DATE_PATTERN.findall(user_input):
+        date_value = parse_date(date_str)
+        if date_value is not None:
+            by_value.extend(index.by_date(date_value))
+    text = FULL_DATE_PATTERN.sub(' ', user_input)
+
+    for day, month in DAY_MONTH_PATTERN.findall(text):
+        by_value.extend(index.by_day_month(int(day), int(month)))
+    text = THOUSANDS_PATTERN.sub('', DAY_MONTH_PATTERN.sub(' ', text))
+
+    for number in NUMBER_PATTERN.findall(text):
+        number = number.replace(',', '.')
+        if '.' not in number:
+            position = index.by_id(int(number))
+            if position is not None:
+                by_id.append(position)
+        by_value.extend(index.by_amount(to_cents(number)))
+
+    return by_id, by_value
+
+def select_transactions(user_input, budget=None):
+    """
+    Selects the transactions worth showing to the AI for a request, within a token budget.
+
+    Candidates are taken in order of relevance: transactions mentioned by ID,
+    then by amount or date (most recent first), then description keyword
+    matches, then the most recent transactions, until the budget is used up.
+
+    Parameters:
+        user_input (str): The natural language request.
+        budget (int): Approximate token budget, defaults to CONTEXT_TOKEN_BUDGET.
+
+    Returns:
+        tuple: (list of Transaction in ledger order, total number of transactions).
+    """
+    budget = budget if budget is not None else CONTEXT_TOKEN_BUDGET
+    index = load_index()
+    transactions = index.transactions
+
+    by_id, by_value = referenced_positions(user_input, index)
+    keyword_matches = index.search(tokenize(user_input), KEYWORD_MATCHES)
+    recent = range(len(transactions) - 1, max(len(transactions) - RECENT_COUNT, 0) - 1, -1)
+
+    selected = set()
+    used = 0
+    for position in [*by_id, *sorted(set(by_value), reverse=True), *keyword_matches, *recent]:
+        if position in selected:
+            continue
+        cost = estimate_tokens(str(transactions[position]))
+        if used + cost > budget:
+            break
+        selected.add(position)
+        used += cost
+
+    return [transactions[position] for position in sorted(selected)], len(transactions)
+
+def build_transaction_context(user_input, budget=None):
+    """
+    Builds the transaction list of the AI prompt for a request.
+
+    Parameters:
+        user_input (str): The natural language request.
+        budget (int): Approximate token budget, defaults to CONTEXT_TOKEN_BUDGET.
+
+    Returns:
+        str: A heading line followed by one transaction per line.
+    """
+    selected, total = select_transactions(user_input, budget)
+    if len(selected) == total:
+        heading = f"All {total} current transactions:"
+    else:
+        heading = (f"{len(selected)} of {total} current transactions, selected as relevant to the request "
+                   f"(transactions not listed still exist):")
+    return "\n".join([heading, *(str(txn) for txn in selected)])
@@ -1,38 +1,13 @@
-import os
-import openai
-import json
+import threading
 import categories_manager
-import file_manager
-from dotenv import load_dotenv
-from pydantic import BaseModel
-from typing import Optional, List
+from ai_cache import ResponseCache, make_key
+from ai_client import get_client
+from ai_context import build_transaction_context
+from models import Command, CommandSequence
 from datetime import date
 
-# Load environment variables
-load_dotenv()
-
-# OpenAI API Configuration
-OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
-if not OPENAI_API_KEY:
-    raise ValueError("OpenAI API key not found. Please set the OPENAI_API_KEY environment variable.")
-openai.api_key = OPENAI_API_KEY
-
-# Define Command Model
-class Command(BaseModel):
-    command: str
-    name: Optional[str] = None
-    amount: Optional[float] = None
-    value: Optional[str] = None
-    description: Optional[str] = None
-    date: Optional[str] = None  # DD/MM/YYYY
-    action: Optional[str] = None
-    category: Optional[str] = None
-    field: Optional[str] = None
-    unique_ids: Optional[list[int]] = None  # Supports multiple IDs
-
-# Define Command Sequence Model
-class CommandSequence(BaseModel):
-    commands: List[Command]
+# Translated prompts, persisted across restarts
+response_cache = ResponseCache()
 
 # AI Prompt Components
 def build_system_prompt():
@@ -74,9 +49,12 @@ def build_system_prompt():
     Notice that the user said they spent 500$ total, and they cost the same, therefore each item cost 500/3 = ~166.66
     """
 
-def build_information_prompt():
+def build_information_prompt(user_input):
     """
-    Builds the dynamic context for the AI, including today's date, available categories, and current transactions.
+    Builds the dynamic context for the AI, including today's date, available categories, and the transactions relevant to the request.
+
+    Parameters:
+        user_input (str): The natural language command entered by the user.
 
     Returns:
         str: The dynamic information prompt.
@@ -87,9 +65,8 @@ def build_information_prompt():
     # Available categories
     categories = categories_manager.read_categories()
     
-    # Current transactions
-    transactions = file_manager.read_transactions()
-    transaction_list = "\n".join(str(t) for t in transactions)
+    # Only the transactions the request plausibly refers to, within the context token budget
+    transaction_list = build_transaction_context(user_input)
 
     return f"""
     Context:
@@ -120,11 +97,13 @@ def build_commands_prompt():
         - Notes: Remember to ONLY use the categories you have been informed are valid. Don't make up any categories on your own.
 
     2. **category**:
-        - Syntax: category <action> <name>
+        - Syntax: category <action> <name> [<new name>]
         - Manages categories.
         - Parameters:
-            - action: One of "add", "remove", or "reset". (put this in the "action" field in the object)
-            - name: The name of the category to add or remove (not required for "reset") (Make sure to place this in the "name" field in the object).
+            - action: One of "add", "remove", "reset", "rename" or "merge". (put this in the "action" field in the object)
+            - name: The name of the category to add, remove, rename or merge away (not required for "reset") (Make sure to place this in the "name" field in the object).
+            - new name: Only for "rename" and "merge", the new name of the category, or the existing category to merge it into. (put this in the "value" field in the object)
+        - Notes: "rename" and "merge" also move every transaction of the category, use them instead of editing the transactions one by one.
 
     3. **remove**:
         - Syntax: remove <ID> [<ID> ...]
@@ -140,42 +119,169 @@ def build_commands_prompt():
             - field: The field to edit ('amount', 'description', 'date', 'category'). (Use the field field)
             - new value: The new value to assign to the field. (Use the value field)
         - Notes: Output date in the format: DD/MM/YYYY.
+
+    5. **report**:
+        - Syntax: report <kind>
+        - Shows a summary report of the transactions.
+        - Parameters:
+            - kind: Either "month" (totals per month) or "category" (totals per category). (put this in the "action" field in the object)
         
         Note on commands: IT IS VERY IMPORTANT THAT ONLY THE PARAMETERS LISTED ARE USED, AND THAT THEY ARE IN THE RIGHT PLACES. DON'T USE ANY FIELDS IN THE JSON OUTPUT THAT YOU HAVE NOT BEEN ASKED TO
 
     """
 
-def translate_natural_language_to_commands(user_input):
+# The instructions and command reference never change, so they are assembled once into
+# a single prefix that comes before any dynamic content and can be cached by the provider
+STATIC_PROMPT = build_system_prompt() + build_commands_prompt()
+
+# Token usage of the AI requests so far, updated from worker threads
+usage_totals = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+_usage_lock = threading.Lock()
+
+def record_usage(usage):
     """
-    Translates natural language input into structured commands.
+    Adds the token usage of a response to usage_totals and logs it.
+
+    Parameters:
+        usage: The usage object of an OpenAI chat completion response, may be None.
+    """
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+    with _usage_lock:
+        usage_totals["requests"] += 1
+        usage_totals["prompt_tokens"] += usage.prompt_tokens
+        usage_totals["cached_tokens"] += cached_tokens
+        usage_totals["completion_tokens"] += usage.completion_tokens
+    print(f"AI usage: {usage.prompt_tokens} prompt tokens ({cached_tokens} cached), "
+          f"{usage.completion_tokens} completion tokens")
+
+def build_cache_keys(user_input):
+    """
+    Builds the response cache keys of a prompt.
+
+    Both keys cover the normalized prompt, today's date and the categories. The
+    second one also covers the transaction list sent to the AI, including the
+    most recent transactions, and is used for translations that act on
+    existing transactions. Those are only reused while the AI would see the
+    same transactions, so "delete my last entry" misses once another entry
+    was added. Like build_messages, this reads the transactions and has to be
+    called from the Tk main thread.
 
     Parameters:
         user_input (str): The natural language command entered by the user.
 
     Returns:
-        List[Command] or None: A list of parsed Command objects, or None if parsing fails.
+        tuple of str: The key without and the key with the referenced transactions.
     """
-    # Build AI prompts
-    system_prompt = build_system_prompt()
-    information_prompt = build_information_prompt()
-    commands_prompt = build_commands_prompt()
+    context = [date.today().strftime("%d/%m/%Y"), "\n".join(categories_manager.read_categories())]
+    return (
+        make_key(user_input, context),
+        make_key(user_input, [*context, build_transaction_context(user_input)]),
+    )
 
-    # Send the prompts to the AI
-    try:
-        response = openai.beta.chat.completions.parse(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "system", "content": information_prompt},
-                {"role": "system", "content": commands_prompt},
-                {"role": "user", "content": user_input},
-            ],
-            response_format=CommandSequence,
-        )
-
-        # Extract and return the parsed CommandSequence
-        return response.choices[0].message.parsed.commands
+def cached_commands(keys):
+    """
+    Looks up a cached translation.
+
+    Parameters:
+        keys (tuple of str): The cache keys, see build_cache_keys.
+
+    Returns:
+        List[Command] or None: The cached commands, or None on a cache miss.
+    """
+    value = response_cache.get(*keys)
+    if value is None:
+        return None
+    return [Command(**fields) for fields in value]
+
+def remember_commands(keys, commands):
+    """
+    Caches a translation.
+
+    Parameters:
+        keys (tuple of str): The cache keys, see build_cache_keys.
+        commands (List[Command]): The commands the prompt was translated into.
+    """
+    uses_transactions = any(command.unique_ids for command in commands)
+    response_cache.put(keys[1] if uses_transactions else keys[0],
+                       [command.model_dump(exclude_none=True) for command in commands])
+
+def build_messages(user_input):
+    """
+    Builds the chat messages sent to the AI for a user input.
+
+    The static prefix comes first and the dynamic context last, right before the
+    user input, so consecutive requests share the longest possible prefix.
+
+    This reads the transactions and categories, so it has to be called from the
+    thread that owns them (the Tk main thread).
+
+    Parameters:
+        user_input (str): The natural language command entered by the user.
+
+    Returns:
+        list of dict: The chat messages.
+    """
+    return [
+        {"role": "system", "content": STATIC_PROMPT},
+        {"role": "system", "content": build_information_prompt(user_input)},
+        {"role": "user", "content": user_input},
+    ]
+
+def parse_commands(messages):
+    """
+    Sends prepared chat messages to the AI and parses the reply into commands.
+
+    This only does network I/O, so it is safe to call from a worker thread.
+
+    Parameters:
+        messages (list of dict): The chat messages, see build_messages.
+
+    Returns:
+        List[Command]: The parsed Command objects.
+
+    Raises:
+        ai_client.AIRequestError: If the request fails.
+        ValueError: If the AI client can't be created, e.g. because the API key is missing.
+    """
+    parsed, usage = get_client().complete(messages, CommandSequence)
+    record_usage(usage)
+
+    # Extract and return the parsed CommandSequence
+    return parsed.commands
+
+def request_commands(messages):
+    """
+    Like parse_commands, but returns None instead of raising if the request fails.
 
+    Parameters:
+        messages (list of dict): The chat messages, see build_messages.
+
+    Returns:
+        List[Command] or None: A list of parsed Command objects, or None if parsing fails.
+    """
+    try:
+        return parse_commands(messages)
     except Exception as e:
         print(f"Error in AI handler: {e}")
         return None
+
+def translate_natural_language_to_commands(user_input):
+    """
+    Translates natural language input into structured commands.
+
+    Parameters:
+        user_input (str): The natural language command entered by the user.
+
+    Returns:
+        List[Command] or None: A list of parsed Command objects, or None if parsing fails.
+    """
+    keys = build_cache_keys(user_input)
+    commands = cached_commands(keys)
+    if commands is None:
+        commands = request_commands(build_messages(user_input))
+        if commands:
+            remember_commands(keys, commands)
+    return commands
@@ -0,0 +1,187 @@
+# ai_worker.py
+
+import queue
+import threading
+from collections import deque
+
+from ai_batch import split_into_groups, translate_concurrently
+from ai_handler import build_cache_keys, build_messages, cached_commands, remember_commands
+from local_interpreter import CONFIDENCE_THRESHOLD, interpret
+
+# How often the Tk main loop checks for a finished AI request, in milliseconds
+POLL_INTERVAL_MS = 50
+
+class AIRequestQueue:
+    """
+    Translates natural language prompts with the AI without blocking the Tk main loop.
+
+    Prompts are handled one at a time, in the order they were submitted. The
+    network call runs on a worker thread and its result is handed back to the
+    main thread by polling with root.after, so the UI keeps responding while
+    a request is in flight. The AI context is built on the main thread right
+    before each request is sent, so it already includes the commands of the
+    prompts before it. Prompts the local interpreter is confident about, or
+    with a cached translation, are answered right away without a worker thread.
+
+    In batch mode a prompt is split into groups of lines that are translated
+    concurrently, and the results are put back in the original order and
+    delivered together, to be executed as one sequence.
+    """
+
+    def __init__(self, root, on_result, on_status=None):
+        """
+        Parameters:
+            root (tk.Tk): The root window, used to schedule polling on the main loop.
+            on_result (function): Called on the main thread with (user_input, commands, failed) once
+                per finished prompt. commands are the commands of all its groups of lines in their
+                original order, and failed the groups that could not be translated.
+            on_status (function): Called on the main thread with (in_flight, queued) whenever
+                the number of pending prompts changes.
+        """
+        self.root = root
+        self.on_result = on_result
+        self.on_status = on_status
+        self._queued = deque()
+        self._results = queue.Queue()
+        self._current = None  # (request number, groups, cache keys, results) of the prompt being translated
+        self._next_number = 0
+        self._polling = False
+
+    @property
+    def pending_count(self):
+        """
+        int: Number of prompts submitted but not finished yet, including the one in flight.
+        """
+        return len(self._queued) + (self._current is not None)
+
+    def submit(self, user_input, batch=False):
+        """
+        Queues a prompt for translation. Must be called from the main thread.
+
+        Parameters:
+            user_input (str): The natural language command entered by the user.
+            batch (bool): If True, the lines of the prompt are translated in concurrent groups.
+        """
+        groups = split_into_groups(user_input, standalone=self._is_local) if batch else [user_input]
+        if not groups:
+            return
+        self._queued.append(groups)
+        if self._current is None:
+            self._start_next()
+        self._report_status()
+
+    def cancel(self):
+        """
+        Drops every queued prompt and ignores the result of the one in flight.
+
+        The request already sent can't be recalled, but its commands are never executed.
+        """
+        self._queued.clear()
+        self._current = None
+        self._report_status()
+
+    @staticmethod
+    def _is_local(line):
+        """
+        Returns:
+            bool: True if the local interpreter is confident about the line.
+        """
+        commands, confidence = interpret(line)
+        return commands is not None and confidence >= CONFIDENCE_THRESHOLD
+
+    def _resolve_locally(self, group):
+        """
+        Translates a group without the network if possible.
+
+        Returns:
+            tuple: (commands or None, cache keys or None, messages or None). Exactly one of
+                commands and messages is set unless building the prompt failed.
+        """
+        commands, confidence = interpret(group)
+        if commands is not None and confidence >= CONFIDENCE_THRESHOLD:
+            return commands, None, None
+        keys = build_cache_keys(group)
+        commands = cached_commands(keys)
+        if commands is not None:
+            return commands, keys, None
+        return None, keys, build_messages(group)
+
+    def _start_next(self):
+        """
+        Sends the next queued prompt to a worker thread, if there is one and nothing is in flight.
+        """
+        while self._current is None and self._queued:
+            groups = self._queued.popleft()
+            results = [None] * len(groups)
+            keys = [None] * len(groups)
+            pending = []  # (group index, messages) of the groups that need the AI
+            for index, group in enumerate(groups):
+                try:
+                    results[index], keys[index], messages = self._resolve_locally(group)
+                except Exception as e:
+                    print(f"Error building AI prompt: {e}")
+                    continue
+                if messages is not None:
+                    pending.append((index, messages))
+
+            if not pending:
+                self._deliver(groups, results)
+                continue
+
+            number = self._next_number
+            self._next_number += 1
+            self._current = (number, groups, keys, results)
+            threading.Thread(target=self._run, args=(number, pending), daemon=True).start()
+            self._schedule_poll()
+
+    def _run(self, number, pending):
+        """
+        Worker thread body: performs the requests and posts the results for the main thread.
+        """
+        translated = translate_concurrently([messages for _, messages in pending])
+        self._results.put((number, [(index, commands) for (index, _), commands in zip(pending, translated)]))
+
+    def _deliver(self, groups, results):
+        """
+        Hands the results of all the groups of a prompt to on_result at once, in the original order.
+        """
+        commands = [command for group_commands in results if group_commands for command in group_commands]
+        failed = [group for group, group_commands in zip(groups, results) if not group_commands]
+        self.on_result("\n".join(groups), commands, failed)
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        """
+        Delivers finished results on the main thread and starts the next prompt.
+        """
+        self._polling = False
+        try:
+            while True:
+                number, translated = self._results.get_nowait()
+                # Results of cancelled requests are dropped
+                if self._current is None or self._current[0] != number:
+                    continue
+                _, groups, keys, results = self._current
+                self._current = None
+                for index, commands in translated:
+                    results[index] = commands
+                    if commands:
+                        remember_commands(keys[index], commands)
+                try:
+                    self._deliver(groups, results)
+                finally:
+                    self._start_next()
+                    self._report_status()
+        except queue.Empty:
+            pass
+
+        if self._current is not None:
+            self._schedule_poll()
+
+    def _report_status(self):
+        if self.on_status is not None:
+            self.on_status(int(self._current is not None), len(self._queued))
@@ -1,4 +1,5 @@
 import os
+import time
 
 # File path for the categories file
 CATEGORIES_FILE = 'categories.txt'
@@ -17,6 +18,177 @@ DEFAULT_CATEGORIES = [
     "Miscellaneous"
 ]
 
+# Seconds between checks of the categories file for changes made outside of the application
+STAT_INTERVAL = 1.0
+
+class CategoryRegistry:
+    """
+    Process-wide in-memory copy of the categories file.
+
+    The file is read once and every lookup is served from memory. Names are
+    matched case-insensitively through a set of lowercase names. The file's
+    modification time and size are checked at most every STAT_INTERVAL seconds,
+    and the file is only re-read when either of them changed. Changes made
+    through the registry rewrite the file and update the cache directly.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): Path to the categories file.
+        """
+        self.path = path
+        self._names = ()
+        self._by_lower = {}
+        self._stamp = None
+        self._checked = None
+
+    def _file_stamp(self):
+        """
+        Returns:
+            tuple or None: The modification time and size of the file, or None if it doesn't exist.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self):
+        """
+        Re-reads the file if it changed since it was last read, checking at most every STAT_INTERVAL seconds.
+        """
+        now = time.monotonic()
+        if self._checked is not None and now - self._checked < STAT_INTERVAL:
+            return
+        self._checked = now
+        stamp = self._file_stamp()
+        if stamp is not None and stamp == self._stamp:
+            return
+
+        names = []
+        if stamp is not None:
+            with open(self.path, mode='r') as file:
+                names = [line.strip() for line in file if line.strip()]
+        self._set(names, stamp)
+
+    def _set(self, names, stamp):
+        """
+        Replaces the cached categories, keeping the first spelling of names that only differ in case.
+        """
+        by_lower = {}
+        for name in names:
+            by_lower.setdefault(name.lower(), name)
+        self._names = tuple(by_lower.values())
+        self._by_lower = by_lower
+        self._stamp = stamp
+
+    def _write(self, names):
+        """
+        Writes the categories to the file through a temporary file, and caches them.
+        """
+        temp_path = self.path + '.tmp'
+        with open(temp_path, mode='w') as file:
+            for name in names:
+                file.write(name + '\n')
+        os.replace(temp_path, self.path)
+        self._set(names, self._file_stamp())
+        self._checked = time.monotonic()
+
+    def names(self):
+        """
+        Returns:
+            tuple of str: The categories, in file order.
+        """
+        self._refresh()
+        return self._names
+
+    def canonical(self, name):
+        """
+        Returns the spelling of a category as registered, ignoring case.
+
+        Parameters:
+            name (str): The category name.
+
+        Returns:
+            str or None: The registered name, or None if there is no such category.
+        """
+        if not name:
+            return None
+        self._refresh()
+        return self._by_lower.get(name.strip().lower())
+
+    def add(self, name):
+        """
+        Adds a category unless it already exists, ignoring case.
+
+        Parameters:
+            name (str): The category to add.
+
+        Returns:
+            bool: True if the category was added.
+        """
+        name = name.strip()
+        if not name or self.canonical(name) is not None:
+            return False
+        self._write(self._names + (name,))
+        return True
+
+    def remove(self, name):
+        """
+        Removes a category, ignoring case.
+
+        Parameters:
+            name (str): The category to remove.
+
+        Returns:
+            bool: True if the category was removed, False if it doesn't exist.
+        """
+        existing = self.canonical(name)
+        if existing is None:
+            return False
+        self._write([category for category in self._names if category != existing])
+        return True
+
+    def rename(self, name, new_name):
+        """
+        Renames a category in place, ignoring case.
+
+        Parameters:
+            name (str): The category to rename.
+            new_name (str): The new name, which may only differ from another category's in case if it is this one.
+
+        Returns:
+            bool: True if the category was renamed, False if it doesn't exist or the new name is taken.
+        """
+        existing = self.canonical(name)
+        new_name = new_name.strip()
+        taken = self.canonical(new_name)
+        if existing is None or not new_name or (taken is not None and taken != existing):
+            return False
+        self._write([new_name if category == existing else category for category in self._names])
+        return True
+
+    def reset(self):
+        """
+        Replaces the categories with DEFAULT_CATEGORIES.
+        """
+        self._write(DEFAULT_CATEGORIES)
+
+_registry = None
+
+def get_registry():
+    """
+    Returns the process-wide category registry, creating it on first use.
+
+    Returns:
+        CategoryRegistry: The shared registry for CATEGORIES_FILE.
+    """
+    global _registry
+    if _registry is None or _registry.path != CATEGORIES_FILE:
+        _registry = CategoryRegistry(CATEGORIES_FILE)
+    return _registry
+
 def initialize_categories_file():
     """
     Ensures the categories file exists and is correctly formatted.
@@ -36,9 +208,7 @@ def reset_to_default_categories():
     """
     Resets the categories file to the default categories.
     """
-    with open(CATEGORIES_FILE, mode='w') as file:
-        for category in DEFAULT_CATEGORIES:
-            file.write(category + '\n')
+    get_registry().reset()
 
 def validate_categories_file():
     """
@@ -66,39 +236,58 @@ def validate_categories_file():
 
 def read_categories():
     """
-    Reads the categories from the file.
+    Returns the categories, from memory unless the file changed.
 
     Returns:
         list: A list of categories.
     """
-    with open(CATEGORIES_FILE, mode='r') as file:
-        return [line.strip() for line in file.readlines()]
+    return list(get_registry().names())
+
+def canonical_category(category):
+    """
+    Looks up a category, ignoring case, from memory.
+
+    Parameters:
+        category (str): The category name.
+
+    Returns:
+        str or None: The category as registered, or None if it doesn't exist.
+    """
+    return get_registry().canonical(category)
 
 def add_category(category):
     """
-    Adds a new category to the file if it doesn't already exist.
+    Adds a new category to the file if it doesn't already exist, ignoring case.
 
     Parameters:
         category (str): The category to add.
+
+    Returns:
+        bool: True if the category was added.
     """
-    categories = read_categories()
-    if category not in categories:
-        with open(CATEGORIES_FILE, mode='a') as file:
-            file.write('\n' + category)
+    return get_registry().add(category)
 
 def remove_category(category):
     """
-    Removes a category from the file if it exists.
+    Removes a category from the file if it exists, ignoring case.
 
     Parameters:
         category (str): The category to remove.
+
+    Returns:
+        bool: True if the category was removed, False otherwise.
     """
-    categories = read_categories()
-    if category in categories:
-        categories.remove(category)
-        with open(CATEGORIES_FILE, mode='w') as file:
-            for cat in categories:
-                file.write(cat + '\n')
-        return True
-    else:
-        return False
+    return get_registry().remove(category)
+
+def rename_category(category, new_name):
+    """
+    Renames a category in the file, keeping its position.
+
+    Parameters:
+        category (str): The category to rename, ignoring case.
+        new_name (str): The new name.
+
+    Returns:
+        bool: True if the category was renamed, False if it doesn't exist or the new name is taken.
+    """
+    return get_registry().rename(category, new_name)
@@ -0,0 +1,153 @@
+# cli.py
+
+import argparse
+import sys
+import time
+
+import categories_manager
+import file_manager
+from commands import parse_command_line
+from executor import execute_commands, execute_individual_command
+from headless_ui import ConsoleUI
+
+# Prompt shown by the interactive command loop
+PROMPT = 'finance> '
+
+def read_script(lines):
+    """
+    Parses the lines of a script, skipping blank lines and '#' comments.
+
+    Parameters:
+        lines (iterable of str): The lines of the script.
+
+    Returns:
+        tuple: (list of Command, list of error messages prefixed with their line number).
+    """
+    commands = []
+    errors = []
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        command, error = parse_command_line(line)
+        if error:
+            errors.append(f"line {number}: {error}")
+        elif command is not None:
+            commands.append(command)
+    return commands, errors
+
+def run_script(lines, app):
+    """
+    Executes a script of commands without any UI.
+
+    Nothing is executed if any line fails to parse. Consecutive commands run as
+    one batch through execute_commands, so they are validated together and
+    written once; IDs in 'edit' and 'remove' commands refer to the transactions
+    as they were before the batch. 'import' commands run on their own, between
+    batches.
+
+    Parameters:
+        lines (iterable of str): The lines of the script.
+        app (ConsoleUI): The console UI for messages and errors.
+
+    Returns:
+        bool: True if every command was executed.
+    """
+    start = time.perf_counter()
+    commands, errors = read_script(lines)
+    parsed = time.perf_counter()
+    if errors:
+        for error in errors:
+            print(error, file=sys.stderr)
+        print(f"{len(errors)} invalid lines, nothing was executed", file=sys.stderr)
+        return False
+
+    success = True
+    batch = []
+    for command in commands + [None]:
+        if command is not None and command.command != 'import':
+            batch.append(command)
+            continue
+        if batch:
+            success = execute_commands(batch, app) and success
+            batch = []
+        if command is not None:
+            errors_before = app.errors
+            execute_individual_command(command, app)
+            success = success and app.errors == errors_before
+    executed = time.perf_counter()
+
+    rate = len(commands) / (executed - parsed) if executed > parsed else 0
+    print(f"{len(commands)} commands: parsed in {(parsed - start) * 1000:.1f} ms, "
+          f"executed in {(executed - parsed) * 1000:.1f} ms ({rate:.0f} commands/s)", file=sys.stderr)
+    return success
+
+def run_repl(app):
+    """
+    Reads commands from the terminal and executes them one at a time, until end of input or 'quit'.
+
+    Parameters:
+        app (ConsoleUI): The console UI for messages and errors.
+
+    Returns:
+        bool: True if every command was executed.
+    """
+    success = True
+    while True:
+        try:
+            line = input(PROMPT).strip()
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return success
+
+        if line.lower() in ['quit', 'exit']:
+            return success
+        if not line or line.startswith('#'):
+            continue
+
+        command, error = parse_command_line(line)
+        if error:
+            app.display_error("Command Error", error)
+            success = False
+            continue
+
+        errors_before = app.errors
+        start = time.perf_counter()
+        execute_individual_command(command, app)
+        print(f"({(time.perf_counter() - start) * 1000:.1f} ms)", file=sys.stderr)
+        success = success and app.errors == errors_before
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs finance tracker commands without the window, from a script, standard input or a prompt."
+    )
+    parser.add_argument('--quiet', action='store_true', help="Only print errors, reports and timings.")
+    subparsers = parser.add_subparsers(dest='mode')
+    run_parser = subparsers.add_parser('run', help="Execute a script of commands, one per line.")
+    run_parser.add_argument('script', help="Path of the script, or - for standard input.")
+    subparsers.add_parser('repl', help="Read commands interactively.")
+    args = parser.parse_args()
+
+    # Without a mode, piped input is a script and a terminal gets the prompt
+    mode = args.mode or ('repl' if sys.stdin.isatty() else 'run')
+
+    file_manager.initialize_transactions_file()
+    categories_manager.initialize_categories_file()
+    app = ConsoleUI(quiet=args.quiet)
+
+    if mode == 'repl':
+        success = run_repl(app)
+    elif args.mode is None or args.script == '-':
+        success = run_script(sys.stdin, app)
+    else:
+        try:
+            with open(args.script, mode='r') as file:
+                success = run_script(file, app)
+        except OSError as e:
+            print(f"Error reading script: {e}", file=sys.stderr)
+            success = False
+
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
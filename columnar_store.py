@@ -0,0 +1,338 @@
+# columnar_store.py
+
+import itertools
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from transaction import Transaction, category_code
+
+# Identifies a columnar ledger file and its layout version
+MAGIC = b'LEDGER\x00\x01'
+
+# magic, row count, category count, category heap size, description heap size,
+# source file mtime_ns, source file size, reserved
+HEADER = struct.Struct('<8sqqqqqqq')
+
+# Size in bytes and array typecode of the item of every section dtype
+ITEM_TYPES = {'<i8': (8, 'q'), '<i4': (4, 'i'), 'u1': (1, 'B')}
+
+# Columns are little-endian, so arrays are byte-swapped on other machines
+SWAP_BYTES = sys.byteorder != 'little'
+
+def _aligned(offset):
+    """
+    Returns:
+        int: The offset rounded up to a multiple of 8 bytes.
+    """
+    return (offset + 7) & ~7
+
+def _layout(rows, categories, category_heap_size, description_heap_size):
+    """
+    Computes the byte offset of every section of a columnar ledger file.
+
+    Returns:
+        dict: Section name to (offset, dtype, count), plus 'end' to the file size.
+    """
+    sections = [
+        ('ids', '<i8', rows),
+        ('amounts', '<i8', rows),
+        ('dates', '<i4', rows),
+        ('category_codes', '<i4', rows),
+        ('description_offsets', '<i8', rows + 1),
+        ('category_offsets', '<i8', categories + 1),
+        ('category_heap', 'u1', category_heap_size),
+        ('description_heap', 'u1', description_heap_size),
+    ]
+    layout = {}
+    offset = HEADER.size
+    for name, dtype, count in sections:
+        offset = _aligned(offset)
+        layout[name] = (offset, dtype, count)
+        offset += ITEM_TYPES[dtype][0] * count
+    layout['end'] = offset
+    return layout
+
+class ColumnarLedger:
+    """
+    Read-only, memory-mapped view of a columnar ledger file.
+
+    Every column is a NumPy array backed directly by the mapping, so opening a
+    ledger copies nothing; pages are only read from disk as they are touched.
+    NumPy is imported when a column is first used: materializing the whole
+    ledger reads the mapping without it, so loading doesn't pay for NumPy.
+
+    Attributes:
+        ids (np.ndarray): int64 transaction IDs.
+        amounts (np.ndarray): int64 amounts in cents.
+        dates (np.ndarray): int32 dates as YYYYMMDD.
+        category_codes (np.ndarray): int32 index into categories.
+        categories (list of str): The category names used by the file.
+        source_stamp (tuple): The (mtime_ns, size) of the CSV file the ledger was written from.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): Path to the columnar ledger file.
+
+        Raises:
+            ValueError: If the file is not a valid columnar ledger.
+        """
+        with open(path, mode='rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < HEADER.size:
+            raise ValueError(f"{path} is too short to be a columnar ledger.")
+        magic, rows, categories, category_heap_size, description_heap_size, mtime_ns, size, _ = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a columnar ledger.")
+        layout = _layout(rows, categories, category_heap_size, description_heap_size)
+        if layout['end'] > len(self._map):
+            raise ValueError(f"{path} is truncated.")
+
+        self.source_stamp = (mtime_ns, size)
+        self._layout = layout
+        self._rows = rows
+        self._columns = {}
+        heap_offset, _, heap_size = layout['description_heap']
+        self._description_heap = memoryview(self._map)[heap_offset:heap_offset + heap_size]
+
+        category_offsets = self._list('category_offsets')
+        category_heap = self._bytes('category_heap')
+        self.categories = [
+            category_heap[category_offsets[i]:category_offsets[i + 1]].decode('utf-8')
+            for i in range(categories)
+        ]
+
+    def _view(self, name):
+        """
+        Returns:
+            np.ndarray: A zero-copy view of a section of the mapping, created on first use.
+        """
+        view = self._columns.get(name)
+        if view is None:
+            import numpy as np
+
+            offset, dtype, count = self._layout[name]
+            view = self._columns[name] = np.frombuffer(self._map, dtype=dtype, count=count, offset=offset)
+        return view
+
+    def _bytes(self, name):
+        """
+        Returns:
+            bytes: A copy of a section of the mapping.
+        """
+        offset, dtype, count = self._layout[name]
+        return self._map[offset:offset + ITEM_TYPES[dtype][0] * count]
+
+    def _list(self, name):
+        """
+        Returns:
+            list of int: The values of a section of the mapping.
+        """
+        offset, dtype, count = self._layout[name]
+        size, typecode = ITEM_TYPES[dtype]
+        values = array(typecode, self._map[offset:offset + size * count])
+        if SWAP_BYTES:
+            values.byteswap()
+        return values.tolist()
+
+    @property
+    def ids(self):
+        return self._view('ids')
+
+    @property
+    def amounts(self):
+        return self._view('amounts')
+
+    @property
+    def dates(self):
+        return self._view('dates')
+
+    @property
+    def category_codes(self):
+        return self._view('category_codes')
+
+    def __len__(self):
+        return self._rows
+
+    def description(self, index):
+        """
+        Parameters:
+            index (int): The row index.
+
+        Returns:
+            str: The description of the row.
+        """
+        offset = self._layout['description_offsets'][0]
+        start, end = struct.unpack_from('<qq', self._map, offset + 8 * index)
+        return str(self._description_heap[start:end], 'utf-8')
+
+    def _materialize(self, indexes):
+        """
+        Builds Transaction objects for the given row indexes.
+
+        Parameters:
+            indexes (np.ndarray or slice): The rows to materialize, in ascending order.
+
+        Returns:
+            list of Transaction: The transactions, in the order of the indexes.
+        """
+        import numpy as np
+
+        global_codes = np.array([category_code(name) for name in self.categories], dtype=np.int64)
+        offsets = self._view('description_offsets')
+        starts = offsets[:-1][indexes].tolist()
+        ends = offsets[1:][indexes].tolist()
+        if not starts:
+            return []
+        return list(map(
+            Transaction,
+            self.ids[indexes].tolist(),
+            self.amounts[indexes].tolist(),
+            self.dates[indexes].tolist(),
+            global_codes[self.category_codes[indexes]].tolist() if len(global_codes) else [],
+            self._descriptions(starts, ends),
+        ))
+
+    def _descriptions(self, starts, ends):
+        """
+        Returns:
+            list of str: The descriptions between the given heap offsets, in ascending order.
+        """
+        if not starts:
+            return []
+        # Copy just the part of the heap the rows need, slicing bytes is much faster than slicing the mapping
+        base = starts[0]
+        heap = bytes(self._description_heap[base:ends[-1]])
+        return [heap[start - base:end - base].decode('utf-8') for start, end in zip(starts, ends)]
+
+    def to_transactions(self):
+        """
+        Materializes the whole ledger as Transaction objects, without NumPy.
+
+        Returns:
+            list of Transaction: The transactions, in file order.
+        """
+        global_codes = [category_code(name) for name in self.categories]
+        offsets = self._list('description_offsets')
+        return list(map(
+            Transaction,
+            self._list('ids'),
+            self._list('amounts'),
+            self._list('dates'),
+            map(global_codes.__getitem__, self._list('category_codes')),
+            self._descriptions(offsets[:-1], offsets[1:]),
+        ))
+
+    def iter_transactions(self, category=None, start_value=None, end_value=None, chunk_size=65536):
+        """
+        Streams the ledger as Transaction objects, chunk by chunk.
+
+        Filters are evaluated on the columns, so only matching rows are materialized.
+
+        Parameters:
+            category (str): Only yield this category, if given.
+            start_value (int): Only yield dates on or after this YYYYMMDD date, if given.
+            end_value (int): Only yield dates on or before this YYYYMMDD date, if given.
+            chunk_size (int): Number of rows examined at a time.
+
+        Yields:
+            Transaction: The matching transactions, in file order.
+        """
+        import numpy as np
+
+        if category is not None:
+            if category not in self.categories:
+                return
+            code = self.categories.index(category)
+
+        for start in range(0, len(self), chunk_size):
+            stop = min(start + chunk_size, len(self))
+            mask = np.ones(stop - start, dtype=bool)
+            if category is not None:
+                mask &= self.category_codes[start:stop] == code
+            if start_value is not None:
+                mask &= self.dates[start:stop] >= start_value
+            if end_value is not None:
+                mask &= self.dates[start:stop] <= end_value
+            yield from self._materialize(np.flatnonzero(mask) + start)
+
+def _column_bytes(dtype, values):
+    """
+    Returns:
+        bytes: The values packed as a column of the given section dtype.
+    """
+    column = array(ITEM_TYPES[dtype][1], values)
+    if SWAP_BYTES:
+        column.byteswap()
+    return column.tobytes()
+
+def write_ledger(path, transactions, source_stamp):
+    """
+    Writes transactions into a columnar ledger file, atomically replacing any existing one.
+
+    Parameters:
+        path (str): Path to the columnar ledger file.
+        transactions (list of Transaction): The transactions.
+        source_stamp (tuple): The (mtime_ns, size) of the CSV file the transactions were read from.
+    """
+    count = len(transactions)
+    ids = _column_bytes('<i8', (txn.id for txn in transactions))
+    amounts = _column_bytes('<i8', (txn.amount_cents for txn in transactions))
+    dates = _column_bytes('<i4', (txn.date_value for txn in transactions))
+
+    local_codes = {}
+    codes = _column_bytes('<i4', (local_codes.setdefault(txn.category, len(local_codes)) for txn in transactions))
+    category_bytes = [name.encode('utf-8') for name in local_codes]
+    category_offsets = _column_bytes('<i8', itertools.accumulate(map(len, category_bytes), initial=0))
+
+    description_bytes = [txn.description.encode('utf-8') for txn in transactions]
+    description_offsets = _column_bytes('<i8', itertools.accumulate(map(len, description_bytes), initial=0))
+
+    category_heap = b''.join(category_bytes)
+    description_heap = b''.join(description_bytes)
+    layout = _layout(count, len(category_bytes), len(category_heap), len(description_heap))
+    sections = {
+        'ids': ids,
+        'amounts': amounts,
+        'dates': dates,
+        'category_codes': codes,
+        'description_offsets': description_offsets,
+        'category_offsets': category_offsets,
+        'category_heap': category_heap,
+        'description_heap': description_heap,
+    }
+
+    temp_path = path + '.tmp'
+    with open(temp_path, mode='wb') as file:
+        file.write(HEADER.pack(MAGIC, count, len(category_bytes), len(category_heap), len(description_heap),
+                               source_stamp[0], source_stamp[1], 0))
+        for name, data in sections.items():
+            file.seek(layout[name][0])
+            file.write(data)
+        file.truncate(layout['end'])
+    os.replace(temp_path, path)
+
+def open_ledger(path, source_stamp=None):
+    """
+    Opens a columnar ledger file if it exists and is valid.
+
+    Parameters:
+        path (str): Path to the columnar ledger file.
+        source_stamp (tuple): If given, the ledger is only returned if it was written from a CSV file with this stamp.
+
+    Returns:
+        ColumnarLedger or None: The ledger, or None if it is missing, invalid or out of date.
+    """
+    try:
+        ledger = ColumnarLedger(path)
+    except (OSError, ValueError):
+        return None
+    if source_stamp is not None and ledger.source_stamp != tuple(source_stamp):
+        return None
+    return ledger
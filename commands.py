@@ -1,38 +1,56 @@
+import math
 import shlex
 from datetime import datetime
-from tkinter import messagebox
-from ai_handler import Command
 
-def parse_command(input_str):
+# Names of the commands parse_command understands
+COMMAND_NAMES = ['add', 'category', 'remove', 'edit', 'report', 'import']
+
+def is_command(input_str):
+    """
+    Checks whether the input starts with the name of a command, rather than being natural language.
+
+    Parameters:
+        input_str (str): The input of the user.
+
+    Returns:
+        bool: True if the first word is one of COMMAND_NAMES.
+    """
+    words = input_str.split(None, 1)
+    return bool(words) and words[0].lower() in COMMAND_NAMES
+
+def parse_command_line(input_str):
     """
-    Parses the user input and returns a Command object.
+    Parses the user input without any UI, returning errors as values.
 
     Parameters:
         input_str (str): The command input by the user.
 
     Returns:
-        Command or None: A Command object representing the parsed command, or None if invalid.
+        tuple: (Command, None) for a valid command, (None, error message) for an invalid one,
+            or (None, None) for empty input.
     """
+    # Imported on first use, the model pulls in pydantic
+    from models import Command
+
     try:
         tokens = shlex.split(input_str)
     except ValueError as e:
-        messagebox.showerror("Command Error", f"Invalid command syntax: {e}")
-        return None
+        return None, f"Invalid command syntax: {e}"
 
     if not tokens:
-        return None
+        return None, None
 
     cmd = tokens[0].lower()
 
     if cmd == 'add':
         if len(tokens) < 5:
-            messagebox.showerror("Command Error", 'Usage: add <amount> "<description>" <date DD/MM/YYYY> "<category>"')
-            return None
+            return None, 'Usage: add <amount> "<description>" <date DD/MM/YYYY> "<category>"'
         try:
             amount = float(tokens[1])
         except ValueError:
-            messagebox.showerror("Command Error", "Amount must be a number.")
-            return None
+            return None, "Amount must be a number."
+        if not math.isfinite(amount):
+            return None, f"Invalid amount: {tokens[1]}"
         description = tokens[2]
         date = tokens[3]
         category = tokens[4]
@@ -40,69 +58,94 @@ def parse_command(input_str):
         try:
             datetime.strptime(date, '%d/%m/%Y')
         except ValueError:
-            messagebox.showerror("Command Error", "Date must be in DD/MM/YYYY format.")
-            return None
-        return Command(command='add', amount=amount, description=description, date=date, category=category)
+            return None, "Date must be in DD/MM/YYYY format."
+        return Command(command='add', amount=amount, description=description, date=date, category=category), None
 
     elif cmd == 'category':
         if len(tokens) < 2:
-            messagebox.showerror("Command Error", 'Usage: category <add / remove / reset> "<name>"')
-            return None
+            return None, 'Usage: category <add / remove / reset / rename / merge> "<name>"'
 
         action = tokens[1].lower()
-        if action not in ['add', 'remove', 'reset']:
-            messagebox.showerror("Command Error", 'Usage: category <add / remove / reset> "<name>"')
-            return None
+        if action not in ['add', 'remove', 'reset', 'rename', 'merge']:
+            return None, 'Usage: category <add / remove / reset / rename / merge> "<name>"'
 
         if action == 'reset':
-            return Command(command='category', action='reset')
+            return Command(command='category', action='reset'), None
+
+        if action in ['rename', 'merge']:
+            if len(tokens) < 4:
+                return None, f'Usage: category {action} "<name>" "<new name>"'
+            return Command(command='category', action=action, name=tokens[2], value=tokens[3]), None
 
         if len(tokens) < 3:
-            messagebox.showerror("Command Error", 'Usage: category <add / remove / reset> "<name>"')
-            return None
+            return None, 'Usage: category <add / remove / reset / rename / merge> "<name>"'
 
         name = tokens[2]
-        return Command(command='category', action=action, name=name)
+        return Command(command='category', action=action, name=name), None
 
     elif cmd == 'remove':
         if len(tokens) < 2:
-            messagebox.showerror("Command Error", 'Usage: remove <ID> [<ID> ...]')
-            return None
+            return None, 'Usage: remove <ID> [<ID> ...]'
         try:
             unique_ids = [int(token) for token in tokens[1:]]
         except ValueError:
-            messagebox.showerror("Command Error", "IDs must be integers.")
-            return None
-        return Command(command='remove', unique_ids=unique_ids)
+            return None, "IDs must be integers."
+        return Command(command='remove', unique_ids=unique_ids), None
 
     elif cmd == 'edit':
         if len(tokens) < 4:
-            messagebox.showerror("Command Error", 'Usage: edit <ID> <field> <new value>')
-            return None
+            return None, 'Usage: edit <ID> <field> <new value>'
 
         try:
             unique_id = int(tokens[1])
         except ValueError:
-            messagebox.showerror("Command Error", "ID must be an integer.")
-            return None
+            return None, "ID must be an integer."
 
         field = tokens[2].lower()
         new_value = " ".join(tokens[3:])
 
         if field not in ['amount', 'description', 'date', 'category']:
-            messagebox.showerror("Command Error", f"Invalid field: {field}. Valid fields are amount, description, date, category.")
-            return None
+            return None, f"Invalid field: {field}. Valid fields are amount, description, date, category."
 
-        # Convert amount to float if the field is amount
+        # Check the amount is a number if the field is amount
         if field == 'amount':
             try:
-                new_value = float(new_value)
+                amount = float(new_value)
             except ValueError:
-                messagebox.showerror("Command Error", "Amount must be a number.")
-                return None
+                return None, "Amount must be a number."
+            if not math.isfinite(amount):
+                return None, f"Invalid amount: {new_value}"
 
-        return Command(command='edit', unique_ids=[unique_id], name=field, description=new_value)
+        return Command(command='edit', unique_ids=[unique_id], field=field, value=new_value), None
+
+    elif cmd == 'report':
+        if len(tokens) < 2 or tokens[1].lower() not in ['month', 'category']:
+            return None, 'Usage: report <month / category>'
+        return Command(command='report', action=tokens[1].lower()), None
+
+    elif cmd == 'import':
+        options = [token for token in tokens[1:] if token.startswith('--')]
+        paths = [token for token in tokens[1:] if not token.startswith('--')]
+        if len(paths) != 1 or any(option != '--dry-run' for option in options):
+            return None, 'Usage: import "<file>" [--dry-run]'
+        return Command(command='import', name=paths[0], action='dry-run' if options else None), None
 
     else:
-        messagebox.showerror("Command Error", f"Unknown command: {cmd}")
-        return None
+        return None, f"Unknown command: {cmd}"
+
+def parse_command(input_str):
+    """
+    Parses the user input and returns a Command object, showing an error dialog if it is invalid.
+
+    Parameters:
+        input_str (str): The command input by the user.
+
+    Returns:
+        Command or None: A Command object representing the parsed command, or None if invalid.
+    """
+    command, error = parse_command_line(input_str)
+    if error:
+        # Imported here so that parsing works without a display
+        from tkinter import messagebox
+        messagebox.showerror("Command Error", error)
+    return command
@@ -0,0 +1,559 @@
+# executor.py
+
+from collections import Counter
+
+import file_manager
+import categories_manager
+import search_index
+from transaction import to_cents
+
+# Fields an 'edit' command can change
+EDIT_FIELDS = ['amount', 'description', 'date', 'category']
+
+# Maximum number of changes listed in the summary of a command sequence
+SUMMARY_LINES = 15
+
+def unknown_category_message(category):
+    """
+    Returns:
+        str: The error shown for a category that doesn't exist.
+    """
+    return f'Unknown category: {category}. Add it first with: category add "{category}"'
+
+def is_valid_amount(amount):
+    """
+    Returns:
+        bool: True if the amount is a finite number, as a number or text.
+    """
+    try:
+        to_cents(amount)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def category_taken_message(category, existing):
+    """
+    Returns:
+        str: The error shown when renaming a category to the name of another one.
+    """
+    return f'Category already exists: {existing}. Merge into it with: category merge "{category}" "{existing}"'
+
+def category_in_use_message(category, count):
+    """
+    Returns:
+        str: The error shown when removing a category that transactions still use.
+    """
+    return (f'Category {category} is used by {count} transactions. '
+            f'Move them to another category with: category merge "{category}" "<category>"')
+
+def category_retired_message(category):
+    """
+    Returns:
+        str: The error shown when a sequence brings back a category it took away.
+    """
+    return (f'Category {category} was renamed, merged or removed earlier in these commands. '
+            f'Add it again in a separate command.')
+
+def transaction_category(transaction_id, changed_categories):
+    """
+    Returns the category of a transaction as a command sequence left it so far.
+
+    Parameters:
+        transaction_id (int): The ID of the transaction.
+        changed_categories (dict): Lowercase categories of the transactions edited or removed so far
+            by ID, None once removed.
+
+    Returns:
+        str or None: The lowercase category, or None if the transaction doesn't exist or was removed.
+    """
+    if transaction_id in changed_categories:
+        return changed_categories[transaction_id]
+    txn = file_manager.get_transaction(transaction_id)
+    return None if txn is None else txn.category.lower()
+
+def category_usage(category):
+    """
+    Returns:
+        int: The number of transactions in the category, ignoring case, from the running totals.
+    """
+    lower = category.strip().lower()
+    return sum(count for name, count in file_manager.category_counts().items() if name.lower() == lower)
+
+def move_category(action, category, new_category):
+    """
+    Renames a category, or merges it into another one, together with all of its transactions.
+
+    The transactions are moved in a single pass over the store and a single
+    write, then the categories file is updated. A category can be merged away
+    even if only the transactions still use it.
+
+    Parameters:
+        action (str): 'rename' or 'merge'.
+        category (str): The category to rename or merge away.
+        new_category (str): The new name, or the existing category to merge into.
+
+    Returns:
+        tuple: (True, summary message) or (False, error message).
+    """
+    existing = categories_manager.canonical_category(category)
+    new_category = new_category.strip()
+    target = categories_manager.canonical_category(new_category)
+
+    if action == 'rename':
+        if existing is None:
+            return False, f"Category not found: {category}"
+        if target is not None and target != existing:
+            return False, category_taken_message(existing, target)
+        moved = file_manager.recategorize_transactions([existing], new_category)
+        categories_manager.rename_category(existing, new_category)
+        return True, f"Category renamed: {existing} -> {new_category}\nTransactions updated: {moved}"
+
+    if target is None:
+        return False, unknown_category_message(new_category)
+    source = existing or category.strip()
+    if source.lower() == target.lower():
+        return False, f"Can't merge a category into itself: {target}"
+    if existing is None and not category_usage(source):
+        return False, f"Category not found: {category}"
+    moved = file_manager.recategorize_transactions([source], target)
+    categories_manager.remove_category(source)
+    return True, f"Category merged: {source} -> {target}\nTransactions updated: {moved}"
+
+def execute_individual_command(command, app):
+    """
+    Executes an individual command.
+
+    Parameters:
+    command (Command): The command object containing all arguments.
+    app (FinanceTrackerUI): Reference to the app UI for displaying messages and errors.
+    """
+    cmd = command.command  # Extract the command name
+
+    if cmd == 'add':
+        if not (command.amount and command.description and command.date and command.category):
+            app.display_error("Command Error", "Missing arguments for 'add' command.")
+            return
+        if not is_valid_amount(command.amount):
+            app.display_error("Command Error", f"Invalid amount: {command.amount}")
+            return
+
+        # Convert DD/MM/YYYY to YYYY-MM-DD
+        try:
+            day, month, year = map(int, command.date.split('/'))
+            formatted_date = f"{day:02d}/{month:02d}/{year:04d}"
+        except ValueError:
+            app.display_error("Date Error", f"Invalid date format: {command.date}. Expected DD/MM/YYYY.")
+            return
+
+        # Only existing categories, in their registered spelling
+        category = categories_manager.canonical_category(command.category)
+        if category is None:
+            app.display_error("Category Error", unknown_category_message(command.category))
+            return
+
+        # Add the transaction
+        file_manager.add_transaction(command.amount, command.description, formatted_date, category)
+        refresh_ui(app)
+        app.display_message(
+            "Success",
+            f"Transaction added successfully!\nDescription: {command.description}\nAmount: ${command.amount:.2f}\n"
+            f"Date: {formatted_date}\nCategory: {category}"
+        )
+
+    elif cmd == 'category':
+        if not (command.action):
+            app.display_error("Command Error", "Missing arguments for 'category' command.")
+            return
+        if not (command.name):
+            if command.action == "reset":
+                categories_manager.reset_to_default_categories()
+                app.display_message("Success", f"Categories reset to default!")
+                return
+            else:
+                app.display_error("Command Error", "Missing arguments for 'category' command.")
+                return
+        if command.action in ("rename", "merge"):
+            if not command.value:
+                app.display_error("Command Error", "Missing arguments for 'category' command.")
+                return
+            success, message = move_category(command.action, command.name, command.value)
+            if not success:
+                app.display_error("Category Error", message)
+                return
+            refresh_ui(app)
+            app.display_message("Success", message)
+        elif command.action == "add":
+            if categories_manager.add_category(command.name):
+                app.display_message(
+                "Success",
+                f"Category added successfully!\nName: {command.name}"
+                )
+            else:
+                app.display_message(
+                "Unsuccessful",
+                f"Category already exists: {categories_manager.canonical_category(command.name)}"
+                )
+        else:
+            # Removing a category in use would orphan its transactions
+            used = category_usage(command.name)
+            if used:
+                app.display_error("Category Error", category_in_use_message(command.name, used))
+                return
+            success = categories_manager.remove_category(command.name)
+            if success:
+                app.display_message(
+                "Success",
+                f"Category removed successfully!\nName: {command.name}"
+                )
+            else:
+                app.display_message(
+                "Unsuccessful",
+                f"Category not found: {command.name}"
+                )
+
+    elif cmd == 'remove':
+        if not command.unique_ids or len(command.unique_ids) == 0:
+            app.display_error("Command Error", "No IDs provided for 'remove' command.")
+            return
+
+        unsuccessful_ids = []
+        valid_ids = []
+        for unique_id in command.unique_ids:
+            if unique_id < 0:
+                app.display_error("Command Error", f"Invalid ID: {unique_id}. IDs must be non-negative.")
+                unsuccessful_ids.append(unique_id)
+            else:
+                valid_ids.append(unique_id)
+
+        # Remove all IDs in one pass and renumber in the same write
+        unsuccessful_ids.extend(file_manager.remove_transactions(valid_ids, renumber=True))
+
+        if not unsuccessful_ids:
+            app.display_message(
+                "Success",
+                f"Transactions removed successfully! IDs: {', '.join(map(str, command.unique_ids))}"
+            )
+        else:
+            app.display_message(
+                "Partial Success",
+                f"Some transactions could not be found: {', '.join(map(str, unsuccessful_ids))}"
+            )
+        refresh_ui(app)
+
+    elif cmd == 'edit':
+        if not command.unique_ids or len(command.unique_ids) != 1:
+            app.display_error("Command Error", "Provide exactly one ID for 'edit' command.")
+            return
+
+        unique_id = command.unique_ids[0]
+        field = command.field
+        new_value = command.value
+
+        if field == 'category':
+            new_value = categories_manager.canonical_category(command.value)
+            if new_value is None:
+                app.display_error("Category Error", unknown_category_message(command.value))
+                return
+        elif field == 'amount' and not is_valid_amount(new_value):
+            app.display_error("Command Error", f"Invalid amount: {new_value}")
+            return
+
+        # Attempt to edit the transaction
+        success = file_manager.edit_transaction(unique_id, field, new_value)
+
+        if success:
+            app.display_message("Success", f"Transaction {unique_id} updated successfully!")
+            file_manager.renumber_ids()
+            refresh_ui(app)
+        else:
+            app.display_error("Transaction Error", f"Transaction with ID {unique_id} could not be found.")
+
+    elif cmd == 'report':
+        # Imported on first use, reports pull in NumPy
+        import reports
+
+        if command.action not in reports.REPORT_KINDS:
+            app.display_error("Command Error", f"Unknown report: {command.action}. Use 'month' or 'category'.")
+            return
+        title, headings, rows = reports.build_report(command.action)
+        app.show_report(title, headings, rows)
+
+    elif cmd == 'import':
+        if not command.name:
+            app.display_error("Command Error", "No file provided for 'import' command.")
+            return
+        dry_run = command.action == 'dry-run'
+
+        # Imported on first use, like the reports
+        import importer
+
+        try:
+            counts = importer.import_file(command.name, dry_run=dry_run)
+        except (OSError, ValueError) as e:
+            app.display_error("Import Error", f"Could not import {command.name}: {e}")
+            return
+
+        if not dry_run:
+            refresh_ui(app)
+        app.display_message(
+            "Import Dry Run" if dry_run else "Import Complete",
+            f"{'Would import' if dry_run else 'Imported'} {counts['new']} of {counts['read']} records "
+            f"from {command.name}.\nDuplicates skipped: {counts['duplicate']}\nInvalid records: {counts['invalid']}"
+        )
+
+    else:
+        app.display_error("Command Error", f"Unknown command: {cmd}")
+
+def execute_commands(commands, app, untranslated=()):
+    """
+    Executes a sequence of commands as one unit.
+
+    Every command is validated before anything is changed, against the
+    categories and the number of transactions in each category as they will be
+    when it runs. The transaction changes are then applied with a single write,
+    category changes after them, and the UI is refreshed and a summary shown
+    once. If any command is invalid, or a transaction it refers to doesn't
+    exist, nothing is changed.
+
+    Since category changes are applied last, a category that a rename, merge,
+    removal or reset took away can't be brought back later in the same
+    sequence, or the transactions using it again would be moved too.
+
+    IDs in 'edit' and 'remove' commands refer to the transactions as they were
+    before the sequence, and the IDs are renumbered once at the end.
+
+    Parameters:
+        commands (list of Command): The commands to execute.
+        app (FinanceTrackerUI): Reference to the app UI for displaying messages and errors.
+        untranslated (list of str): Parts of the prompt the commands come from that could not be
+            translated, reported in the same summary.
+
+    Returns:
+        bool: True if every command was executed, False if nothing was changed, some category
+            changes could not be applied or part of the prompt was not translated.
+    """
+    # Categories as they will be when each command runs, lowercase name to registered name
+    known_categories = {name.lower(): name for name in categories_manager.read_categories()}
+    # Number of transactions per lowercase category name as it will be when each command runs
+    usage = Counter()
+    for name, count in file_manager.category_counts().items():
+        usage[name.lower()] += count
+    # Lowercase categories of the transactions edited or removed so far by ID, None once removed
+    changed_categories = {}
+    # Lowercase names of the categories taken away by the sequence
+    retired = set()
+
+    errors = []
+    additions = []
+    edits = []
+    removals = []
+    category_changes = []
+    report_kinds = []
+    summary = []
+
+    for number, command in enumerate(commands, start=1):
+        cmd = command.command
+
+        if cmd == 'add':
+            if not (command.amount and command.description and command.date and command.category):
+                errors.append(f"Command {number}: Missing arguments for 'add' command.")
+                continue
+            if not is_valid_amount(command.amount):
+                errors.append(f"Command {number}: Invalid amount: {command.amount}")
+                continue
+            try:
+                day, month, year = map(int, command.date.split('/'))
+            except ValueError:
+                errors.append(f"Command {number}: Invalid date format: {command.date}. Expected DD/MM/YYYY.")
+                continue
+            formatted_date = f"{day:02d}/{month:02d}/{year:04d}"
+            category = known_categories.get(command.category.strip().lower())
+            if category is None:
+                errors.append(f"Command {number}: {unknown_category_message(command.category)}")
+                continue
+            additions.append((command.amount, command.description, formatted_date, category))
+            usage[category.lower()] += 1
+            summary.append(f"Added: {command.description}, ${command.amount:.2f}, {formatted_date}, {category}")
+
+        elif cmd == 'category':
+            action = command.action
+            name = (command.name or '').strip()
+            new_name = (command.value or '').strip()
+            if action not in ['add', 'remove', 'reset', 'rename', 'merge'] \
+                    or (action != 'reset' and not name) or (action in ('rename', 'merge') and not new_name):
+                errors.append(f"Command {number}: Missing arguments for 'category' command.")
+            elif action == 'reset':
+                defaults = {category.lower(): category for category in categories_manager.DEFAULT_CATEGORIES}
+                brought_back = [category for lower, category in defaults.items() if lower in retired]
+                if brought_back:
+                    errors.append(f"Command {number}: {category_retired_message(brought_back[0])}")
+                else:
+                    category_changes.append((action, None, None))
+                    retired.update(lower for lower in known_categories if lower not in defaults)
+                    known_categories = defaults
+            elif action == 'add':
+                if name.lower() in known_categories:
+                    errors.append(f"Command {number}: Category already exists: {known_categories[name.lower()]}")
+                elif name.lower() in retired:
+                    errors.append(f"Command {number}: {category_retired_message(name)}")
+                else:
+                    category_changes.append((action, name, None))
+                    known_categories[name.lower()] = name
+            elif action == 'remove':
+                existing = known_categories.get(name.lower())
+                if existing is None:
+                    errors.append(f"Command {number}: Category not found: {name}")
+                elif usage[name.lower()]:
+                    errors.append(f"Command {number}: {category_in_use_message(existing, usage[name.lower()])}")
+                else:
+                    category_changes.append((action, name, None))
+                    del known_categories[name.lower()]
+                    retired.add(name.lower())
+            elif action == 'rename':
+                taken = known_categories.get(new_name.lower())
+                if name.lower() not in known_categories:
+                    errors.append(f"Command {number}: Category not found: {name}")
+                elif taken is not None and taken.lower() != name.lower():
+                    errors.append(f"Command {number}: {category_taken_message(name, taken)}")
+                elif new_name.lower() in retired:
+                    errors.append(f"Command {number}: {category_retired_message(new_name)}")
+                else:
+                    category_changes.append((action, name, new_name))
+                    del known_categories[name.lower()]
+                    known_categories[new_name.lower()] = new_name
+                    usage[new_name.lower()] += usage.pop(name.lower(), 0)
+                    if new_name.lower() != name.lower():
+                        retired.add(name.lower())
+            else:
+                target = known_categories.get(new_name.lower())
+                if target is None:
+                    errors.append(f"Command {number}: {unknown_category_message(new_name)}")
+                elif name.lower() == target.lower():
+                    errors.append(f"Command {number}: Can't merge a category into itself: {target}")
+                elif name.lower() not in known_categories and not usage[name.lower()]:
+                    errors.append(f"Command {number}: Category not found: {name}")
+                else:
+                    category_changes.append((action, name, target))
+                    known_categories.pop(name.lower(), None)
+                    usage[target.lower()] += usage.pop(name.lower(), 0)
+                    retired.add(name.lower())
+
+        elif cmd == 'remove':
+            if not command.unique_ids:
+                errors.append(f"Command {number}: No IDs provided for 'remove' command.")
+                continue
+            negative_ids = [unique_id for unique_id in command.unique_ids if unique_id < 0]
+            if negative_ids:
+                errors.append(f"Command {number}: Invalid ID: {negative_ids[0]}. IDs must be non-negative.")
+                continue
+            for unique_id in command.unique_ids:
+                category = transaction_category(unique_id, changed_categories)
+                if category is not None:
+                    usage[category] -= 1
+                    changed_categories[unique_id] = None
+            removals.extend(command.unique_ids)
+            summary.append(f"Removed: {', '.join(map(str, command.unique_ids))}")
+
+        elif cmd == 'edit':
+            if not command.unique_ids or len(command.unique_ids) != 1:
+                errors.append(f"Command {number}: Provide exactly one ID for 'edit' command.")
+            elif command.field not in EDIT_FIELDS or command.value is None:
+                errors.append(f"Command {number}: Provide a field ({', '.join(EDIT_FIELDS)}) and a value "
+                              f"for 'edit' command.")
+            else:
+                value = command.value
+                if command.field == 'category':
+                    value = known_categories.get(value.strip().lower())
+                    if value is None:
+                        errors.append(f"Command {number}: {unknown_category_message(command.value)}")
+                        continue
+                    category = transaction_category(command.unique_ids[0], changed_categories)
+                    if category is not None:
+                        usage[category] -= 1
+                        usage[value.lower()] += 1
+                        changed_categories[command.unique_ids[0]] = value.lower()
+                elif command.field == 'amount' and not is_valid_amount(value):
+                    errors.append(f"Command {number}: Invalid amount: {value}")
+                    continue
+                edits.append((command.unique_ids[0], command.field, value))
+                summary.append(f"Edited: {command.unique_ids[0]}, {command.field} = {value}")
+
+        elif cmd == 'report':
+            # Imported on first use, reports pull in NumPy
+            import reports
+
+            if command.action not in reports.REPORT_KINDS:
+                errors.append(f"Command {number}: Unknown report: {command.action}. Use 'month' or 'category'.")
+            else:
+                report_kinds.append(command.action)
+
+        else:
+            errors.append(f"Command {number}: Unknown command: {cmd}")
+
+    not_understood = [f"Not understood: {text}" for text in untranslated]
+    if errors:
+        app.display_error("Command Error", "No changes were made.\n\n" + "\n".join(errors + not_understood))
+        return False
+
+    changes_transactions = bool(additions or edits or removals)
+    if changes_transactions:
+        try:
+            file_manager.apply_batch(additions, edits, removals, renumber=bool(edits or removals))
+        except ValueError as e:
+            app.display_error("Transaction Error", f"No changes were made.\n\n{e}")
+            return False
+
+    # Validated above, so these only fail if the categories file was changed meanwhile
+    unsuccessful = not_understood
+    for action, name, new_name in category_changes:
+        if action in ('rename', 'merge'):
+            success, message = move_category(action, name, new_name)
+            if success:
+                summary.append(message.replace("\n", ", "))
+                changes_transactions = True
+            else:
+                unsuccessful.append(message)
+        elif action == 'reset':
+            categories_manager.reset_to_default_categories()
+            summary.append("Categories reset to default")
+        elif action == 'add':
+            if categories_manager.add_category(name):
+                summary.append(f"Category added: {name}")
+            else:
+                unsuccessful.append(f"Category already exists: {name}")
+        elif category_usage(name):
+            unsuccessful.append(category_in_use_message(name, category_usage(name)))
+        elif categories_manager.remove_category(name):
+            summary.append(f"Category removed: {name}")
+        else:
+            unsuccessful.append(f"Category not found: {name}")
+
+    if changes_transactions:
+        refresh_ui(app)
+
+    if len(summary) > SUMMARY_LINES:
+        summary[SUMMARY_LINES:] = [f"... and {len(summary) - SUMMARY_LINES} more"]
+    if unsuccessful:
+        app.display_message("Partial Success", "\n".join(summary + unsuccessful))
+    elif summary:
+        app.display_message("Success", "Commands executed successfully!\n\n" + "\n".join(summary))
+
+    for kind in report_kinds:
+        title, headings, rows = reports.build_report(kind)
+        app.show_report(title, headings, rows)
+    return not unsuccessful
+
+def refresh_ui(app):
+    """
+    Refreshes the UI with the transactions matching the search, and the totals.
+
+    The Treeviews are updated by difference, so only the rows that changed are redrawn.
+
+    Parameters:
+        app (FinanceTrackerUI): Reference to the app UI.
+    """
+    income, expenses = search_index.filter_transactions(app.get_search_text())
+    app.show_transactions(income, expenses)
+
+    total_income, total_expenses, net_balance = file_manager.calculate_totals()
+    app.update_totals(total_income, total_expenses, net_balance)
@@ -1,32 +1,896 @@
 # file_manager.py
 
 import csv
+import io
+import json
+import locale
 import os
 from datetime import datetime
 
+from transaction import CATEGORY_NAMES, Transaction, category_code, parse_date, to_cents
+
 # File where transactions will be stored
 TRANSACTIONS_FILE = 'transactions.csv'
 
+# Column order of the transactions file
+FIELDNAMES = ['Amount', 'Description', 'Date', 'Category', 'ID']
+
+# Encoding used by open() for the transactions file, needed to work with byte offsets
+FILE_ENCODING = locale.getpreferredencoding(False)
+
+# Storage engine used by get_store(), either 'csv' or 'sqlite'
+STORAGE_BACKEND = os.getenv('FINANCE_STORAGE_BACKEND', 'csv').lower()
+
+# Number of writes after which the running totals are checked against a full scan (0 disables)
+RECONCILE_INTERVAL = 1000
+
+# Number of in-place replacements remembered for replaced_since
+REPLACED_LOG_SIZE = 64
+
+def compute_category_totals(transactions):
+    """
+    Computes the per-category counts and sums of a list of transactions.
+
+    Parameters:
+        transactions (iterable of Transaction): The transactions.
+
+    Returns:
+        dict: Category name to [count, income cents, expense cents].
+    """
+    totals = {}
+    for txn in transactions:
+        cents = txn.amount_cents
+        entry = totals.setdefault(txn.category, [0, 0, 0])
+        entry[0] += 1
+        if cents >= 0:
+            entry[1] += cents
+        else:
+            entry[2] += cents
+    return totals
+
+def totals_from_categories(category_totals):
+    """
+    Sums per-category totals into overall totals.
+
+    Parameters:
+        category_totals (dict): Category name to [count, income cents, expense cents].
+
+    Returns:
+        tuple: Total income, total expenses, and net balance.
+    """
+    income_cents = sum(entry[1] for entry in category_totals.values())
+    expenses_cents = sum(entry[2] for entry in category_totals.values())
+    return income_cents / 100, expenses_cents / 100, (income_cents + expenses_cents) / 100
+
+def date_key(date_str):
+    """
+    Converts a DD/MM/YYYY date into a sortable YYYY-MM-DD key.
+
+    Parameters:
+        date_str (str): The date in DD/MM/YYYY format.
+
+    Returns:
+        str or None: The date as YYYY-MM-DD, or None if it can't be parsed.
+    """
+    date_value = parse_date(date_str)
+    if date_value is None:
+        return None
+    return f"{date_value // 10000:04d}-{date_value // 100 % 100:02d}-{date_value % 100:02d}"
+
+def matches_filter(txn, category=None, start_value=None, end_value=None):
+    """
+    Checks a transaction against optional category and date range filters.
+
+    Parameters:
+        txn (Transaction): The transaction.
+        category (str): Only match this category, if given.
+        start_value (int): Only match dates on or after this YYYYMMDD date, if given.
+        end_value (int): Only match dates on or before this YYYYMMDD date, if given.
+
+    Returns:
+        bool: True if the transaction matches every given filter.
+    """
+    if category is not None and txn.category != category:
+        return False
+    if start_value is not None and txn.date_value < start_value:
+        return False
+    if end_value is not None and txn.date_value > end_value:
+        return False
+    return True
+
+def parse_records(reader, category=None, start_value=None, end_value=None, malformed=None):
+    """
+    Parses CSV records into transactions, skipping records that don't match the filters
+    before doing any conversion.
+
+    Malformed records are reported and skipped.
+
+    Parameters:
+        reader (csv.reader): A reader positioned at the header row.
+        category (str): Only yield this category, if given.
+        start_value (int): Only yield dates on or after this YYYYMMDD date, if given.
+        end_value (int): Only yield dates on or before this YYYYMMDD date, if given.
+        malformed (list): If given, the malformed records are appended to it as
+            (number of transactions yielded before it, list of fields) tuples.
+
+    Yields:
+        Transaction: The parsed transactions, in file order.
+    """
+    header = next(reader, None)
+    if header is None:
+        return
+    order = [header.index(name) for name in FIELDNAMES]
+    category_column = header.index('Category')
+    date_column = header.index('Date')
+    filter_dates = start_value is not None or end_value is not None
+    parsed = 0
+
+    for record in reader:
+        if not record:
+            continue
+        try:
+            if category is not None and record[category_column] != category:
+                continue
+            if filter_dates:
+                date_value = parse_date(record[date_column])
+                if date_value is None or (start_value is not None and date_value < start_value) \
+                        or (end_value is not None and date_value > end_value):
+                    continue
+            txn = Transaction.from_fields([record[index] for index in order])
+        except (IndexError, ValueError) as e:
+            print(f"Skipping malformed transaction on line {reader.line_num}: {e}")
+            if malformed is not None:
+                malformed.append((parsed, record))
+            continue
+        parsed += 1
+        yield txn
+
+class TransactionStore:
+    """
+    Process-wide in-memory copy of the transactions file.
+
+    The file is parsed once and every read is served from memory. The file's
+    modification time and size are remembered after each load or write, and the
+    file is only re-parsed when either of them changes on disk.
+
+    The next free ID and the running per-category totals are persisted in a
+    sidecar metadata file next to the transactions file, together with the stamp
+    of the file they were computed for, so that IDs can be allocated and totals
+    shown without parsing the file at all. Writes update the totals by delta.
+
+    Rows are indexed by ID, and the byte span of every record is indexed on the
+    first in-place update. A record that doesn't grow is overwritten where it
+    stands, with the slack padded as trailing spaces in the last (ID) column.
+
+    A columnar snapshot of the file (see columnar_store) is kept next to it.
+    When the snapshot was written from the file currently on disk, loading maps
+    the snapshot instead of parsing the CSV, and reports read its columns directly.
+
+    Records that can't be parsed are left out of the transactions but kept
+    verbatim, and written back in about the same place whenever the whole file
+    is rewritten. A file with such records gets no snapshot, which couldn't
+    hold them, so it is always parsed.
+
+    Attributes:
+        malformed (list of tuple): The records of the file that can't be parsed, as
+            (number of transactions before it, list of fields) tuples.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): Path to the transactions CSV file.
+        """
+        self.path = path
+        self.meta_path = os.path.splitext(path)[0] + '.meta.json'
+        self.snapshot_path = os.path.splitext(path)[0] + '.ledger'
+        self._snapshot = None
+        self._rows = []
+        self.malformed = []
+        self._stamp = None
+        self._positions = {}
+        self._spans = None
+        # Aggregates and the file stamp they belong to, which may be known without the rows
+        self._next_id = None
+        self._totals = None
+        self._aggregates_stamp = None
+        self._writes_since_reconcile = 0
+        # Incremented whenever the transactions change, for caches derived from them
+        self.generation = 0
+        # Generation to the position of the row it replaced in place, for the last writes that only did that
+        self._replaced = {}
+
+    def _file_stamp(self):
+        """
+        Returns:
+            tuple or None: The file's (mtime_ns, size), or None if it doesn't exist.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        """
+        Returns the cached transactions, re-parsing the file only if it changed on disk.
+
+        Returns:
+            list of Transaction: The cached transactions. Callers must not mutate them.
+        """
+        stamp = self._file_stamp()
+        if not self._is_fresh(stamp):
+            ledger = self.snapshot(stamp)
+            malformed = []
+            if ledger is not None:
+                rows = ledger.to_transactions()
+            else:
+                with open(self.path, mode='r', newline='') as file:
+                    rows = list(parse_records(csv.reader(file), malformed=malformed))
+            self.malformed = malformed
+            self._rows = rows
+            self._stamp = stamp
+            self.generation += 1
+            self._reindex()
+            self._totals = compute_category_totals(rows)
+            self._aggregates_stamp = stamp
+            self._save_meta()
+            if ledger is None and not malformed:
+                self._write_snapshot(rows, stamp)
+        return self._rows
+
+    def snapshot(self, stamp=None):
+        """
+        Returns the columnar snapshot if it was written from the file currently on disk.
+
+        Parameters:
+            stamp (tuple): The current file stamp, if already known.
+
+        Returns:
+            columnar_store.ColumnarLedger or None: The memory-mapped snapshot, or None if it is missing or stale.
+        """
+        import columnar_store
+
+        stamp = stamp if stamp is not None else self._file_stamp()
+        if stamp is None:
+            return None
+        if self._snapshot is None or self._snapshot.source_stamp != stamp:
+            self._snapshot = columnar_store.open_ledger(self.snapshot_path, stamp)
+        return self._snapshot
+
+    def _write_snapshot(self, rows, stamp):
+        """
+        Writes a columnar snapshot of the given rows for the file with the given stamp.
+        """
+        import columnar_store
+
+        try:
+            columnar_store.write_ledger(self.snapshot_path, rows, stamp)
+        except OSError as e:
+            # The snapshot is only an accelerator, the CSV file stays authoritative
+            print(f"Error saving columnar snapshot: {e}")
+
+    def save_snapshot(self):
+        """
+        Brings the columnar snapshot up to date with the file, if the cache is current and the snapshot isn't.
+        """
+        stamp = self._file_stamp()
+        if self._is_fresh(stamp) and not self.malformed and self.snapshot(stamp) is None:
+            self._write_snapshot(self._rows, stamp)
+
+    def _reindex(self):
+        """
+        Rebuilds the ID index and the next free ID from the cached rows.
+        """
+        positions = {}
+        for index, row in enumerate(self._rows):
+            positions.setdefault(row.id, index)
+        self._positions = positions
+        self._next_id = max(positions, default=-1) + 1
+        self._spans = None
+
+    def position(self, transaction_id):
+        """
+        Looks up the row index of a transaction.
+
+        Parameters:
+            transaction_id (int): The ID of the transaction.
+
+        Returns:
+            int or None: The index of the row in load(), or None if the ID doesn't exist.
+        """
+        self.load()
+        return self._positions.get(transaction_id)
+
+    def _is_fresh(self, stamp):
+        """
+        Returns:
+            bool: True if the cache matches the file with the given stamp.
+        """
+        return stamp is not None and stamp == self._stamp
+
+    def invalidate(self):
+        """
+        Forces the next load to re-parse the file.
+        """
+        self._stamp = None
+        self._positions = {}
+        self._spans = None
+        self._aggregates_stamp = None
+
+    @staticmethod
+    def _format_row(row):
+        """
+        Returns:
+            str: The transaction as a CSV record, without the line terminator.
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='').writerow(row.to_fields())
+        return buffer.getvalue()
+
+    def _record_spans(self):
+        """
+        Returns the (offset, length) in bytes of every record in the file, excluding line terminators.
+
+        The spans are computed on first use and kept up to date by appends and in-place updates.
+
+        Returns:
+            list of tuple or None: One span per cached row, or None if they can't be matched up.
+        """
+        if self._spans is not None:
+            return self._spans
+
+        with open(self.path, mode='rb') as file:
+            data = file.read()
+
+        spans = []
+        header_end = data.find(b'\n')
+        start = header_end + 1 if header_end != -1 else len(data)
+        while start < len(data):
+            end = data.find(b'\n', start)
+            if end == -1:
+                end = len(data)
+            # A newline inside a quoted field doesn't end the record
+            while data.count(b'"', start, end) % 2 and end < len(data):
+                end = data.find(b'\n', end + 1)
+                if end == -1:
+                    end = len(data)
+            record_end = end - 1 if end > start and data[end - 1:end] == b'\r' else end
+            if record_end > start:
+                spans.append((start, record_end - start))
+            start = end + 1
+
+        if len(spans) != len(self._rows):
+            return None
+        self._spans = spans
+        return spans
+
+    def _read_meta(self):
+        """
+        Returns:
+            dict or None: The sidecar metadata, or None if it is missing or unreadable.
+        """
+        try:
+            with open(self.meta_path, mode='r') as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return meta if isinstance(meta, dict) else None
+
+    def _save_meta(self):
+        """
+        Persists the next free ID and the running totals together with the stamp of the file they belong to.
+        """
+        stamp = self._aggregates_stamp
+        if stamp is None or self._next_id is None or self._totals is None:
+            return
+        meta = {
+            'next_id': self._next_id,
+            'mtime_ns': stamp[0],
+            'size': stamp[1],
+            'category_totals': self._totals,
+        }
+        temp_path = self.meta_path + '.tmp'
+        try:
+            with open(temp_path, mode='w') as file:
+                json.dump(meta, file)
+            os.replace(temp_path, self.meta_path)
+        except OSError as e:
+            # The metadata is only an accelerator, it is rebuilt from the data if missing
+            print(f"Error saving transactions metadata: {e}")
+
+    def _ensure_aggregates(self):
+        """
+        Makes sure the next free ID and the running totals match the file currently on disk.
+
+        The persisted values are only trusted if they were saved for the exact
+        file on disk, otherwise they are recomputed from the data.
+        """
+        stamp = self._file_stamp()
+        if stamp is not None and stamp == self._aggregates_stamp:
+            return
+
+        meta = self._read_meta()
+        if meta and stamp is not None and [meta.get('mtime_ns'), meta.get('size')] == list(stamp):
+            next_id = meta.get('next_id')
+            totals = meta.get('category_totals')
+            if isinstance(next_id, int) and next_id >= 0 and isinstance(totals, dict):
+                self._next_id = next_id
+                self._totals = totals
+                self._aggregates_stamp = stamp
+                return
+
+        self.invalidate()
+        self.load()
+
+    def next_id(self):
+        """
+        Returns the next free ID without parsing the file when possible.
+
+        Returns:
+            int: The next free ID.
+        """
+        self._ensure_aggregates()
+        return self._next_id
+
+    def _apply_delta(self, row, sign):
+        """
+        Adds (sign=1) or subtracts (sign=-1) a transaction from the running totals.
+        """
+        cents = row.amount_cents
+        entry = self._totals.setdefault(row.category, [0, 0, 0])
+        entry[0] += sign
+        if cents >= 0:
+            entry[1] += sign * cents
+        else:
+            entry[2] += sign * cents
+        if entry[0] == 0:
+            del self._totals[row.category]
+
+    def _after_write(self):
+        """
+        Persists the aggregates after a write and reconciles them every RECONCILE_INTERVAL writes.
+        """
+        self.generation += 1
+        self._writes_since_reconcile += 1
+        if RECONCILE_INTERVAL and self._writes_since_reconcile >= RECONCILE_INTERVAL \
+                and self._is_fresh(self._file_stamp()):
+            self.reconcile_totals()
+        else:
+            self._save_meta()
+
+    def append(self, row):
+        """
+        Appends a single transaction to the file and the cache.
+
+        Parameters:
+            row (Transaction): The transaction.
+        """
+        self.extend([row])
+
+    def extend(self, rows):
+        """
+        Appends several transactions to the file and the cache in a single write.
+
+        The file is not parsed if the cache is cold; the rows are simply appended
+        and the cache is left to be loaded on the next read.
+
+        Parameters:
+            rows (list of Transaction): The transactions.
+        """
+        if not rows:
+            return
+        self._ensure_aggregates()
+        stamp = self._file_stamp()
+        was_fresh = self._is_fresh(stamp)
+        records = [self._format_row(row).encode(FILE_ENCODING) for row in rows]
+
+        with open(self.path, mode='ab') as file:
+            file.write(b''.join(record + b'\r\n' for record in records))
+
+        new_stamp = self._file_stamp()
+        if was_fresh:
+            offset = stamp[1]
+            for row, record in zip(rows, records):
+                if self._spans is not None:
+                    self._spans.append((offset, len(record)))
+                offset += len(record) + 2
+                self._positions.setdefault(row.id, len(self._rows))
+                self._rows.append(row)
+            self._stamp = new_stamp
+        for row in rows:
+            self._next_id = max(self._next_id, row.id + 1)
+            self._apply_delta(row, 1)
+        self._aggregates_stamp = new_stamp
+        self._after_write()
+
+    def rewrite(self, rows, totals=None):
+        """
+        Replaces the whole file and the cache with the given transactions.
+
+        The rows are written to a temporary file that then replaces the old one,
+        so the file on disk is either entirely old or entirely new. Records of the
+        file that can't be parsed are written back among them, see malformed.
+
+        Parameters:
+            rows (list of Transaction): The transactions to write.
+            totals (dict): The category totals of the rows if already known, recomputed otherwise.
+        """
+        temp_path = self.path + '.tmp'
+        try:
+            with open(temp_path, mode='w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(FIELDNAMES)
+                written = 0
+                for before, record in self.malformed:
+                    before = min(before, len(rows))
+                    writer.writerows(row.to_fields() for row in rows[written:before])
+                    writer.writerow(record)
+                    written = before
+                writer.writerows(row.to_fields() for row in rows[written:])
+            os.replace(temp_path, self.path)
+        except OSError:
+            self.invalidate()
+            raise
+        self._rows = rows
+        self.malformed = [(min(before, len(rows)), record) for before, record in self.malformed]
+        self._stamp = self._file_stamp()
+        self._reindex()
+        self._totals = totals if totals is not None else compute_category_totals(rows)
+        self._aggregates_stamp = self._stamp
+        self._after_write()
+
+    def update(self, index, row):
+        """
+        Replaces a single transaction, in place on disk when the record doesn't grow.
+
+        Falls back to rewriting the whole file if the new record is longer than
+        the old one or the record spans can't be determined.
+
+        Parameters:
+            index (int): The index of the row in load().
+            row (Transaction): The new transaction, with the same ID as the old one.
+        """
+        rows = self.load()
+        spans = self._record_spans()
+        record = self._format_row(row).encode(FILE_ENCODING)
+
+        self._apply_delta(rows[index], -1)
+        self._apply_delta(row, 1)
+
+        if spans is None or len(record) > spans[index][1]:
+            rows[index] = row
+            self.rewrite(rows, self._totals)
+            self._log_replaced(index)
+            return
+
+        offset, length = spans[index]
+        try:
+            with open(self.path, mode='r+b') as file:
+                file.seek(offset)
+                file.write(record.ljust(length, b' '))
+        except OSError:
+            self.invalidate()
+            raise
+        rows[index] = row
+        self._stamp = self._file_stamp()
+        self._aggregates_stamp = self._stamp
+        self._after_write()
+        self._log_replaced(index)
+
+    def _log_replaced(self, index):
+        """
+        Remembers that the current generation only replaced the row at the given index.
+        """
+        self._replaced[self.generation] = index
+        self._replaced.pop(self.generation - REPLACED_LOG_SIZE, None)
+
+    def replaced_since(self, generation):
+        """
+        Tells which rows were replaced since a generation, if that is all that changed.
+
+        Parameters:
+            generation (int): A past value of the generation attribute.
+
+        Returns:
+            list of int or None: The positions of the rows replaced in place, ascending,
+                or None if the transactions changed in any other way.
+        """
+        replaced = set()
+        for past in range(generation + 1, self.generation + 1):
+            if past not in self._replaced:
+                return None
+            replaced.add(self._replaced[past])
+        return sorted(replaced)
+
+    def get(self, transaction_id):
+        """
+        Parameters:
+            transaction_id (int): The ID of the transaction.
+
+        Returns:
+            Transaction or None: The transaction, or None if the ID doesn't exist.
+        """
+        index = self.position(transaction_id)
+        return None if index is None else self._rows[index]
+
+    def replace(self, transaction_id, row):
+        """
+        Replaces a transaction, in place on disk when possible.
+
+        Parameters:
+            transaction_id (int): The ID of the transaction to replace.
+            row (Transaction): The new transaction.
+
+        Returns:
+            bool: True if the transaction was replaced, False if the ID doesn't exist.
+        """
+        index = self.position(transaction_id)
+        if index is None:
+            return False
+        self.update(index, row)
+        return True
+
+    def remove(self, transaction_ids, renumber=False):
+        """
+        Removes several transactions in a single pass and a single write.
+
+        Parameters:
+            transaction_ids (iterable of int): The IDs of the transactions to remove.
+            renumber (bool): If True, the remaining IDs are renumbered sequentially in the same write.
+
+        Returns:
+            list of int: The requested IDs that could not be found, in the order they were given.
+        """
+        requested = list(dict.fromkeys(transaction_ids))
+        wanted = set(requested)
+        transactions = self.load()
+
+        found = set()
+        filtered_transactions = []
+        for txn in transactions:
+            if txn.id in wanted:
+                found.add(txn.id)
+                self._apply_delta(txn, -1)
+            else:
+                filtered_transactions.append(txn)
+
+        missing = [txn_id for txn_id in requested if txn_id not in found]
+        if not found:
+            # Nothing removed, so the IDs are as sequential as they were
+            return missing
+
+        if renumber:
+            # Cached rows are shared with readers, so renumbered rows are copies
+            for index, txn in enumerate(filtered_transactions):
+                if txn.id != index:
+                    filtered_transactions[index] = txn = txn.copy()
+                    txn.id = index
+
+        self.rewrite(filtered_transactions, self._totals)
+        return missing
+
+    def recategorize(self, names, new_name):
+        """
+        Moves every transaction of some categories to another one, in a single pass and a single write.
+
+        Parameters:
+            names (iterable of str): The categories to move, matched ignoring case.
+            new_name (str): The category to move them to.
+
+        Returns:
+            int: The number of transactions moved.
+        """
+        lowered = {name.lower() for name in names}
+        new_code = category_code(new_name)
+        codes = {code for code, name in enumerate(CATEGORY_NAMES) if name.lower() in lowered and code != new_code}
+        if not codes:
+            return 0
+
+        # Cached rows are shared with readers, so moved rows are copies
+        transactions = self.load()
+        moved = 0
+        updated = []
+        for txn in transactions:
+            if txn.category_code in codes:
+                txn = txn.copy()
+                txn.category_code = new_code
+                moved += 1
+            updated.append(txn)
+        if moved:
+            self.rewrite(updated)
+        return moved
+
+    def category_counts(self):
+        """
+        Returns:
+            dict: Category name to the number of transactions, from the running totals.
+        """
+        self._ensure_aggregates()
+        return {category: entry[0] for category, entry in self._totals.items()}
+
+    def renumber(self):
+        """
+        Renumbers the IDs sequentially from 0, skipping the write if they already are.
+        """
+        transactions = self.load()
+        if all(txn.id == index for index, txn in enumerate(transactions)):
+            return
+
+        # Cached rows are shared with readers, so renumbered rows are copies
+        rows = list(transactions)
+        for index, txn in enumerate(rows):
+            if txn.id != index:
+                rows[index] = txn = txn.copy()
+                txn.id = index
+        self.rewrite(rows, self._totals)
+
+    def iter_rows(self, category=None, start_date=None, end_date=None):
+        """
+        Yields the transactions matching a category and/or an inclusive date range.
+
+        If the cache is up to date the rows come from memory. Otherwise the columnar
+        snapshot or the file is streamed without loading it into the cache, and
+        records are filtered before they are converted.
+
+        Parameters:
+            category (str): Only yield this category, if given.
+            start_date (str): Only yield transactions on or after this DD/MM/YYYY date, if given.
+            end_date (str): Only yield transactions on or before this DD/MM/YYYY date, if given.
+
+        Yields:
+            Transaction: The matching transactions, in file order.
+        """
+        start_value = parse_date(start_date) if start_date else None
+        end_value = parse_date(end_date) if end_date else None
+
+        stamp = self._file_stamp()
+        if self._is_fresh(stamp):
+            for txn in self._rows:
+                if matches_filter(txn, category, start_value, end_value):
+                    yield txn
+            return
+
+        ledger = self.snapshot(stamp)
+        if ledger is not None:
+            yield from ledger.iter_transactions(category, start_value, end_value)
+            return
+
+        with open(self.path, mode='r', newline='') as file:
+            yield from parse_records(csv.reader(file), category, start_value, end_value)
+
+    def query(self, category=None, start_date=None, end_date=None):
+        """
+        Returns the transactions matching a category and/or an inclusive date range.
+
+        Parameters:
+            category (str): Only return this category, if given.
+            start_date (str): Only return transactions on or after this DD/MM/YYYY date, if given.
+            end_date (str): Only return transactions on or before this DD/MM/YYYY date, if given.
+
+        Returns:
+            list of Transaction: The matching transactions.
+        """
+        return list(self.iter_rows(category, start_date, end_date))
+
+    def totals(self, category=None, start_date=None, end_date=None):
+        """
+        Calculates the totals of the transactions matching the given filters.
+
+        Unfiltered and per-category totals come from the running totals, date ranges need a scan.
+
+        Parameters:
+            category (str): Only count this category, if given.
+            start_date (str): Only count transactions on or after this DD/MM/YYYY date, if given.
+            end_date (str): Only count transactions on or before this DD/MM/YYYY date, if given.
+
+        Returns:
+            tuple: Total income, total expenses, and net balance.
+        """
+        if not start_date and not end_date:
+            if category is None:
+                return self.running_totals()
+            return self.category_totals().get(category, (0.0, 0.0, 0.0))
+        return calculate_totals(self.iter_rows(category, start_date, end_date))
+
+    def running_totals(self):
+        """
+        Returns:
+            tuple: Total income, total expenses, and net balance from the running totals.
+        """
+        self._ensure_aggregates()
+        return totals_from_categories(self._totals)
+
+    def category_totals(self):
+        """
+        Returns:
+            dict: Category name to (income, expenses, net balance) from the running totals.
+        """
+        self._ensure_aggregates()
+        return {
+            category: totals_from_categories({category: entry})
+            for category, entry in self._totals.items()
+        }
+
+    def reconcile_totals(self):
+        """
+        Recomputes the running totals from a full scan and stores the result.
+
+        Returns:
+            bool: True if the running totals matched the scan, False if they had to be corrected.
+        """
+        self._ensure_aggregates()
+        running = self._totals
+        rows = self.load()
+        scanned = compute_category_totals(rows)
+        matched = scanned == running
+        if not matched:
+            print("Running totals were out of date and have been corrected.")
+        self._totals = scanned
+        self._aggregates_stamp = self._stamp
+        self._writes_since_reconcile = 0
+        self._save_meta()
+        return matched
+
+# Shared store instance, see get_store()
+_store = None
+
+def get_store():
+    """
+    Returns the process-wide transaction store for the configured backend.
+
+    The store is recreated if TRANSACTIONS_FILE or STORAGE_BACKEND was changed.
+
+    Returns:
+        TransactionStore or sqlite_store.SQLiteTransactionStore: The shared store.
+    """
+    global _store
+    if STORAGE_BACKEND == 'sqlite':
+        import sqlite_store
+        if not isinstance(_store, sqlite_store.SQLiteTransactionStore) or _store.path != sqlite_store.DATABASE_FILE:
+            _store = sqlite_store.SQLiteTransactionStore(sqlite_store.DATABASE_FILE)
+    elif STORAGE_BACKEND == 'csv':
+        if not isinstance(_store, TransactionStore) or _store.path != TRANSACTIONS_FILE:
+            _store = TransactionStore(TRANSACTIONS_FILE)
+    else:
+        raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}. Expected 'csv' or 'sqlite'.")
+    return _store
+
 def initialize_transactions_file():
     """
-    Initializes the transactions CSV file with headers if it doesn't exist.
+    Initializes the transactions storage.
+
+    For the CSV backend this creates the file with headers if it doesn't exist,
+    for the SQLite backend it creates the database schema.
     """
+    if STORAGE_BACKEND == 'sqlite':
+        get_store().initialize()
+        return
+
     if not os.path.exists(TRANSACTIONS_FILE):
         with open(TRANSACTIONS_FILE, mode='w', newline='') as file:
             writer = csv.writer(file)
-            writer.writerow(['Amount', 'Description', 'Date', 'Category', "ID"])
+            writer.writerow(FIELDNAMES)
+
+def save_snapshot():
+    """
+    Updates the columnar snapshot of the transactions so the next start doesn't need to parse the CSV file.
+
+    Only the CSV backend keeps a snapshot; for other backends this does nothing.
+    """
+    get_store().save_snapshot()
 
 def generate_unique_id():
     """
     Generates a unique ID based on the highest existing ID in the file.
 
+    The value comes from the store's persisted counter, so the file is not parsed
+    unless it was changed outside of the application.
+
     Returns:
         int: The next unique ID.
     """
-    transactions = read_transactions()
-    if not transactions:
-        return 0
-    return max(int(txn['ID']) for txn in transactions) + 1
+    return get_store().next_id()
 
 def add_transaction(amount, description, date, category):
     """
@@ -35,24 +899,116 @@ def add_transaction(amount, description, date, category):
     Parameters:
         amount (float): The amount of the transaction (positive for income, negative for expenses).
         description (str): Description of the transaction.
-        date (str): Date of the transaction in YYYY-MM-DD format.
+        date (str): Date of the transaction in DD/MM/YYYY format.
         category (str): Category of the transaction.
+
+    Raises:
+        ValueError: If the date is not in DD/MM/YYYY format.
     """
     unique_id = generate_unique_id()
-    with open(TRANSACTIONS_FILE, mode='a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([f"{amount:.2f}", description, date, category, unique_id])
+    get_store().append(Transaction.from_values(unique_id, amount, description, date, category))
 
 def read_transactions():
     """
     Reads all transactions from the CSV file.
 
+    The rows are served from the shared store and are only re-parsed when the file changed on disk.
+
+    Returns:
+        list of Transaction: A list of transactions.
+    """
+    return list(get_store().load())
+
+def get_transaction(transaction_id):
+    """
+    Looks up a transaction by its unique ID.
+
+    Parameters:
+        transaction_id (int): The ID of the transaction.
+
+    Returns:
+        Transaction or None: The transaction, or None if the ID doesn't exist.
+    """
+    return get_store().get(transaction_id)
+
+def iter_transactions(chunk_size=None, category=None, start_date=None, end_date=None):
+    """
+    Streams the transactions instead of materializing them as a list.
+
+    Filters are applied while reading, so non-matching records are skipped early.
+
+    Parameters:
+        chunk_size (int): If given, yield lists of up to this many transactions instead of single ones.
+        category (str): Only yield this category, if given.
+        start_date (str): Only yield transactions on or after this DD/MM/YYYY date, if given.
+        end_date (str): Only yield transactions on or before this DD/MM/YYYY date, if given.
+
+    Yields:
+        Transaction or list of Transaction: The matching transactions, one at a time or in chunks.
+    """
+    rows = get_store().iter_rows(category, start_date, end_date)
+    if not chunk_size:
+        yield from rows
+        return
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def query_transactions(category=None, start_date=None, end_date=None):
+    """
+    Reads the transactions matching a category and/or an inclusive date range.
+
+    With the SQLite backend this is an indexed query instead of a scan.
+
+    Parameters:
+        category (str): Only return this category, if given.
+        start_date (str): Only return transactions on or after this DD/MM/YYYY date, if given.
+        end_date (str): Only return transactions on or before this DD/MM/YYYY date, if given.
+
     Returns:
-        list of dict: A list of transactions where each transaction is represented as a dictionary.
+        list of Transaction: The matching transactions.
     """
-    with open(TRANSACTIONS_FILE, mode='r') as file:
-        reader = csv.DictReader(file)
-        return list(reader)
+    return get_store().query(category, start_date, end_date)
+
+def edited_transaction(txn, field, new_value):
+    """
+    Returns a copy of a transaction with one field changed.
+
+    Parameters:
+        txn (Transaction): The transaction to edit.
+        field (str): The field to edit ('amount', 'description', 'date', 'category').
+        new_value: The new value for the field.
+
+    Returns:
+        Transaction: The edited copy.
+
+    Raises:
+        ValueError: If the field is unknown or the value can't be parsed.
+    """
+    txn = txn.copy()
+
+    # Update the field
+    if field == 'amount':
+        txn.amount_cents = to_cents(new_value)
+    elif field == 'description':
+        txn.description = new_value
+    elif field == 'date':
+        # Validate the date
+        date_value = parse_date(new_value)
+        if date_value is None:
+            raise ValueError(f"Invalid date format: {new_value}. Expected DD/MM/YYYY.")
+        txn.date_value = date_value
+    elif field == 'category':
+        txn.category_code = category_code(new_value)
+    else:
+        raise ValueError(f"Invalid field: {field}. Valid fields are amount, description, date, category.")
+    return txn
 
 def edit_transaction(transaction_id, field, new_value):
     """
@@ -66,86 +1022,169 @@ def edit_transaction(transaction_id, field, new_value):
     Returns:
         bool: True if the transaction was edited, False otherwise.
     """
-    transactions = read_transactions()
-    edited = False
+    store = get_store()
+    current = store.get(transaction_id)
+    if current is None:
+        return False
 
-    for txn in transactions:
-        if int(txn['ID']) == transaction_id:
-            # Update the field
-            if field == 'amount':
-                txn['Amount'] = f"{float(new_value):.2f}"
-            elif field == 'description':
-                txn['Description'] = new_value
-            elif field == 'date':
-                # Validate and format the date
-                try:
-                    day, month, year = map(int, new_value.split('/'))
-                    print(new_value)
-                    txn['Date'] = f"{day:02d}/{month:02d}/{year:04d}"
-                except ValueError:
-                    return False
-            elif field == 'category':
-                txn['Category'] = new_value
-
-            edited = True
-            break
-
-    if edited:
-        # Rewrite the CSV file with the updated transactions
-        with open(TRANSACTIONS_FILE, mode='w', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=['Amount', 'Description', 'Date', 'Category', 'ID'])
-            writer.writeheader()
-            writer.writerows(transactions)
-        return True
+    try:
+        txn = edited_transaction(current, field, new_value)
+    except ValueError:
+        return False
 
-    return False
+    # Save the updated transaction (in place on disk when the CSV record doesn't grow)
+    return store.replace(transaction_id, txn)
 
+def apply_batch(additions=(), edits=(), removals=(), renumber=False):
+    """
+    Applies several additions, edits and removals as one unit, with a single write.
 
-def calculate_totals(transactions):
+    Every change is checked before anything is written, so either all of them
+    are applied or none are. IDs in edits and removals refer to the transactions
+    as they were before the batch. Additions only are appended in one write;
+    anything else rewrites the store once.
+
+    Parameters:
+        additions (iterable of tuple): (amount, description, date, category) of every new transaction,
+            consumed once, so a generator can stream them.
+        edits (list of tuple): (transaction ID, field, new value) of every edit, applied in order.
+        removals (iterable of int): The IDs of the transactions to remove.
+        renumber (bool): If True, the IDs are renumbered sequentially in the same write.
+
+    Returns:
+        list of int: The IDs given to the added transactions, before any renumbering.
+
+    Raises:
+        ValueError: If a value can't be parsed or an ID doesn't exist. Nothing is written.
+    """
+    store = get_store()
+    next_id = store.next_id()
+    added = [Transaction.from_values(next_id + offset, *values) for offset, values in enumerate(additions)]
+    new_ids = [txn.id for txn in added]
+
+    removals = set(removals)
+    if not edits and not removals:
+        if added:
+            store.extend(added)
+        if renumber:
+            store.renumber()
+        return new_ids
+
+    # Cached rows are shared with readers, so changed rows are copies
+    rows = list(store.load())
+    positions = {txn.id: index for index, txn in enumerate(rows)}
+    for transaction_id, field, new_value in edits:
+        index = positions.get(transaction_id)
+        if index is None:
+            raise ValueError(f"Transaction with ID {transaction_id} could not be found.")
+        rows[index] = edited_transaction(rows[index], field, new_value)
+    missing = sorted(removals.difference(positions))
+    if missing:
+        raise ValueError(f"Transactions could not be found: {', '.join(map(str, missing))}")
+
+    rows = [txn for txn in rows if txn.id not in removals]
+    rows.extend(added)
+    if renumber:
+        for index, txn in enumerate(rows):
+            if txn.id != index:
+                rows[index] = txn = txn.copy()
+                txn.id = index
+    store.rewrite(rows)
+    return new_ids
+
+def calculate_totals(transactions=None):
     """
     Calculates total income, total expenses, and net balance.
 
     Parameters:
-        transactions (list of dict): The list of transactions.
+        transactions (iterable of Transaction): The transactions, e.g. a list or iter_transactions().
+            If omitted, the store's running totals are returned without scanning the transactions.
 
     Returns:
         tuple: Total income, total expenses, and net balance.
     """
-    total_income = 0.0
-    total_expenses = 0.0
+    if transactions is None:
+        return get_store().running_totals()
+
+    income_cents = 0
+    expenses_cents = 0
     for txn in transactions:
-        try:
-            amount = float(txn['Amount'])
-            if amount >= 0:
-                total_income += amount
-            else:
-                total_expenses += amount
-        except (KeyError, ValueError):
-            continue
-    net_balance = total_income + total_expenses
+        if txn.amount_cents >= 0:
+            income_cents += txn.amount_cents
+        else:
+            expenses_cents += txn.amount_cents
+    total_income = income_cents / 100
+    total_expenses = expenses_cents / 100
+    net_balance = (income_cents + expenses_cents) / 100
     return total_income, total_expenses, net_balance
 
+def query_totals(category=None, start_date=None, end_date=None):
+    """
+    Calculates the totals of the transactions matching a category and/or an inclusive date range.
+
+    With the SQLite backend the sums are computed by the database.
+
+    Parameters:
+        category (str): Only count this category, if given.
+        start_date (str): Only count transactions on or after this DD/MM/YYYY date, if given.
+        end_date (str): Only count transactions on or before this DD/MM/YYYY date, if given.
+
+    Returns:
+        tuple: Total income, total expenses, and net balance.
+    """
+    return get_store().totals(category, start_date, end_date)
+
+def category_totals():
+    """
+    Returns the running per-category subtotals.
+
+    Returns:
+        dict: Category name to (income, expenses, net balance).
+    """
+    return get_store().category_totals()
+
+def reconcile_totals():
+    """
+    Verifies the running totals against a full scan of the transactions and corrects them if needed.
+
+    Returns:
+        bool: True if the running totals were correct, False if they had to be corrected.
+    """
+    return get_store().reconcile_totals()
+
 def renumber_ids():
     """
     Renumbers the IDs of all transactions sequentially, starting from 0.
 
     This function ensures that IDs are always in sequential order after any modification,
-    such as removing transactions.
+    such as removing transactions. Nothing is written if the IDs are already sequential.
 
     Returns:
         None
     """
-    transactions = read_transactions()
+    get_store().renumber()
 
-    # Assign new sequential IDs
-    for index, txn in enumerate(transactions):
-        txn['ID'] = str(index)
+def recategorize_transactions(categories, new_category):
+    """
+    Moves every transaction of some categories to another one, in a single pass over the store and a single write.
+
+    Parameters:
+        categories (iterable of str): The categories to move, matched ignoring case.
+        new_category (str): The category to move them to.
+
+    Returns:
+        int: The number of transactions moved.
+    """
+    return get_store().recategorize(categories, new_category)
+
+def category_counts():
+    """
+    Returns the number of transactions per category, from the running totals.
 
-    # Rewrite the CSV file with updated IDs
-    with open(TRANSACTIONS_FILE, mode='w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=['Amount', 'Description', 'Date', 'Category', 'ID'])
-        writer.writeheader()
-        writer.writerows(transactions)
+    Returns:
+        dict: Category name to the number of transactions.
+    """
+    return get_store().category_counts()
 
 def remove_transaction_by_id(transaction_id):
     """
@@ -157,16 +1196,17 @@ def remove_transaction_by_id(transaction_id):
     Returns:
         bool: True if a transaction was removed, False otherwise.
     """
-    transactions = read_transactions()
-    filtered_transactions = [txn for txn in transactions if int(txn['ID']) != transaction_id]
+    return not get_store().remove([transaction_id])
 
-    if len(filtered_transactions) == len(transactions):
-        # No transaction was removed
-        return False
+def remove_transactions(transaction_ids, renumber=False):
+    """
+    Removes several transactions in a single pass over the store and a single write.
 
-    # Rewrite the CSV file with the updated list
-    with open(TRANSACTIONS_FILE, mode='w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=['Amount', 'Description', 'Date', 'Category', 'ID'])
-        writer.writeheader()
-        writer.writerows(filtered_transactions)
-    return True
\ No newline at end of file
+    Parameters:
+        transaction_ids (iterable of int): The IDs of the transactions to remove.
+        renumber (bool): If True, the remaining IDs are renumbered sequentially in the same write.
+
+    Returns:
+        list of int: The requested IDs that could not be found, in the order they were given.
+    """
+    return get_store().remove(transaction_ids, renumber=renumber)
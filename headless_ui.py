@@ -0,0 +1,72 @@
+# headless_ui.py
+
+import sys
+
+from transaction_view import PAGE_SIZE, row_values
+
+class HeadlessUI:
+    """
+    Stand-in for FinanceTrackerUI that does the same formatting work without Tk.
+    """
+
+    def __init__(self):
+        self.income_rows = []
+        self.expense_rows = []
+        self.totals = None
+
+    def get_search_text(self):
+        return ""
+
+    def show_transactions(self, income, expenses):
+        # The Tk view formats one page of each list
+        self.income_rows = [row_values(txn) for txn in income[:PAGE_SIZE]]
+        self.expense_rows = [row_values(txn) for txn in expenses[:PAGE_SIZE]]
+
+    def update_totals(self, total_income, total_expenses, net_balance):
+        self.totals = (f"${total_income:.2f}", f"${abs(total_expenses):.2f}", f"${net_balance:.2f}")
+
+    def display_message(self, title, message):
+        pass
+
+    def display_error(self, title, message):
+        print(f"{title}: {message}")
+
+    def show_report(self, title, headings, rows):
+        pass
+
+class ConsoleUI(HeadlessUI):
+    """
+    FinanceTrackerUI for the terminal: messages go to stdout, errors to stderr and reports are printed as tables.
+
+    Attributes:
+        errors (int): Number of errors displayed so far.
+    """
+
+    def __init__(self, quiet=False):
+        """
+        Parameters:
+            quiet (bool): If True, only errors and reports are printed.
+        """
+        super().__init__()
+        self.quiet = quiet
+        self.errors = 0
+
+    def show_transactions(self, income, expenses):
+        # Nothing is shown in the terminal, so nothing is formatted
+        pass
+
+    def display_message(self, title, message):
+        if not self.quiet:
+            print(f"{title}: {message}")
+
+    def display_error(self, title, message):
+        self.errors += 1
+        print(f"{title}: {message}", file=sys.stderr)
+
+    def show_report(self, title, headings, rows):
+        rows = [[str(value) for value in row] for row in rows]
+        widths = [max([len(heading)] + [len(row[index]) for row in rows]) for index, heading in enumerate(headings)]
+        print(title)
+        print("  ".join(heading.ljust(width) for heading, width in zip(headings, widths)))
+        for row in rows:
+            print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
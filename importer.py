@@ -0,0 +1,403 @@
+# importer.py
+
+import csv
+import os
+import re
+from collections import Counter
+from datetime import date
+
+import categories_manager
+import file_manager
+from local_interpreter import CATEGORY_SYNONYMS, FALLBACK_CATEGORY
+from transaction import to_cents
+
+# Bank export formats by file extension
+IMPORT_FORMATS = {'.csv': 'csv', '.txt': 'csv', '.ofx': 'ofx', '.qfx': 'ofx', '.qif': 'qif'}
+
+# Header names of the CSV columns, lowercase, by the field they hold
+COLUMN_NAMES = {
+    'amount': ['amount', 'value', 'sum', 'transaction amount', 'amount (eur)', 'amount (usd)', 'amount (gbp)'],
+    'debit': ['debit', 'debit amount', 'withdrawal', 'withdrawals', 'paid out', 'money out', 'out'],
+    'credit': ['credit', 'credit amount', 'deposit', 'deposits', 'paid in', 'money in', 'in'],
+    'description': ['description', 'payee', 'name', 'details', 'narrative', 'memo', 'reference', 'text',
+                    'transaction description', 'merchant'],
+    'date': ['date', 'transaction date', 'posted date', 'posting date', 'booking date', 'value date'],
+    'category': ['category'],
+}
+
+# Size of the sample used to detect the CSV delimiter
+SNIFF_BYTES = 64 * 1024
+
+# Size of the blocks OFX files are read in
+OFX_BLOCK_BYTES = 1024 * 1024
+
+# Formats whose exports write numeric dates month first, e.g. Quicken's MM/DD/YY and M/D'YY in QIF
+MONTH_FIRST_FORMATS = {'qif'}
+
+# Invalid records reported individually, the rest are only counted
+MAX_REPORTED_ERRORS = 20
+
+ISO_DATE_PATTERN = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})')
+COMPACT_DATE_PATTERN = re.compile(r'^(\d{4})(\d{2})(\d{2})')
+NUMERIC_DATE_PATTERN = re.compile(r"^(\d{1,2})\s*[/.\-]\s*(\d{1,2})\s*[/.\-']\s*(\d{2}|\d{4})\b")
+AMOUNT_CHARACTERS_PATTERN = re.compile(r'[^\d.,()+\-]')
+DESCRIPTION_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+OFX_TRANSACTION_PATTERN = re.compile(r'<STMTTRN>(.*?)</STMTTRN>', re.IGNORECASE | re.DOTALL)
+OFX_FIELD_PATTERN = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+def normalize_date(text, month_first=False):
+    """
+    Converts the date formats of common bank exports into DD/MM/YYYY.
+
+    Dates are read as YYYY-MM-DD, YYYYMMDD (OFX) or numeric with separators
+    (DD/MM/YYYY, DD.MM.YYYY, DD-MM-YY, D/M'YY), day first like everywhere else
+    in the application unless month_first is set.
+
+    Parameters:
+        text (str): The date as exported.
+        month_first (bool): If True, numeric dates are read month first (MM/DD/YYYY).
+
+    Returns:
+        str or None: The date in DD/MM/YYYY format, or None if it isn't a valid date.
+    """
+    text = text.strip()
+    match = ISO_DATE_PATTERN.match(text) or COMPACT_DATE_PATTERN.match(text)
+    if match:
+        year, month, day = map(int, match.groups())
+    else:
+        match = NUMERIC_DATE_PATTERN.match(text)
+        if not match:
+            return None
+        day, month, year = map(int, match.groups())
+        if month_first:
+            day, month = month, day
+        if year < 100:
+            year += 2000
+    try:
+        date(year, month, day)
+    except ValueError:
+        return None
+    return f"{day:02d}/{month:02d}/{year:04d}"
+
+def parse_amount(text):
+    """
+    Parses an exported amount, with or without currency symbols, thousands separators or a decimal comma.
+
+    Parentheses and a trailing minus sign mark negative amounts.
+
+    Parameters:
+        text (str): The amount as exported.
+
+    Returns:
+        int or None: The amount in cents, or None if it isn't a number.
+    """
+    text = AMOUNT_CHARACTERS_PATTERN.sub('', text)
+    negative = text.startswith('(') and text.endswith(')') or text.endswith('-')
+    text = text.strip('()').rstrip('-')
+    if not text:
+        return None
+
+    # The last separator is the decimal one, unless a lone comma is followed by three digits
+    last_dot, last_comma = text.rfind('.'), text.rfind(',')
+    if last_comma > last_dot and len(text) - last_comma - 1 != 3:
+        text = text.replace('.', '').replace(',', '.')
+    else:
+        text = text.replace(',', '')
+    try:
+        cents = to_cents(text)
+    except ValueError:
+        return None
+    return -abs(cents) if negative else cents
+
+def content_key(amount_cents, date_value, description):
+    """
+    Returns the content hash duplicates are detected by.
+
+    Parameters:
+        amount_cents (int): The amount in cents.
+        date_value (int): The date as YYYYMMDD.
+        description (str): The description, compared by its words only, ignoring case.
+
+    Returns:
+        int: The hash.
+    """
+    return hash((amount_cents, date_value, ' '.join(DESCRIPTION_WORD_PATTERN.findall(description.lower()))))
+
+class CategoryMatcher:
+    """
+    Maps imported rows to the existing categories, by the category column or the description.
+    """
+
+    def __init__(self, categories):
+        """
+        Parameters:
+            categories (list of str): The existing categories.
+        """
+        self.by_lower = {category.lower(): category for category in categories}
+        # None if the fallback category isn't registered
+        self.fallback = self.by_lower.get(FALLBACK_CATEGORY.lower())
+
+        # Synonyms first so that the category names themselves win
+        words = {}
+        for category, synonyms in CATEGORY_SYNONYMS.items():
+            if category.lower() in self.by_lower:
+                for synonym in synonyms:
+                    words[synonym] = self.by_lower[category.lower()]
+        for lower, category in self.by_lower.items():
+            words[lower] = category
+            words[lower[:-1] if lower.endswith('s') else lower] = category
+        self.words = words
+        alternatives = '|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+        self.pattern = re.compile(rf"\b(?:{alternatives})\b") if words else None
+
+    def match(self, category, description):
+        """
+        Parameters:
+            category (str or None): The category given by the export, if any.
+            description (str): The description.
+
+        Returns:
+            str or None: The existing category named by the export or mentioned in the description,
+                or the fallback, None if there is no fallback category.
+        """
+        if category:
+            existing = self.by_lower.get(category.strip().lower())
+            if existing:
+                return existing
+        if self.pattern is not None:
+            match = self.pattern.search(description.lower())
+            if match:
+                return self.words[match.group(0)]
+        return self.fallback
+
+def map_columns(header):
+    """
+    Finds the columns of a CSV header by their names, see COLUMN_NAMES.
+
+    Parameters:
+        header (list of str): The header row.
+
+    Returns:
+        dict: Field name to column index, and 'description' to a list of indexes.
+
+    Raises:
+        ValueError: If there is no date, amount or description column.
+    """
+    names = [name.strip().lower() for name in header]
+    columns = {'description': []}
+    for field, candidates in COLUMN_NAMES.items():
+        for index, name in enumerate(names):
+            if name in candidates:
+                if field == 'description':
+                    columns['description'].append(index)
+                else:
+                    columns.setdefault(field, index)
+    if 'date' not in columns:
+        raise ValueError("no date column found")
+    if 'amount' not in columns and 'debit' not in columns and 'credit' not in columns:
+        raise ValueError("no amount, debit or credit column found")
+    if not columns['description']:
+        raise ValueError("no description column found")
+    return columns
+
+def read_csv_records(path):
+    """
+    Streams the records of a CSV bank export, whose first row names the columns.
+
+    Yields:
+        tuple: (line number, amount in cents or None, description, date text, category or None).
+
+    Raises:
+        ValueError: If the columns can't be identified.
+    """
+    with open(path, mode='r', newline='', encoding='utf-8-sig', errors='replace') as file:
+        sample = file.read(SNIFF_BYTES)
+        file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(file, dialect)
+        columns = map_columns(next(reader, []))
+        amount_index = columns.get('amount')
+        debit_index = columns.get('debit')
+        credit_index = columns.get('credit')
+        category_index = columns.get('category')
+        description_indexes = columns['description']
+        date_index = columns['date']
+
+        for record in reader:
+            if not any(record):
+                continue
+            try:
+                if amount_index is not None and record[amount_index].strip():
+                    cents = parse_amount(record[amount_index])
+                else:
+                    debit = parse_amount(record[debit_index]) if debit_index is not None else None
+                    credit = parse_amount(record[credit_index]) if credit_index is not None else None
+                    cents = None if debit is None and credit is None else abs(credit or 0) - abs(debit or 0)
+                description = ' '.join(record[index].strip() for index in description_indexes if record[index].strip())
+                category = record[category_index] if category_index is not None else None
+                yield reader.line_num, cents, description, record[date_index], category
+            except IndexError:
+                yield reader.line_num, None, '', '', None
+
+def read_ofx_records(path):
+    """
+    Streams the transactions of an OFX or QFX export, SGML or XML.
+
+    Yields:
+        tuple: (transaction number, amount in cents or None, description, date text, None).
+    """
+    number = 0
+    buffer = ''
+    with open(path, mode='r', encoding='utf-8', errors='replace') as file:
+        while True:
+            block = file.read(OFX_BLOCK_BYTES)
+            buffer += block
+            end = 0
+            for match in OFX_TRANSACTION_PATTERN.finditer(buffer):
+                number += 1
+                fields = {name.upper(): value.strip() for name, value in OFX_FIELD_PATTERN.findall(match.group(1))}
+                cents = parse_amount(fields.get('TRNAMT', ''))
+                name, memo = fields.get('NAME', ''), fields.get('MEMO', '')
+                description = name if not memo or memo == name else f"{name} {memo}".strip()
+                yield number, cents, description, fields.get('DTPOSTED', ''), None
+                end = match.end()
+            buffer = buffer[end:]
+            if not block:
+                break
+
+def read_qif_records(path):
+    """
+    Streams the transactions of a QIF export.
+
+    Yields:
+        tuple: (line number, amount in cents or None, description, date text, category or None).
+    """
+    fields = {}
+    with open(path, mode='r', encoding='utf-8', errors='replace') as file:
+        for line_number, line in enumerate(file, start=1):
+            line = line.rstrip('\r\n')
+            if not line or line.startswith('!'):
+                continue
+            code, value = line[0], line[1:].strip()
+            if code != '^':
+                fields.setdefault(code, value)
+                continue
+            if fields:
+                cents = parse_amount(fields.get('T', fields.get('U', '')))
+                description = ' '.join(part for part in (fields.get('P', ''), fields.get('M', '')) if part)
+                # Categories in brackets are transfers between accounts
+                category = fields.get('L', '')
+                category = None if category.startswith('[') else category.split(':')[0]
+                yield line_number, cents, description, fields.get('D', ''), category
+            fields = {}
+
+def import_format_of(path):
+    """
+    Returns the format of a bank export, given by its extension.
+
+    Parameters:
+        path (str): The file to read.
+
+    Returns:
+        str: The format, one of the values of IMPORT_FORMATS.
+
+    Raises:
+        ValueError: If the format isn't supported.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    import_format = IMPORT_FORMATS.get(extension)
+    if import_format is None:
+        raise ValueError(f"Unsupported file type: {extension or path}. Expected CSV, OFX, QFX or QIF.")
+    return import_format
+
+def read_records(path):
+    """
+    Streams the records of a bank export, in the format given by its extension.
+
+    Parameters:
+        path (str): The file to read.
+
+    Returns:
+        generator: The records, see read_csv_records.
+
+    Raises:
+        ValueError: If the format isn't supported.
+    """
+    import_format = import_format_of(path)
+    if import_format == 'ofx':
+        return read_ofx_records(path)
+    if import_format == 'qif':
+        return read_qif_records(path)
+    return read_csv_records(path)
+
+def import_file(path, dry_run=False, month_first=None):
+    """
+    Imports the transactions of a bank export, skipping the ones already in the ledger.
+
+    The file is streamed record by record. A record is a duplicate while the
+    ledger has more transactions with its amount, date and description than
+    the file had so far, so importing a statement twice adds nothing while
+    identical purchases within one statement are kept. The new transactions
+    get consecutive IDs and are written with a single append, once every record
+    is read, so nothing is imported if a record can't be categorized.
+
+    Numeric dates are read day first, except in the formats of MONTH_FIRST_FORMATS
+    (QIF), whose exports write them month first.
+
+    Parameters:
+        path (str): The file to import.
+        dry_run (bool): If True, only count what would be imported.
+        month_first (bool or None): Whether numeric dates are month first, None for the
+            usual order of the file's format.
+
+    Returns:
+        dict: Counts of the 'read', 'new', 'duplicate' and 'invalid' records.
+
+    Raises:
+        ValueError: If the format isn't supported, the CSV columns can't be identified, or a record
+            matches no category while the fallback category doesn't exist.
+        OSError: If the file can't be read.
+    """
+    records = read_records(path)
+    if month_first is None:
+        month_first = import_format_of(path) in MONTH_FIRST_FORMATS
+    counts = {'read': 0, 'new': 0, 'duplicate': 0, 'invalid': 0}
+    existing = Counter(content_key(txn.amount_cents, txn.date_value, txn.description)
+                       for txn in file_manager.get_store().load())
+    matcher = CategoryMatcher(categories_manager.read_categories())
+
+    def new_rows():
+        for number, cents, description, date_text, category in records:
+            counts['read'] += 1
+            formatted_date = normalize_date(date_text, month_first)
+            description = ' '.join(description.split())
+            if cents is None or formatted_date is None or not description:
+                counts['invalid'] += 1
+                if counts['invalid'] <= MAX_REPORTED_ERRORS:
+                    print(f"Skipping invalid record {number} of {path}")
+                continue
+
+            day, month, year = formatted_date.split('/')
+            key = content_key(cents, int(year + month + day), description)
+            if existing[key] > 0:
+                existing[key] -= 1
+                counts['duplicate'] += 1
+                continue
+            counts['new'] += 1
+            matched = matcher.match(category, description)
+            if matched is None:
+                raise ValueError(f"record {number} matches no category and the fallback category "
+                                 f"'{FALLBACK_CATEGORY}' doesn't exist, add it with 'category add {FALLBACK_CATEGORY}'")
+            yield cents / 100, description, formatted_date, matched
+
+    if dry_run:
+        for _ in new_rows():
+            pass
+    else:
+        file_manager.apply_batch(additions=new_rows())
+    if counts['invalid'] > MAX_REPORTED_ERRORS:
+        print(f"Skipped {counts['invalid']} invalid records of {path}")
+    return counts
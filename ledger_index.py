@@ -0,0 +1,329 @@
+# ledger_index.py
+
+import operator
+
+import file_manager
+
+# Rows that are gone are kept in an index until there are more of them than this
+# and than rows still there, then the index is rebuilt from scratch
+MIN_COMPACT_ROWS = 1000
+
+# Content of a transaction regardless of its ID, as a whole and field by field
+content_key = operator.attrgetter('amount_cents', 'date_value', 'category_code', 'description')
+CONTENT_FIELDS = [operator.attrgetter(field) for field in ('amount_cents', 'date_value', 'category_code', 'description')]
+
+# Rows compared at once when looking for the end of a stretch of unchanged rows, to begin with
+MIN_RUN = 16
+
+# Rows looked ahead for the next unchanged row after a change, before looking it up in the whole ledger
+LOOKAHEAD = 8
+
+def same_content(old, new):
+    """
+    Checks whether two transactions only differ in their IDs, if at all.
+
+    Parameters:
+        old (Transaction): A transaction.
+        new (Transaction): Another transaction.
+
+    Returns:
+        bool: True if the amounts, dates, categories and descriptions are equal.
+    """
+    return old is new or content_key(old) == content_key(new)
+
+def same_rows(old, new):
+    """
+    Returns:
+        bool: True if the two lists of transactions only differ in their IDs, if at all.
+    """
+    return all(map(operator.is_, old, new)) \
+        or all(list(map(field, old)) == list(map(field, new)) for field in CONTENT_FIELDS)
+
+def match_rows(old, new):
+    """
+    Finds the rows of a new version of the ledger that an old version already had.
+
+    Changes keep the order of the rows: rows are edited in place, removed, or
+    appended, and renumbering only changes IDs. So the rows are matched in
+    order by content regardless of ID, and rows matching none are reported as
+    new, e.g. edited ones. Stretches of unchanged rows are compared a doubling
+    number of rows at a time, so the work done row by row is proportional to
+    the number of changed rows.
+
+    Parameters:
+        old (list of Transaction): The old rows.
+        new (list of Transaction): The new rows.
+
+    Returns:
+        tuple: (runs, added), the stretches of matching rows as (old position, new position, length)
+            tuples in order, and the positions of the new rows matching none.
+    """
+    runs = []
+    added = []
+    count = len(old)
+    total = len(new)
+    by_content = None
+    i = j = 0
+    while j < total:
+        # Find the end of the stretch of matching rows starting here, row by row
+        # for a few rows and then a doubling number of rows at a time
+        first_i, first_j = i, j
+        while i < count and j < total and i - first_i < MIN_RUN and same_content(old[i], new[j]):
+            i += 1
+            j += 1
+        size = MIN_RUN if i - first_i == MIN_RUN else 0
+        while size:
+            length = min(size, count - i, total - j)
+            if length <= 0:
+                break
+            if same_rows(old[i:i + length], new[j:j + length]):
+                i += length
+                j += length
+                size *= 2
+            else:
+                size = length // 2
+        if i > first_i:
+            runs.append((first_i, first_j, i - first_i))
+        if j == total:
+            break
+
+        if i >= count:
+            # Appended rows
+            added.extend(range(j, total))
+            break
+        if i + 1 < count and same_content(old[i + 1], new[j]):
+            # Removed row
+            i += 1
+            continue
+        edited = next((offset for offset in range(1, LOOKAHEAD + 1)
+                       if i + offset < count and j + offset < total and same_content(old[i + offset], new[j + offset])),
+                      None)
+        if edited is not None:
+            # Edited rows
+            added.extend(range(j, j + edited))
+            i += edited
+            j += edited
+            continue
+        following = list(map(content_key, old[i + 2:i + 2 + LOOKAHEAD]))
+        key = content_key(new[j])
+        if key in following:
+            # A few removed rows
+            i += 2 + following.index(key)
+        else:
+            # Many rows removed, or a row that is new
+            if by_content is None:
+                by_content = {}
+                for position in range(count - 1, -1, -1):
+                    by_content.setdefault(content_key(old[position]), []).append(position)
+            positions = by_content.get(key)
+            while positions and positions[-1] < i:
+                positions.pop()
+            if positions:
+                i = positions.pop()
+            else:
+                added.append(j)
+                j += 1
+    return runs, added
+
+class LedgerIndex:
+    """
+    Base of the indexes over the stored transactions, kept up to date by difference.
+
+    Rows are indexed in slots that are only ever appended: a new or edited row
+    gets a new slot, and the slot of a row that is gone is marked as such and
+    skipped by lookups. Slots are mapped to the current positions of their rows,
+    so renumbering and removals don't touch the indexes built on the slots.
+    Subclasses index the rows of new slots in _index_slots.
+
+    Slots below _ordered_slots have increasing positions, so lists of them in
+    slot order are in ledger order too. Slots of rows replaced in place, e.g.
+    edited ones, break that order.
+
+    Attributes:
+        transactions (list of Transaction): A copy of the indexed transactions, positions refer to this list.
+    """
+
+    def __init__(self, transactions):
+        """
+        Parameters:
+            transactions (list of Transaction): The transactions to index.
+        """
+        self.transactions = []
+        # Slot to the row it indexes, and to the position of that row or -1 once it is gone
+        self._rows = []
+        self._positions = []
+        # Position to slot
+        self._slots = []
+        self._gone = 0
+        self._ordered_slots = 0
+        self.update(transactions)
+
+    def update(self, transactions):
+        """
+        Brings the index up to date with the current transactions.
+
+        Parameters:
+            transactions (list of Transaction): The current transactions.
+
+        Returns:
+            bool: True if the index was updated, False if so many rows are gone that it should be rebuilt.
+        """
+        count = len(self.transactions)
+        runs, added = match_rows(self.transactions, transactions)
+        removed = count - sum(length for _, _, length in runs)
+        appended = not removed and runs in ([], [(0, 0, count)])
+        if self._gone + removed > max(MIN_COMPACT_ROWS, len(transactions)):
+            return False
+
+        start = len(self._rows)
+        # Slots of rows added after every other row keep the slots in ledger order
+        if self._ordered_slots == start and (not added or added[0] == len(transactions) - len(added)):
+            self._ordered_slots = start + len(added)
+        if appended:
+            self._rows.extend(transactions[count:])
+            self._slots.extend(range(start, len(self._rows)))
+            self._positions.extend(range(count, len(transactions)))
+            self.transactions.extend(transactions[count:])
+            self._index_slots(start)
+            return True
+
+        old_slots = self._slots
+        positions = self._positions
+        slots = []
+        removed_slots = []
+        old_end = 0
+        added_index = 0
+        for old_start, new_start, length in runs + [(count, len(transactions), 0)]:
+            while added_index < len(added) and added[added_index] < new_start:
+                slots.append(start + added_index)
+                added_index += 1
+            removed_slots.extend(old_slots[old_end:old_start])
+            old_end = old_start + length
+            run_slots = old_slots[old_start:old_end]
+            slots.extend(run_slots)
+            if length and old_start != new_start:
+                # Moved rows, their slots are mostly consecutive
+                first = run_slots[0]
+                if run_slots[-1] - first == length - 1 and run_slots == list(range(first, first + length)):
+                    positions[first:first + length] = range(new_start, new_start + length)
+                else:
+                    for position, slot in enumerate(run_slots, new_start):
+                        positions[slot] = position
+
+        for slot in removed_slots:
+            positions[slot] = -1
+        positions.extend(added)
+        self._gone += len(removed_slots)
+        self._rows.extend(transactions[position] for position in added)
+        self._slots = slots
+        self.transactions = list(transactions)
+        self._index_slots(start)
+        self._positions_changed(removed_slots)
+        return True
+
+    def replace(self, replaced, transactions):
+        """
+        Brings the index up to date with transactions that only differ by rows replaced in place.
+
+        Only the replaced rows get new slots, every other slot and position stays as it is.
+
+        Parameters:
+            replaced (list of int): The positions of the replaced rows, ascending.
+            transactions (list of Transaction): The current transactions.
+
+        Returns:
+            bool: True if the index was updated, False if so many rows are gone that it should be rebuilt.
+        """
+        if len(transactions) != len(self.transactions) \
+                or self._gone + len(replaced) > max(MIN_COMPACT_ROWS, len(transactions)):
+            return False
+        start = len(self._rows)
+        old_slots = []
+        for slot, position in enumerate(replaced, start):
+            old_slots.append(self._slots[position])
+            self._positions[self._slots[position]] = -1
+            self._positions.append(position)
+            self._slots[position] = slot
+            self._rows.append(transactions[position])
+            self.transactions[position] = transactions[position]
+        self._gone += len(replaced)
+        self._index_slots(start)
+        self._rows_replaced(replaced, old_slots)
+        return True
+
+    def _index_slots(self, start):
+        """
+        Indexes the rows of the slots from the given one on.
+        """
+
+    def _rows_replaced(self, replaced, old_slots):
+        """
+        Called after rows were replaced in place, once their new slots are indexed.
+
+        Parameters:
+            replaced (list of int): The positions of the replaced rows.
+            old_slots (list of int): The slots they had.
+        """
+        self._positions_changed(old_slots)
+
+    def _positions_changed(self, removed_slots):
+        """
+        Called after an update that did more than append rows, once the new rows are indexed.
+
+        Parameters:
+            removed_slots (list of int): The slots of the rows that are gone.
+        """
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def live_positions(self, slots):
+        """
+        Parameters:
+            slots (iterable of int): Slots.
+
+        Returns:
+            list of int: The positions of the rows of the slots that are still there, in the same order.
+        """
+        positions = self._positions
+        return [position for position in map(positions.__getitem__, slots) if position >= 0]
+
+class IndexCache:
+    """
+    Keeps an index of the stored transactions, updating it only after the transactions changed.
+    """
+
+    def __init__(self, index_class):
+        """
+        Parameters:
+            index_class (type): The LedgerIndex subclass, created from the transactions.
+        """
+        self.index_class = index_class
+        self.key = None
+        self.index = None
+
+    def load(self):
+        """
+        Returns the index of the stored transactions.
+
+        The index is updated by difference, see LedgerIndex, and only rebuilt for
+        another store or once most of the indexed rows are gone. Rows the store
+        only replaced in place are patched in without comparing the ledgers.
+
+        Returns:
+            LedgerIndex: The index.
+        """
+        store = file_manager.get_store()
+        transactions = store.load()
+        key = (store, store.generation)
+        if self.key is not None and self.key[0] is store:
+            if self.key[1] == store.generation:
+                return self.index
+            replaced = store.replaced_since(self.key[1])
+            if replaced is not None and self.index.replace(replaced, transactions) \
+                    or replaced is None and self.index.update(transactions):
+                self.key = key
+                return self.index
+        self.index = self.index_class(transactions)
+        self.key = key
+        return self.index
@@ -0,0 +1,235 @@
+# local_interpreter.py
+
+import re
+from datetime import date, timedelta
+
+import categories_manager
+from models import Command
+
+# Confidence at or above which a local interpretation is used instead of asking the AI
+CONFIDENCE_THRESHOLD = 0.8
+
+# Words that describe the category of a transaction, by category name.
+# Only the categories that currently exist are ever used.
+CATEGORY_SYNONYMS = {
+    'Groceries': ['grocery', 'groceries', 'supermarket', 'food shopping', 'walmart', 'costco', 'aldi', 'lidl'],
+    'Rent': ['rent', 'landlord', 'lease'],
+    'Utilities': ['utility', 'utilities', 'electricity', 'electric bill', 'power bill', 'water bill', 'gas bill',
+                  'internet', 'phone bill', 'heating'],
+    'Transportation': ['bus', 'train', 'taxi', 'uber', 'lyft', 'metro', 'subway', 'fuel', 'petrol', 'gas',
+                       'parking', 'ticket', 'tickets'],
+    'Entertainment': ['movie', 'movies', 'cinema', 'netflix', 'spotify', 'concert', 'game', 'games', 'theater'],
+    'Dining': ['lunch', 'dinner', 'breakfast', 'brunch', 'restaurant', 'coffee', 'cafe', 'takeout', 'takeaway',
+               'pizza', 'burger', 'sushi', 'drinks', 'bar'],
+    'Savings': ['savings', 'interest'],
+    'Investments': ['dividend', 'dividends', 'stock', 'stocks', 'shares', 'crypto', 'investment'],
+    'Medical': ['doctor', 'pharmacy', 'medicine', 'dentist', 'hospital', 'prescription'],
+}
+
+# Default category when nothing in the text matches, with the confidence it leaves
+FALLBACK_CATEGORY = 'Miscellaneous'
+FALLBACK_CONFIDENCE = {'income': 0.85, 'expense': 0.6}
+
+# Confidence left for entries without a verb, which are only understood when their category is recognized
+VERBLESS_CONFIDENCE = 0.95
+
+# Words that mean income even without a verb, e.g. "dividend 50"
+INCOME_WORD_PATTERN = re.compile(r"\b(?:interest|dividends?)\b")
+
+# Categories of both income and expenses, where an entry without a verb could be either, with the confidence it leaves
+TWO_WAY_CATEGORIES = {'savings', 'investments'}
+TWO_WAY_CONFIDENCE = 0.7
+
+# Words that mean the request is something other than a single new transaction
+OTHER_INTENT_WORDS = {
+    'change', 'edit', 'modify', 'update', 'fix', 'delete', 'remove', 'undo', 'rename', 'merge', 'report',
+    'category', 'categories', 'split', 'each', 'every', 'both', 'previous',
+}
+
+INCOME_PATTERN = re.compile(
+    r"\b(?:got paid|get paid|was paid|been paid|earned|earn|received|receive|made|sold|refunded|refund|"
+    r"salary|paycheck|income)\b"
+)
+EXPENSE_PATTERN = re.compile(r"\b(?:spent|spend|paid|pay|bought|buy|purchased|cost|costs)\b")
+
+AMOUNT_PATTERN = re.compile(
+    r"(?<![\w/.])[$€£]?\s?(\d{1,3}(?:,\d{3})+|\d+)(?:[.,](\d{1,2}))?\s?(?:[$€£]|dollars?|bucks|usd|eur)?(?![\w/])"
+)
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+DATE_PATTERNS = [
+    re.compile(r"\b(?:on )?(?P<day>\d{1,2})/(?P<month>\d{1,2})/(?P<year>\d{4})\b"),
+    re.compile(r"\b(?:on )?(?P<day>\d{1,2})/(?P<month>\d{1,2})\b"),
+    re.compile(r"\b(?P<ago>\d+|a|one|two|three) days? ago\b"),
+    re.compile(r"\b(?:the )?day before yesterday\b"),
+    re.compile(r"\byesterday\b"),
+    re.compile(r"\btoday\b|\bthis (?:morning|afternoon|evening)\b|\btonight\b"),
+    re.compile(r"\b(?P<relative>on|last|this past) (?P<weekday>" + "|".join(WEEKDAYS) + r")\b"),
+    re.compile(r"\bon the (?P<ordinal>\d{1,2})(?:st|nd|rd|th)?\b"),
+]
+
+WORD_NUMBERS = {'a': 1, 'one': 1, 'two': 2, 'three': 3}
+
+# Filler words trimmed from both ends of a description
+FILLER_WORDS = {
+    'i', "i've", 'ive', 'we', 'just', 'on', 'for', 'at', 'in', 'a', 'an', 'the', 'my', 'some', 'from', 'to',
+    'of', 'worth', 'total', 'money', 'was', 'were', 'have', 'has', 'had', 'got', 'me',
+}
+
+def _resolve_date(match, today):
+    """
+    Turns a match of one of DATE_PATTERNS into a date.
+
+    Returns:
+        date or None: The date, or None if the matched text isn't a valid date.
+    """
+    groups = match.groupdict()
+    text = match.group(0)
+    try:
+        if groups.get('year'):
+            return date(int(groups['year']), int(groups['month']), int(groups['day']))
+        if groups.get('month'):
+            return date(today.year, int(groups['month']), int(groups['day']))
+        if groups.get('ago'):
+            ago = groups['ago']
+            return today - timedelta(days=int(ago) if ago.isdigit() else WORD_NUMBERS[ago])
+        if groups.get('weekday'):
+            days_back = (today.weekday() - WEEKDAYS.index(groups['weekday'])) % 7
+            if groups['relative'] != 'on' and days_back == 0:
+                days_back = 7
+            return today - timedelta(days=days_back)
+        if groups.get('ordinal'):
+            day = int(groups['ordinal'])
+            if day > today.day:
+                month_start = today.replace(day=1) - timedelta(days=1)
+                return month_start.replace(day=day)
+            return today.replace(day=day)
+    except ValueError:
+        return None
+    if 'before yesterday' in text:
+        return today - timedelta(days=2)
+    if 'yesterday' in text:
+        return today - timedelta(days=1)
+    return today
+
+def _find_category(text, categories):
+    """
+    Finds the category a text mentions, by name or by synonym.
+
+    Returns:
+        tuple: (category name, confidence) or (None, 0.0) if none is mentioned.
+    """
+    by_lower = {category.lower(): category for category in categories}
+    for lower, category in by_lower.items():
+        singular = lower[:-1] if lower.endswith('s') else lower
+        if re.search(rf"\b(?:{re.escape(lower)}|{re.escape(singular)})\b", text):
+            return category, 1.0
+
+    for category, synonyms in CATEGORY_SYNONYMS.items():
+        if category.lower() not in by_lower:
+            continue
+        for synonym in synonyms:
+            if re.search(rf"\b{re.escape(synonym)}\b", text):
+                return by_lower[category.lower()], 0.9
+    return None, 0.0
+
+def _clean_description(text):
+    """
+    Trims filler words and punctuation from both ends of the leftover text.
+
+    Returns:
+        str: The description with its first letter in uppercase, or '' if nothing is left.
+    """
+    words = re.sub(r"[^\w'&\- ]+", ' ', text).split()
+    while words and words[0] in FILLER_WORDS:
+        words.pop(0)
+    while words and words[-1] in FILLER_WORDS:
+        words.pop()
+    description = ' '.join(words)
+    return description[:1].upper() + description[1:]
+
+def interpret(user_input, categories=None, today=None):
+    """
+    Interprets a simple natural language entry, such as "spent 12.50 on lunch" or
+    "got paid 2000 yesterday", without the AI.
+
+    Only single income or expense entries are understood. Anything that looks
+    like more than one transaction, or like an edit, removal or other command,
+    is left to the AI.
+
+    Parameters:
+        user_input (str): The natural language command entered by the user.
+        categories (list of str): The valid categories, defaults to categories_manager.read_categories().
+        today (date): The date relative dates are resolved against, defaults to today.
+
+    Returns:
+        tuple: (List[Command], confidence between 0 and 1), or (None, 0.0) if the entry isn't understood.
+    """
+    text = ' '.join(user_input.lower().split())
+    if not text or set(re.findall(r"[a-z]+", text)) & OTHER_INTENT_WORDS:
+        return None, 0.0
+
+    # Date, removed first so its digits aren't taken for the amount
+    today = today or date.today()
+    transaction_date = today
+    for pattern in DATE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            transaction_date = _resolve_date(match, today)
+            if transaction_date is None:
+                return None, 0.0
+            text = text[:match.start()] + ' ' + text[match.end():]
+            break
+
+    # Exactly one amount
+    amounts = list(AMOUNT_PATTERN.finditer(text))
+    if len(amounts) != 1:
+        return None, 0.0
+    match = amounts[0]
+    whole, cents = match.group(1).replace(',', ''), match.group(2) or '0'
+    amount = int(whole) + int(cents.ljust(2, '0')) / 100
+    if amount == 0:
+        return None, 0.0
+    text = text[:match.start()] + ' ' + text[match.end():]
+
+    # Direction, from the verb. Entries without one, like "coffee 4.50", are taken as expenses
+    # unless they name a kind of income, like "interest 12.40"
+    income = INCOME_PATTERN.search(text)
+    verb = income or EXPENSE_PATTERN.search(text)
+    direction = 'income' if income or (not verb and INCOME_WORD_PATTERN.search(text)) else 'expense'
+    verb_text = ''
+    confidence = 1.0
+    if verb:
+        verb_text = verb.group(0)
+        text = text[:verb.start()] + ' ' + text[verb.end():]
+    else:
+        confidence *= VERBLESS_CONFIDENCE
+
+    categories = categories if categories is not None else categories_manager.read_categories()
+    category, category_confidence = _find_category(' '.join([text, verb_text]), categories)
+    if category is None:
+        if not verb or FALLBACK_CATEGORY not in categories:
+            return None, 0.0
+        category, category_confidence = FALLBACK_CATEGORY, FALLBACK_CONFIDENCE[direction]
+    elif not verb and direction == 'expense' and category.lower() in TWO_WAY_CATEGORIES:
+        # "stocks 500" may as well be a sale as a purchase, left to the AI
+        category_confidence *= TWO_WAY_CONFIDENCE
+    confidence *= category_confidence
+
+    description = _clean_description(text)
+    if not description:
+        description = 'Paycheck' if 'paid' in verb_text and direction == 'income' else category
+        confidence *= 0.95
+    elif len(description.split()) > 6:
+        # Long leftovers usually mean a sentence the patterns don't really understand
+        confidence *= 0.7
+
+    command = Command(
+        command='add',
+        amount=amount if direction == 'income' else -amount,
+        description=description,
+        date=transaction_date.strftime('%d/%m/%Y'),
+        category=category,
+    )
+    return [command], confidence
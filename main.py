@@ -1,22 +1,83 @@
+import sys
+import threading
+import time
+
+# Start of the process, for --profile-startup
+START_TIME = time.perf_counter()
+
 import tkinter as tk
 from ui_handler import FinanceTrackerUI
-from commands import parse_command
+from commands import is_command, parse_command
 import file_manager
 import categories_manager
-from ai_handler import translate_natural_language_to_commands
+import search_index
+from executor import execute_commands, execute_individual_command, refresh_ui
 from tkinter import messagebox
 
-def main():
+# The AI modules (ai_worker, ai_handler, the OpenAI SDK) are imported on first use,
+# so the window is up and usable for manual commands before they load
+IMPORTS_DONE_TIME = time.perf_counter()
+
+# Modules whose presence at first paint --profile-startup reports
+PROFILED_MODULES = ['pydantic', 'numpy', 'ai_worker', 'ai_handler', 'openai']
+
+def preload_ai_modules():
+    """
+    Imports the AI modules in the background, so the first prompt doesn't wait for them.
+    """
+    try:
+        import ai_worker
+    except Exception as e:
+        print(f"Error loading AI modules: {e}")
+
+def main(profile_startup=False):
+    """
+    Starts the application.
+
+    Parameters:
+        profile_startup (bool): If True, print import and first-paint times and quit once the window is drawn.
+    """
     # Initialize the transactions file
     file_manager.initialize_transactions_file()
     categories_manager.initialize_categories_file()
 
+    # New entries must use existing categories, point out older ones that don't
+    unknown_categories = [name for name in file_manager.category_totals()
+                          if categories_manager.canonical_category(name) is None]
+    if unknown_categories:
+        print(f"Transactions use categories that don't exist: {', '.join(unknown_categories)}")
+
     # Initialize the main Tkinter window
     root = tk.Tk()
 
     # Placeholder for UI reference
     app = None
 
+    # Queue of AI prompts, created on first use
+    ai_requests = None
+
+    def submit_ai_prompt(user_input, batch=False):
+        """
+        Queues a prompt for translation, loading the AI modules if this is the first one.
+
+        Parameters:
+            user_input (str): The natural language prompt.
+            batch (bool): If True, every line of the prompt is an entry of its own.
+        """
+        nonlocal ai_requests
+        if ai_requests is None:
+            from ai_worker import AIRequestQueue
+            # AI translations run off the main thread so the window stays responsive
+            ai_requests = AIRequestQueue(root, ai_result_callback, app.set_ai_status)
+        ai_requests.submit(user_input, batch)
+
+    def cancel_ai_prompts():
+        """
+        Cancels the pending AI prompts, if any.
+        """
+        if ai_requests is not None:
+            ai_requests.cancel()
+
     def command_callback(user_input):
         """
         Callback function to handle user commands.
@@ -24,190 +85,88 @@ def main():
         Parameters:
             user_input (str): The command entered by the user.
         """
-        # First, attempt to parse the command normally
-        command_tuple = parse_command(user_input)
-        
+        # First, attempt to parse the command normally, if it starts like one
+        command_tuple = parse_command(user_input) if is_command(user_input) else None
+
         if not command_tuple:
-            # If parsing fails, attempt to use AI to interpret the command
-            command_sequence = translate_natural_language_to_commands(user_input)
-            
-            if not command_sequence:
-                # If AI also fails, notify the user
-                app.display_error("Command Error", "Unable to parse the command. Please try again.")
-                return
-
-            # Ensure that command_sequence is an instance of CommandSequence
-            if isinstance(command_sequence, tuple):
-                # Single command returned as a tuple
-                commands = [command_sequence]
-            elif isinstance(command_sequence, list):
-                # List of Command objects
-                commands = command_sequence
-            else:
-                # Unsupported format
-                app.display_error("Command Error", "AI returned an unsupported command format.")
-                return
-        else:
-            # Single command parsed normally
-            commands = [command_tuple]
-
-        # Eaxecute each commnd in the sequence
-        for cmd in commands:
-            execute_individual_command(cmd, app)
-
-    def ai_commands_callback(user_input):
-        command_sequence = translate_natural_language_to_commands(user_input)
-        for command in command_sequence:
-            #command_to_execute = f"{command.command} {command.amount} \"{command.description}\" {command.date} \"{command.category}\""
-            print(command)
-            execute_individual_command(command, app)  # Pass the app reference
-
-    def execute_individual_command(command, app):
+            # Otherwise interpret it as natural language, locally when simple enough or by the AI in the background
+            submit_ai_prompt(user_input)
+            return
+
+        execute_individual_command(command_tuple, app)
+
+    def ai_commands_callback(user_input, batch=False):
         """
-        Executes an individual command.
+        Callback function to handle prompts from the AI prompt window.
 
         Parameters:
-        command (Command): The command object containing all arguments.
-        app (FinanceTrackerUI): Reference to the app UI for displaying messages and errors.
+            user_input (str): The natural language prompt entered by the user.
+            batch (bool): If True, every line of the prompt is an entry of its own.
         """
-        cmd = command.command  # Extract the command name
-
-        if cmd == 'add':
-            if not (command.amount and command.description and command.date and command.category):
-                app.display_error("Command Error", "Missing arguments for 'add' command.")
-                return
-
-            # Convert DD/MM/YYYY to YYYY-MM-DD
-            try:
-                day, month, year = map(int, command.date.split('/'))
-                formatted_date = f"{day:02d}/{month:02d}/{year:04d}"
-            except ValueError:
-                app.display_error("Date Error", f"Invalid date format: {command.date}. Expected DD/MM/YYYY.")
-                return
-
-            # Add the transaction
-            file_manager.add_transaction(command.amount, command.description, formatted_date, command.category)
-            refresh_ui()
-            app.display_message(
-                "Success",
-                f"Transaction added successfully!\nDescription: {command.description}\nAmount: ${command.amount:.2f}\n"
-                f"Date: {formatted_date}\nCategory: {command.category}"
-            )
-
-        elif cmd == 'category':
-            if not (command.action):
-                app.display_error("Command Error", "Missing arguments for 'category' command.")
-                return
-            if not (command.name):
-                if command.action == "reset":
-                    categories_manager.reset_to_default_categories()
-                    app.display_message("Success", f"Categories reset to default!")
-                    return
-                else:
-                    app.display_error("Command Error", "Missing arguments for 'category' command.")
-                    return
-            if command.action == "add":
-                categories_manager.add_category(command.name)
-                app.display_message(
-                "Success",
-                f"Category added successfully!\nName: {command.name}"
-            )
-            else:
-                success = categories_manager.remove_category(command.name)
-                if success:
-                    app.display_message(
-                    "Success",
-                    f"Category removed successfully!\nName: {command.name}"
-                    )
-                else:
-                    app.display_message(
-                    "Unsuccessful",
-                    f"Category not found: {command.name}"
-                    )
-
-        elif cmd == 'remove':
-            if not command.unique_ids or len(command.unique_ids) == 0:
-                app.display_error("Command Error", "No IDs provided for 'remove' command.")
-                return
-
-            unsuccessful_ids = []
-            for unique_id in command.unique_ids:
-                if unique_id < 0:
-                    app.display_error("Command Error", f"Invalid ID: {unique_id}. IDs must be non-negative.")
-                    unsuccessful_ids.append(unique_id)
-                    continue
-
-                success = file_manager.remove_transaction_by_id(unique_id)
-                if not success:
-                    unsuccessful_ids.append(unique_id)
-
-            if not unsuccessful_ids:
-                app.display_message(
-                    "Success",
-                    f"Transactions removed successfully! IDs: {', '.join(map(str, command.unique_ids))}"
-                )
-            else:
-                app.display_message(
-                    "Partial Success",
-                    f"Some transactions could not be found: {', '.join(map(str, unsuccessful_ids))}"
-                )
-            file_manager.renumber_ids()
-            refresh_ui()
-        
-        elif cmd == 'edit':
-            if not command.unique_ids or len(command.unique_ids) != 1:
-                app.display_error("Command Error", "Provide exactly one ID for 'edit' command.")
-                return
-
-            unique_id = command.unique_ids[0]
-            field = command.field
-            new_value = command.value
-
-            # Attempt to edit the transaction
-            success = file_manager.edit_transaction(unique_id, field, new_value)
-
-            if success:
-                app.display_message("Success", f"Transaction {unique_id} updated successfully!")
-                file_manager.renumber_ids()
-                refresh_ui()
-            else:
-                app.display_error("Transaction Error", f"Transaction with ID {unique_id} could not be found.")
-
-
-        else:
-            app.display_error("Command Error", f"Unknown command: {cmd}")
-
-    def refresh_ui():
+        submit_ai_prompt(user_input, batch)
+
+    def ai_result_callback(user_input, commands, failed):
         """
-        Refreshes the UI by clearing and repopulating the transaction Treeviews.
+        Executes the commands the AI translated a prompt into, on the main thread.
+
+        Parameters:
+            user_input (str): The prompt that was translated.
+            commands (List[Command]): The translated commands of every group of lines, in order.
+            failed (list of str): The groups of lines that could not be translated.
         """
-        transactions = file_manager.read_transactions()
-        app.clear_transactions()
-
-        for txn in transactions:
-            try:
-                amount = float(txn['Amount'])
-                description = txn['Description']
-                date_str = txn['Date']
-                category = txn['Category']
-                if amount >= 0:
-                    app.add_income_transaction(amount, description, date_str, category)
-                else:
-                    app.add_expense_transaction(abs(amount), description, date_str, category)
-            except ValueError:
-                continue
-
-        total_income, total_expenses, net_balance = file_manager.calculate_totals(transactions)
-        app.update_totals(total_income, total_expenses, net_balance)
+        if not commands:
+            # If AI also fails, notify the user
+            app.display_error("Command Error", f"Unable to parse the command. Please try again.\n\n{user_input}")
+            return
+
+        # Execute the whole sequence as one unit, with one write and one summary
+        execute_commands(commands, app, untranslated=failed)
+
+    def search_callback():
+        """
+        Shows the transactions matching the new search text.
+        """
+        refresh_ui(app)
 
     # Initialize the UI with the command callback
-    app = FinanceTrackerUI(root, command_callback, ai_commands_callback)
+    app = FinanceTrackerUI(root, command_callback, ai_commands_callback, cancel_ai_prompts, search_callback)
+    window_time = time.perf_counter()
 
     # Initial refresh to display existing transactions
-    refresh_ui()
+    refresh_ui(app)
+    refresh_time = time.perf_counter()
+
+    def on_first_paint():
+        """
+        Runs once the window has been drawn.
+        """
+        if profile_startup:
+            root.update()
+            paint_time = time.perf_counter()
+            print(f"Imports:       {(IMPORTS_DONE_TIME - START_TIME) * 1000:8.1f} ms")
+            print(f"Window:        {(window_time - IMPORTS_DONE_TIME) * 1000:8.1f} ms")
+            print(f"First refresh: {(refresh_time - window_time) * 1000:8.1f} ms")
+            print(f"First paint:   {(paint_time - START_TIME) * 1000:8.1f} ms after start")
+            print("Loaded at first paint: " +
+                  ", ".join(f"{name}={'yes' if name in sys.modules else 'no'}" for name in PROFILED_MODULES))
+            root.destroy()
+            return
+        threading.Thread(target=preload_ai_modules, daemon=True).start()
+        # Build the search indexes in the background, so the first search doesn't wait for them
+        search_index.start_indexing()
+
+    root.after_idle(on_first_paint)
 
     # Start the Tkinter event loop
     root.mainloop()
 
+    # Snapshot the ledger so the next start can map it instead of parsing the CSV file
+    file_manager.save_snapshot()
+
+    # Persist the AI response cache hit and miss counters
+    if ai_requests is not None:
+        from ai_handler import response_cache
+        response_cache.save()
+
 if __name__ == "__main__":
-    main()
+    main(profile_startup='--profile-startup' in sys.argv[1:])
@@ -0,0 +1,21 @@
+# models.py
+
+from pydantic import BaseModel
+from typing import Optional, List
+
+# Define Command Model
+class Command(BaseModel):
+    command: str
+    name: Optional[str] = None
+    amount: Optional[float] = None
+    value: Optional[str] = None
+    description: Optional[str] = None
+    date: Optional[str] = None  # DD/MM/YYYY
+    action: Optional[str] = None
+    category: Optional[str] = None
+    field: Optional[str] = None
+    unique_ids: Optional[list[int]] = None  # Supports multiple IDs
+
+# Define Command Sequence Model
+class CommandSequence(BaseModel):
+    commands: List[Command]
@@ -0,0 +1,208 @@
+# reports.py
+
+import numpy as np
+
+import file_manager
+from transaction import CATEGORY_NAMES
+
+# Report kinds accepted by the 'report' command
+REPORT_KINDS = ['month', 'category']
+
+class LedgerColumns:
+    """
+    Column-oriented NumPy view of the transactions, used for vectorized reports.
+
+    Attributes:
+        amounts (np.ndarray): int64 amounts in cents.
+        months (np.ndarray): int64 month index (year * 12 + month - 1), -1 for unparseable dates.
+        category_codes (np.ndarray): int64 index into categories.
+        categories (np.ndarray): The distinct category names, sorted.
+    """
+
+    def __init__(self, amounts, months, category_codes, categories):
+        self.amounts = amounts
+        self.months = months
+        self.category_codes = category_codes
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.amounts)
+
+def months_from_dates(date_values):
+    """
+    Converts YYYYMMDD dates into month indexes.
+
+    Parameters:
+        date_values (np.ndarray): int64 dates as YYYYMMDD.
+
+    Returns:
+        np.ndarray: int64 month index (year * 12 + month - 1), -1 where the month isn't valid.
+    """
+    year = date_values // 10000
+    month = date_values // 100 % 100
+    valid = (date_values > 0) & (month >= 1) & (month <= 12)
+    return np.where(valid, year * 12 + month - 1, -1)
+
+def build_columns(transactions):
+    """
+    Builds the column arrays for a list of transactions.
+
+    Parameters:
+        transactions (list of Transaction): The transactions.
+
+    Returns:
+        LedgerColumns: The columns.
+    """
+    count = len(transactions)
+    amounts = np.fromiter((txn.amount_cents for txn in transactions), dtype=np.int64, count=count)
+    dates = np.fromiter((txn.date_value for txn in transactions), dtype=np.int64, count=count)
+    codes = np.fromiter((txn.category_code for txn in transactions), dtype=np.int64, count=count)
+
+    # Keep only the categories in use, renumbered in sorted order
+    used_codes = np.unique(codes)
+    names = [CATEGORY_NAMES[code] for code in used_codes]
+    order = np.argsort(np.array(names, dtype=str)) if names else np.zeros(0, dtype=np.int64)
+    remap = np.zeros(int(used_codes.max()) + 1 if len(used_codes) else 0, dtype=np.int64)
+    remap[used_codes[order]] = np.arange(len(order))
+    categories = np.array(sorted(names), dtype=str)
+    return LedgerColumns(amounts, months_from_dates(dates), remap[codes], categories)
+
+def columns_from_ledger(ledger):
+    """
+    Builds the columns from a memory-mapped columnar ledger without copying the amounts.
+
+    Parameters:
+        ledger (columnar_store.ColumnarLedger): The ledger.
+
+    Returns:
+        LedgerColumns: The columns.
+    """
+    order = np.argsort(np.array(ledger.categories, dtype=str)) if ledger.categories else np.zeros(0, dtype=np.int64)
+    remap = np.zeros(len(order), dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    categories = np.array(sorted(ledger.categories), dtype=str)
+    months = months_from_dates(ledger.dates.astype(np.int64))
+    return LedgerColumns(ledger.amounts, months, remap[ledger.category_codes], categories)
+
+# Columns of the last data seen, keyed by the store, its generation and its snapshot
+_columns_cache = (None, None)
+
+def load_columns():
+    """
+    Returns the columns of the stored transactions, rebuilding them only after the transactions changed.
+
+    The store's columnar snapshot is used when it is up to date, so the
+    transactions don't have to be loaded at all.
+
+    Returns:
+        LedgerColumns: The columns.
+    """
+    global _columns_cache
+    store = file_manager.get_store()
+    ledger = store.snapshot()
+    if ledger is None:
+        store.load()
+    key = (store, store.generation, ledger)
+    cached_key, cached_columns = _columns_cache
+    if cached_key is not None and cached_key[0] is store and cached_key[1] == store.generation \
+            and cached_key[2] is ledger:
+        return cached_columns
+
+    columns = columns_from_ledger(ledger) if ledger is not None else build_columns(store.load())
+    _columns_cache = (key, columns)
+    return columns
+
+def _grouped_sums(codes, amounts, size):
+    """
+    Sums counts, income and expenses per group code with bincount.
+
+    Returns:
+        tuple of np.ndarray: Counts, income cents and expense cents per group.
+    """
+    counts = np.bincount(codes, minlength=size)
+    income = np.bincount(codes, weights=np.maximum(amounts, 0), minlength=size)
+    expenses = np.bincount(codes, weights=np.minimum(amounts, 0), minlength=size)
+    return counts, income, expenses
+
+def category_report(columns=None):
+    """
+    Computes count, income, expenses, net and average amount per category.
+
+    Parameters:
+        columns (LedgerColumns): The columns to report on, defaults to the stored transactions.
+
+    Returns:
+        list of tuple: (category, count, income, expenses, net, average) sorted by category.
+    """
+    columns = columns if columns is not None else load_columns()
+    size = len(columns.categories)
+    counts, income, expenses = _grouped_sums(columns.category_codes, columns.amounts, size)
+    net = income + expenses
+    average = np.divide(net, counts, out=np.zeros(size), where=counts > 0)
+
+    return [
+        (str(columns.categories[i]), int(counts[i]), income[i] / 100, expenses[i] / 100, net[i] / 100, average[i] / 100)
+        for i in range(size)
+    ]
+
+def monthly_report(columns=None):
+    """
+    Computes count, income, expenses and net per month, with the month-over-month change in net.
+
+    Transactions with unparseable dates are left out.
+
+    Parameters:
+        columns (LedgerColumns): The columns to report on, defaults to the stored transactions.
+
+    Returns:
+        list of tuple: (month 'MM/YYYY', count, income, expenses, net, change in net) in chronological order.
+            The change is None for the first month.
+    """
+    columns = columns if columns is not None else load_columns()
+    valid = columns.months >= 0
+    months, month_codes = np.unique(columns.months[valid], return_inverse=True)
+    size = len(months)
+    counts, income, expenses = _grouped_sums(month_codes.ravel(), columns.amounts[valid], size)
+    net = income + expenses
+    change = np.diff(net, prepend=np.nan)
+
+    return [
+        (
+            f"{months[i] % 12 + 1:02d}/{months[i] // 12:04d}",
+            int(counts[i]),
+            income[i] / 100,
+            expenses[i] / 100,
+            net[i] / 100,
+            None if np.isnan(change[i]) else change[i] / 100,
+        )
+        for i in range(size)
+    ]
+
+def build_report(kind):
+    """
+    Builds a report as display-ready headings and rows.
+
+    Parameters:
+        kind (str): One of REPORT_KINDS.
+
+    Returns:
+        tuple: (title, headings, rows) where rows are tuples of strings.
+    """
+    if kind == 'month':
+        headings = ('Month', 'Count', 'Income', 'Expenses', 'Net', 'Change')
+        rows = [
+            (month, str(count), f"${income:.2f}", f"${abs(expenses):.2f}", f"${net:.2f}",
+             "" if change is None else f"{change:+.2f}")
+            for month, count, income, expenses, net, change in monthly_report()
+        ]
+        return "Monthly Report", headings, rows
+
+    if kind == 'category':
+        headings = ('Category', 'Count', 'Income', 'Expenses', 'Net', 'Average')
+        rows = [
+            (category, str(count), f"${income:.2f}", f"${abs(expenses):.2f}", f"${net:.2f}", f"${average:.2f}")
+            for category, count, income, expenses, net, average in category_report()
+        ]
+        return "Category Report", headings, rows
+
+    raise ValueError(f"Unknown report: {kind}. Expected one of {', '.join(REPORT_KINDS)}.")
@@ -0,0 +1,654 @@
+# search_index.py
+
+import bisect
+import heapq
+import itertools
+import math
+import operator
+import re
+import threading
+
+from ledger_index import IndexCache, LedgerIndex
+from transaction import CATEGORY_NAMES, parse_date, to_cents
+
+# Words and "quoted phrases" of a search
+SEARCH_TOKEN_PATTERN = re.compile(r'"([^"]*)"?|(\S+)')
+
+# Filters of a search, e.g. category:food, from:01/01/2026, to:31/01/2026, >5, <=20
+FIELD_FILTER_PATTERN = re.compile(r'^(cat|category|from|to):(.*)$', re.IGNORECASE)
+AMOUNT_FILTER_PATTERN = re.compile(r'^(>=|<=|>|<|=)(.*)$')
+
+# Shorter words are ignored, they would match most descriptions
+MIN_TERM_LENGTH = 3
+
+# Keys of the sorted range indexes pack the value above the slot
+POSITION_BITS = 32
+POSITION_MASK = (1 << POSITION_BITS) - 1
+
+# Candidates of a search checked all at once, a search with more checks them a chunk at a time
+MAX_SORTED_CANDIDATES = 20000
+
+# Candidates checked in the first chunk, the next chunks double up to MAX_CHUNK
+FIRST_CHUNK = 1024
+MAX_CHUNK = 65536
+
+AMOUNT_CENTS = operator.attrgetter('amount_cents')
+
+# Turns income flags into expense flags
+INVERTED_FLAGS = bytes.maketrans(b'\x00\x01', b'\x01\x00')
+
+# Whether a slot's row is still there, see LedgerIndex.live_positions
+IS_POSITION = (0).__le__
+
+class SearchQuery:
+    """
+    A parsed search, see parse_query.
+
+    Attributes:
+        terms (list of str): Lowercase text every matching description contains.
+        category (str or None): Lowercase prefix of the category name.
+        min_cents (int or None): Smallest amount in cents, income and expenses alike.
+        max_cents (int or None): Largest amount in cents, income and expenses alike.
+        start_value (int or None): Earliest date as YYYYMMDD.
+        end_value (int or None): Latest date as YYYYMMDD.
+    """
+
+    def __init__(self):
+        self.terms = []
+        self.category = None
+        self.min_cents = None
+        self.max_cents = None
+        self.start_value = None
+        self.end_value = None
+
+    def filters(self):
+        """
+        Returns:
+            tuple: Everything but the text terms, for comparing two queries.
+        """
+        return (self.category, self.min_cents, self.max_cents, self.start_value, self.end_value)
+
+    def is_empty(self):
+        """
+        Returns:
+            bool: True if the query matches every transaction.
+        """
+        return not self.terms and self.filters() == (None, None, None, None, None)
+
+    def narrows(self, other):
+        """
+        Checks whether every transaction matching this query also matches another one.
+
+        Parameters:
+            other (SearchQuery): The other query.
+
+        Returns:
+            bool: True if this query has the same filters and at least as specific terms.
+        """
+        return self.filters() == other.filters() \
+            and all(any(old in term for term in self.terms) for old in other.terms)
+
+def parse_query(text):
+    """
+    Parses the text of the search box.
+
+    Words match descriptions case-insensitively, anywhere in the text, and
+    "quoted phrases" match as a whole. Words shorter than MIN_TERM_LENGTH are
+    ignored. category:<name> (or cat:) matches the
+    categories starting with the name, >, >=, <, <= and = compare amounts
+    (expenses as positive amounts), and from:/to: limit the DD/MM/YYYY dates.
+    Filters without a valid value yet, e.g. while typing them, are ignored.
+
+    Parameters:
+        text (str): The search text.
+
+    Returns:
+        SearchQuery: The parsed query.
+    """
+    query = SearchQuery()
+    for phrase, word in SEARCH_TOKEN_PATTERN.findall(text):
+        if not word:
+            if len(phrase.strip()) >= MIN_TERM_LENGTH:
+                query.terms.append(phrase.lower())
+            continue
+
+        field_filter = FIELD_FILTER_PATTERN.match(word)
+        amount_filter = AMOUNT_FILTER_PATTERN.match(word)
+        if field_filter:
+            field, value = field_filter.group(1).lower(), field_filter.group(2)
+            if field in ('cat', 'category'):
+                if value:
+                    query.category = value.lower()
+            else:
+                date_value = parse_date(value)
+                if date_value is not None:
+                    if field == 'from':
+                        query.start_value = date_value
+                    else:
+                        query.end_value = date_value
+        elif amount_filter:
+            operator_text, value = amount_filter.groups()
+            try:
+                cents = abs(to_cents(value))
+            except ValueError:
+                continue
+            if operator_text in ('>', '>='):
+                query.min_cents = cents + (operator_text == '>')
+            elif operator_text in ('<', '<='):
+                query.max_cents = cents - (operator_text == '<')
+            else:
+                query.min_cents = query.max_cents = cents
+        elif len(word) >= MIN_TERM_LENGTH:
+            query.terms.append(word.lower())
+    return query
+
+class SearchMatches:
+    """
+    The transactions matching a search, found as far as they are looked at.
+
+    A search with many candidates checks them a chunk at a time, in ledger
+    order, only when a page of the result needs them. The income and expense
+    lists pull from the same chunks, so showing the first page of each only
+    checks the candidates these pages need. The lists are only valid until the
+    transactions change.
+
+    Attributes:
+        income (MatchList): The matching income transactions, in ledger order.
+        expenses (MatchList): The matching expense transactions, in ledger order.
+        positions (list of int or None): The positions of every match, if they were all found at once.
+        complete (bool): True once every candidate was checked.
+    """
+
+    def __init__(self, chunks, positions=None):
+        """
+        Parameters:
+            chunks (iterator): Yields (income, expenses) tuples of lists of matching transactions, in ledger order.
+            positions (list of int): The positions of every match, if chunks yields them all at once.
+        """
+        self._chunks = chunks
+        self.income = MatchList(self, [])
+        self.expenses = MatchList(self, [])
+        self.positions = positions
+        self.complete = False
+
+    def find_more(self):
+        """
+        Checks the next chunk of candidates.
+
+        Returns:
+            bool: False if every candidate was already checked.
+        """
+        if self.complete:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.complete = True
+            return False
+        income, expenses = chunk
+        self.income.found.extend(income)
+        self.expenses.found.extend(expenses)
+        return True
+
+class MatchList:
+    """
+    Read-only list of the income or the expenses of SearchMatches, that finds matches as they are accessed.
+
+    Attributes:
+        found (list of Transaction): The matches found so far.
+    """
+
+    def __init__(self, matches, found):
+        """
+        Parameters:
+            matches (SearchMatches): The search the list belongs to.
+            found (list of Transaction): The matches found so far.
+        """
+        self.matches = matches
+        self.found = found
+
+    @property
+    def complete(self):
+        """
+        Returns:
+            bool: True if every match was found.
+        """
+        return self.matches.complete
+
+    def count_at_least(self, count):
+        """
+        Finds matches until there are the given number or no more.
+
+        Parameters:
+            count (int): The number of matches wanted.
+
+        Returns:
+            int: The number of matches found so far.
+        """
+        while len(self.found) < count and self.matches.find_more():
+            pass
+        return len(self.found)
+
+    def _find_all(self):
+        while self.matches.find_more():
+            pass
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.stop is None or index.stop < 0 or (index.start or 0) < 0:
+                self._find_all()
+            else:
+                self.count_at_least(index.stop)
+        elif index < 0:
+            self._find_all()
+        else:
+            self.count_at_least(index + 1)
+        return self.found[index]
+
+    def __len__(self):
+        self._find_all()
+        return len(self.found)
+
+    def __iter__(self):
+        index = 0
+        while index < self.count_at_least(index + 1):
+            yield self.found[index]
+            index += 1
+
+class SearchIndex(LedgerIndex):
+    """
+    Indexes of the stored transactions for the search box.
+
+    The transactions are split into income and expenses up front. The text,
+    category and range indexes are built together on a background thread once
+    searching starts, see start_indexing, and until they are ready every
+    transaction is a candidate. All of them are kept up to date by difference,
+    see LedgerIndex, and rows replaced in place are patched in.
+
+    Descriptions are indexed by trigram, so a term of three characters or
+    more only checks the transactions containing its rarest trigram.
+    Categories have a list of slots each, and amounts and dates a sorted
+    list of keys, so a range is found by bisection. A search starts from the
+    smallest of these candidate lists and checks the rest of the query on it.
+    Up to MAX_SORTED_CANDIDATES candidates are checked at once, more are
+    checked lazily in ledger order, see SearchMatches.
+
+    Attributes:
+        income (list of Transaction): The income transactions, in ledger order.
+        expenses (list of Transaction): The expense transactions, in ledger order.
+    """
+
+    def __init__(self, transactions):
+        """
+        Parameters:
+            transactions (list of Transaction): The transactions to index.
+        """
+        self.income = []
+        self.expenses = []
+        # Positions of the income and the expense transactions, ascending
+        self._income_positions = []
+        self._expense_positions = []
+        # 1 for the positions of income transactions, 0 for expenses
+        self._income_flags = bytearray()
+        # Built in the background, see start_indexing
+        self._lowered = None
+        self._trigrams = None
+        self._by_category = None
+        self._amount_keys = None
+        self._date_keys = None
+        # Whether the background build started, and what it built once done
+        self._indexing = False
+        self._built = None
+        super().__init__(transactions)
+
+    def _index_slots(self, start):
+        # Rows appended after the ones already split, other changes split them again
+        first = len(self._income_flags)
+        if first < len(self.transactions):
+            self._split(first)
+
+        if self._lowered is not None:
+            self._index_text(self._lowered, self._trigrams, self._rows, start)
+            self._index_categories(self._by_category, self._rows, start)
+            self._index_ranges(start)
+
+    def _positions_changed(self, removed_slots):
+        self.income = []
+        self.expenses = []
+        self._income_positions = []
+        self._expense_positions = []
+        self._income_flags = bytearray()
+        self._split(0)
+
+    def _split(self, first):
+        """
+        Adds the transactions from the given position on to the income and expenses.
+        """
+        added = self.transactions[first:]
+        positions = range(first, len(self.transactions))
+        flags = bytearray(map(operator.ge, map(AMOUNT_CENTS, added), itertools.repeat(0)))
+        expense_flags = flags.translate(INVERTED_FLAGS)
+        self.income.extend(itertools.compress(added, flags))
+        self.expenses.extend(itertools.compress(added, expense_flags))
+        self._income_positions.extend(itertools.compress(positions, flags))
+        self._expense_positions.extend(itertools.compress(positions, expense_flags))
+        self._income_flags += flags
+
+    def _rows_replaced(self, replaced, old_slots):
+        flags = self._income_flags
+        for position in replaced:
+            txn = self.transactions[position]
+            sides = [(self.expenses, self._expense_positions), (self.income, self._income_positions)]
+            rows, positions = sides[flags[position]]
+            index = bisect.bisect_left(positions, position)
+            if flags[position] == (txn.amount_cents >= 0):
+                rows[index] = txn
+                continue
+            # Moved between income and expenses
+            del rows[index]
+            del positions[index]
+            flags[position] = txn.amount_cents >= 0
+            rows, positions = sides[flags[position]]
+            index = bisect.bisect_left(positions, position)
+            rows.insert(index, txn)
+            positions.insert(index, position)
+
+    @staticmethod
+    def _index_text(lowered, trigrams, rows, start):
+        """
+        Adds the descriptions of the rows from the given slot on to a trigram index.
+        """
+        for slot, txn in enumerate(rows[start:], start):
+            text = txn.description.lower()
+            lowered.append(text)
+            for trigram in {text[i:i + 3] for i in range(len(text) - 2)}:
+                postings = trigrams.get(trigram)
+                if postings is None:
+                    trigrams[trigram] = [slot]
+                else:
+                    postings.append(slot)
+
+    @staticmethod
+    def _index_categories(by_category, rows, start):
+        """
+        Adds the rows from the given slot on to a category index.
+        """
+        for slot, txn in enumerate(rows[start:], start):
+            postings = by_category.get(txn.category_code)
+            if postings is None:
+                by_category[txn.category_code] = [slot]
+            else:
+                postings.append(slot)
+
+    @staticmethod
+    def _range_keys(rows, start):
+        """
+        Returns:
+            tuple: (amount keys, date keys) of the rows from the given slot on, unsorted.
+        """
+        added = rows[start:]
+        return ([abs(txn.amount_cents) << POSITION_BITS | slot for slot, txn in enumerate(added, start)],
+                [txn.date_value << POSITION_BITS | slot for slot, txn in enumerate(added, start)])
+
+    def _index_ranges(self, start):
+        """
+        Adds the slots from the given one on to the sorted amount and date keys.
+        """
+        amount_keys, date_keys = self._range_keys(self._rows, start)
+        if len(amount_keys) > len(self._amount_keys) // 64:
+            self._amount_keys = sorted(self._amount_keys + amount_keys)
+            self._date_keys = sorted(self._date_keys + date_keys)
+            return
+        for key in amount_keys:
+            bisect.insort(self._amount_keys, key)
+        for key in date_keys:
+            bisect.insort(self._date_keys, key)
+
+    def start_indexing(self):
+        """
+        Starts building the text, category and range indexes on a background thread, unless it already was.
+
+        Slots never change once indexed, so the thread indexes a snapshot of
+        them while the main thread keeps updating the index, and _indexes_ready
+        adds the slots added in the meantime.
+        """
+        if self._indexing:
+            return
+        self._indexing = True
+        rows = list(self._rows)
+
+        def build():
+            lowered = []
+            trigrams = {}
+            self._index_text(lowered, trigrams, rows, 0)
+            by_category = {}
+            self._index_categories(by_category, rows, 0)
+            amount_keys, date_keys = self._range_keys(rows, 0)
+            amount_keys.sort()
+            date_keys.sort()
+            self._built = (lowered, trigrams, by_category, amount_keys, date_keys)
+
+        threading.Thread(target=build, daemon=True).start()
+
+    def _indexes_ready(self):
+        """
+        Returns:
+            bool: True if the background indexes are built and up to date.
+        """
+        if self._lowered is None:
+            if self._built is None:
+                return False
+            self._lowered, self._trigrams, self._by_category, self._amount_keys, self._date_keys = self._built
+            self._built = None
+            start = len(self._lowered)
+            if start < len(self._rows):
+                self._index_text(self._lowered, self._trigrams, self._rows, start)
+                self._index_categories(self._by_category, self._rows, start)
+                self._index_ranges(start)
+        return True
+
+    def _range_source(self, keys, low, high, name):
+        """
+        Returns:
+            tuple: (number of slots, name, function returning them, False) of the keys in the range.
+        """
+        first = 0 if low is None else bisect.bisect_left(keys, low << POSITION_BITS)
+        last = len(keys) if high is None else bisect.bisect_left(keys, (high + 1) << POSITION_BITS)
+        return last - first, name, lambda: [[key & POSITION_MASK for key in keys[first:last]]], False
+
+    def _ordered_positions(self, postings_lists):
+        """
+        Returns the positions of the rows of lists of slots in ledger order, as they are iterated.
+
+        Parameters:
+            postings_lists (list of list of int): Lists of slots, each in ascending order.
+
+        Returns:
+            iterator of int: The positions of the rows that are still there, ascending.
+        """
+        bound = self._ordered_slots
+        heads = []
+        tail = []
+        for postings in postings_lists:
+            cut = bisect.bisect_left(postings, bound)
+            heads.append(itertools.islice(postings, cut))
+            tail.extend(postings[cut:])
+        head = heads[0] if len(heads) == 1 else heapq.merge(*heads)
+        positions = filter(IS_POSITION, map(self._positions.__getitem__, head))
+        if tail:
+            # Slots of rows replaced in place, out of ledger order
+            positions = heapq.merge(positions, sorted(self.live_positions(tail)))
+        return positions
+
+    def _check(self, positions, query, codes, checked):
+        """
+        Checks the query on candidates, one condition at a time.
+
+        Parameters:
+            positions (list of int): The positions of the candidates.
+            query (SearchQuery): The query.
+            codes (set of int or None): The codes of the categories the query matches, if it has a category.
+            checked (str or None): The condition the candidates are known to meet.
+
+        Returns:
+            list of int: The positions of the matching candidates, in the same order.
+        """
+        transactions = self.transactions
+        if codes is not None and checked != 'category':
+            positions = [position for position in positions if transactions[position].category_code in codes]
+        if (query.min_cents is not None or query.max_cents is not None) and checked != 'amount':
+            low = query.min_cents if query.min_cents is not None else 0
+            high = query.max_cents if query.max_cents is not None else math.inf
+            positions = [position for position in positions if low <= abs(transactions[position].amount_cents) <= high]
+        if (query.start_value is not None or query.end_value is not None) and checked != 'date':
+            low = query.start_value if query.start_value is not None else 0
+            high = query.end_value if query.end_value is not None else math.inf
+            positions = [position for position in positions if low <= transactions[position].date_value <= high]
+        for term in query.terms:
+            if term == checked:
+                continue
+            if self._lowered is not None:
+                lowered = self._lowered
+                slots = self._slots
+                positions = [position for position in positions if term in lowered[slots[position]]]
+            else:
+                positions = [position for position in positions if term in transactions[position].description.lower()]
+        return positions
+
+    def _chunks(self, positions, query, codes, checked):
+        """
+        Checks candidates a chunk at a time, see SearchMatches.
+
+        Parameters:
+            positions (iterator of int): The positions of the candidates, ascending.
+            query, codes, checked: See _check.
+
+        Yields:
+            tuple: (income, expenses), the lists of the matching transactions of a chunk.
+        """
+        size = FIRST_CHUNK
+        while True:
+            chunk = list(itertools.islice(positions, size))
+            if not chunk:
+                return
+            yield self.split(self._check(chunk, query, codes, checked))
+            size = min(size * 2, MAX_CHUNK)
+
+    def search(self, query, within=None):
+        """
+        Finds the transactions matching a query.
+
+        Parameters:
+            query (SearchQuery): The query.
+            within (list of int): Positions known to include every match, e.g. the
+                matches of a query this one narrows.
+
+        Returns:
+            SearchMatches: The matching transactions.
+        """
+        # Candidate slots as (size, name of the check they make redundant,
+        # function returning lists of them, whether the lists are in slot order)
+        sources = []
+        if within is not None:
+            within_slots = list(map(self._slots.__getitem__, within))
+            sources.append((len(within), 'within', lambda: [within_slots], False))
+
+        codes = None
+        if query.category is not None:
+            codes = {code for code, name in enumerate(CATEGORY_NAMES) if name.lower().startswith(query.category)}
+
+        if self._indexes_ready():
+            for term in query.terms:
+                postings = min((self._trigrams.get(term[i:i + 3], []) for i in range(len(term) - 2)), key=len)
+                sources.append((len(postings), term if len(term) == 3 else None,
+                                lambda postings=postings: [postings], True))
+            if codes is not None:
+                postings = [self._by_category[code] for code in codes if code in self._by_category]
+                sources.append((sum(map(len, postings)), 'category', lambda postings=postings: postings, True))
+            if query.min_cents is not None or query.max_cents is not None:
+                sources.append(self._range_source(self._amount_keys, query.min_cents, query.max_cents, 'amount'))
+            if query.start_value is not None or query.end_value is not None:
+                sources.append(self._range_source(self._date_keys, query.start_value, query.end_value, 'date'))
+
+        if sources:
+            size, checked, produce, ordered = min(sources, key=operator.itemgetter(0))
+            if size <= MAX_SORTED_CANDIDATES:
+                # Few candidates, all checked at once
+                positions = self.live_positions(itertools.chain.from_iterable(produce()))
+                positions.sort()
+                positions = self._check(positions, query, codes, checked)
+                return SearchMatches(iter([self.split(positions)]), positions)
+        if sources and ordered:
+            positions = self._ordered_positions(produce())
+        else:
+            positions = iter(range(len(self.transactions)))
+            checked = None
+        return SearchMatches(self._chunks(positions, query, codes, checked))
+
+    def split(self, positions):
+        """
+        Parameters:
+            positions (list of int): Positions of transactions.
+
+        Returns:
+            tuple: (income, expenses), the lists of these transactions in the given order.
+        """
+        transactions = self.transactions
+        flags = self._income_flags
+        income = [transactions[position] for position in positions if flags[position]]
+        expenses = [transactions[position] for position in positions if not flags[position]]
+        return income, expenses
+
+# Index of the stored transactions
+_index_cache = IndexCache(SearchIndex)
+
+# Whether the transactions have been searched, so the indexes are worth building
+_indexing_wanted = False
+
+# Last search whose matches were all found, so that typing more of it only checks its matches
+_last_search = (None, None, None)
+
+def load_search_index():
+    """
+    Returns the search index of the stored transactions, updating it only after the transactions changed.
+
+    Returns:
+        SearchIndex: The index.
+    """
+    index = _index_cache.load()
+    if _indexing_wanted:
+        index.start_indexing()
+    return index
+
+def start_indexing():
+    """
+    Starts building the search indexes in the background, so searches don't wait for them.
+    """
+    global _indexing_wanted
+    _indexing_wanted = True
+    load_search_index()
+
+def filter_transactions(text):
+    """
+    Finds the transactions matching the text of the search box, see parse_query.
+
+    Parameters:
+        text (str): The search text, empty for every transaction.
+
+    Returns:
+        tuple: (income, expenses), the lists of matching transactions in ledger order. For
+            a search they are MatchList objects, which find the matches as they are accessed.
+    """
+    global _last_search, _indexing_wanted
+    query = parse_query(text)
+    if not query.is_empty():
+        _indexing_wanted = True
+    index = load_search_index()
+    if query.is_empty():
+        return index.income, index.expenses
+
+    key = _index_cache.key
+    last_key, last_query, last_positions = _last_search
+    within = last_positions if last_key == key and query.narrows(last_query) else None
+    matches = index.search(query, within)
+    _last_search = (key, query, matches.positions) if matches.positions is not None else (None, None, None)
+    return matches.income, matches.expenses
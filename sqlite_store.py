@@ -0,0 +1,615 @@
+# sqlite_store.py
+
+import sqlite3
+import sys
+
+import file_manager
+from transaction import Transaction, category_code, parse_date
+
+# Database used when file_manager.STORAGE_BACKEND is 'sqlite'
+DATABASE_FILE = 'transactions.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    amount_cents INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    date TEXT NOT NULL,
+    date_key TEXT,
+    category TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_date_key ON transactions (date_key);
+CREATE INDEX IF NOT EXISTS idx_transactions_category ON transactions (category);
+
+CREATE TABLE IF NOT EXISTS category_totals (
+    category TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0,
+    income_cents INTEGER NOT NULL DEFAULT 0,
+    expenses_cents INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS transactions_totals_insert AFTER INSERT ON transactions BEGIN
+    INSERT OR IGNORE INTO category_totals (category) VALUES (NEW.category);
+    UPDATE category_totals SET
+        count = count + 1,
+        income_cents = income_cents + MAX(NEW.amount_cents, 0),
+        expenses_cents = expenses_cents + MIN(NEW.amount_cents, 0)
+    WHERE category = NEW.category;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transactions_totals_delete AFTER DELETE ON transactions BEGIN
+    UPDATE category_totals SET
+        count = count - 1,
+        income_cents = income_cents - MAX(OLD.amount_cents, 0),
+        expenses_cents = expenses_cents - MIN(OLD.amount_cents, 0)
+    WHERE category = OLD.category;
+    DELETE FROM category_totals WHERE category = OLD.category AND count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS transactions_totals_update
+AFTER UPDATE OF amount_cents, category ON transactions BEGIN
+    UPDATE category_totals SET
+        count = count - 1,
+        income_cents = income_cents - MAX(OLD.amount_cents, 0),
+        expenses_cents = expenses_cents - MIN(OLD.amount_cents, 0)
+    WHERE category = OLD.category;
+    DELETE FROM category_totals WHERE category = OLD.category AND count = 0;
+    INSERT OR IGNORE INTO category_totals (category) VALUES (NEW.category);
+    UPDATE category_totals SET
+        count = count + 1,
+        income_cents = income_cents + MAX(NEW.amount_cents, 0),
+        expenses_cents = expenses_cents + MIN(NEW.amount_cents, 0)
+    WHERE category = NEW.category;
+END;
+"""
+
+# Per-category totals computed from a full scan of the transactions table
+SCANNED_TOTALS_QUERY = """
+SELECT category, COUNT(*),
+    COALESCE(SUM(MAX(amount_cents, 0)), 0),
+    COALESCE(SUM(MIN(amount_cents, 0)), 0)
+FROM transactions GROUP BY category
+"""
+
+def row_to_record(row):
+    """
+    Converts a transaction into a database record.
+
+    Parameters:
+        row (Transaction): The transaction.
+
+    Returns:
+        tuple: (id, amount_cents, description, date, date_key, category).
+    """
+    date = row.date
+    return (row.id, row.amount_cents, row.description, date, file_manager.date_key(date), row.category)
+
+def record_to_row(record):
+    """
+    Converts a database record into a transaction.
+
+    Parameters:
+        record (tuple): (id, amount_cents, description, date, category).
+
+    Returns:
+        Transaction: The transaction.
+    """
+    txn_id, amount_cents, description, date, category = record
+    return Transaction(txn_id, amount_cents, parse_date(date) or 0, category_code(category), description)
+
+def _where_clause(category, start_date, end_date):
+    """
+    Builds an indexed WHERE clause for the category and date range filters.
+
+    Returns:
+        tuple: The clause (possibly empty) and its parameters.
+    """
+    conditions = []
+    params = []
+    if category is not None:
+        conditions.append("category = ?")
+        params.append(category)
+    if start_date:
+        conditions.append("date_key >= ?")
+        params.append(file_manager.date_key(start_date))
+    if end_date:
+        conditions.append("date_key <= ?")
+        params.append(file_manager.date_key(end_date))
+    if not conditions:
+        return "", params
+    return " WHERE " + " AND ".join(conditions), params
+
+class SQLiteTransactionStore:
+    """
+    Transaction store backed by a local SQLite database.
+
+    Offers the same interface as file_manager.TransactionStore. The full list of
+    rows is cached and only re-read when the database was changed, which is
+    detected through PRAGMA data_version for other connections.
+
+    Running per-category totals are kept in the category_totals table, which
+    triggers update by delta on every insert, update and delete.
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+            path (str): Path to the SQLite database file.
+        """
+        self.path = path
+        self._connection = None
+        self._rows = None
+        self._data_version = None
+        # Incremented whenever the transactions change, for caches derived from them
+        self.generation = 0
+
+    @property
+    def connection(self):
+        """
+        Returns:
+            sqlite3.Connection: The open database connection, with the schema created.
+        """
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+            self._backfill_totals()
+        return self._connection
+
+    def _backfill_totals(self):
+        """
+        Fills the category_totals table for databases created before it existed.
+        """
+        has_totals = self._connection.execute("SELECT 1 FROM category_totals LIMIT 1").fetchone()
+        has_transactions = self._connection.execute("SELECT 1 FROM transactions LIMIT 1").fetchone()
+        if has_transactions and not has_totals:
+            with self._connection:
+                self._connection.execute(
+                    "INSERT INTO category_totals (category, count, income_cents, expenses_cents) "
+                    + SCANNED_TOTALS_QUERY
+                )
+
+    def initialize(self):
+        """
+        Creates the database and its schema if they don't exist.
+        """
+        self.connection
+
+    def close(self):
+        """
+        Closes the database connection.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Forces the next load to re-read the database.
+        """
+        self._rows = None
+        self.generation += 1
+
+    def _written(self):
+        """
+        Commits a write made through this connection and drops the cached rows.
+        """
+        self.connection.commit()
+        self.invalidate()
+
+    def load(self):
+        """
+        Returns all transactions ordered by ID, re-reading them only if the database changed.
+
+        Returns:
+            list of Transaction: The cached transactions. Callers must not mutate them.
+        """
+        data_version = self.connection.execute("PRAGMA data_version").fetchone()[0]
+        if self._rows is None or data_version != self._data_version:
+            cursor = self.connection.execute(
+                "SELECT id, amount_cents, description, date, category FROM transactions ORDER BY id"
+            )
+            if self._data_version is not None and data_version != self._data_version:
+                self.generation += 1
+            self._rows = [record_to_row(record) for record in cursor]
+            self._data_version = data_version
+        return self._rows
+
+    def replaced_since(self, generation):
+        """
+        Returns:
+            None: The rows are read again after every change, so replacements aren't tracked.
+        """
+        return None
+
+    def snapshot(self, stamp=None):
+        """
+        Returns:
+            None: The database has no columnar snapshot, its queries are already indexed.
+        """
+        return None
+
+    def save_snapshot(self):
+        """
+        Does nothing, the database has no columnar snapshot.
+        """
+
+    def next_id(self):
+        """
+        Returns:
+            int: One more than the highest ID, read from the primary key index.
+        """
+        highest = self.connection.execute("SELECT MAX(id) FROM transactions").fetchone()[0]
+        return 0 if highest is None else highest + 1
+
+    def append(self, row):
+        """
+        Inserts a single transaction.
+
+        Parameters:
+            row (Transaction): The transaction.
+        """
+        self.connection.execute(
+            "INSERT INTO transactions (id, amount_cents, description, date, date_key, category) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            row_to_record(row),
+        )
+        self._written()
+
+    def extend(self, rows):
+        """
+        Inserts several transactions in a single database transaction.
+
+        Parameters:
+            rows (list of Transaction): The transactions.
+        """
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO transactions (id, amount_cents, description, date, date_key, category) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (row_to_record(row) for row in rows),
+            )
+        self.invalidate()
+
+    def rewrite(self, rows):
+        """
+        Replaces every transaction in the database.
+
+        Parameters:
+            rows (list of Transaction): The transactions to write.
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM transactions")
+            self.connection.executemany(
+                "INSERT INTO transactions (id, amount_cents, description, date, date_key, category) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (row_to_record(row) for row in rows),
+            )
+        self.invalidate()
+
+    def get(self, transaction_id):
+        """
+        Parameters:
+            transaction_id (int): The ID of the transaction.
+
+        Returns:
+            Transaction or None: The transaction, or None if the ID doesn't exist.
+        """
+        record = self.connection.execute(
+            "SELECT id, amount_cents, description, date, category FROM transactions WHERE id = ?",
+            (transaction_id,),
+        ).fetchone()
+        return None if record is None else record_to_row(record)
+
+    def replace(self, transaction_id, row):
+        """
+        Replaces a transaction.
+
+        Parameters:
+            transaction_id (int): The ID of the transaction to replace.
+            row (Transaction): The new transaction.
+
+        Returns:
+            bool: True if the transaction was replaced, False if the ID doesn't exist.
+        """
+        _, amount_cents, description, date, key, category = row_to_record(row)
+        cursor = self.connection.execute(
+            "UPDATE transactions SET amount_cents = ?, description = ?, date = ?, date_key = ?, category = ? "
+            "WHERE id = ?",
+            (amount_cents, description, date, key, category, transaction_id),
+        )
+        self._written()
+        return cursor.rowcount > 0
+
+    def remove(self, transaction_ids, renumber=False):
+        """
+        Removes several transactions in a single database transaction.
+
+        Parameters:
+            transaction_ids (iterable of int): The IDs of the transactions to remove.
+            renumber (bool): If True, the remaining IDs are renumbered sequentially in the same transaction.
+
+        Returns:
+            list of int: The requested IDs that could not be found, in the order they were given.
+        """
+        requested = list(dict.fromkeys(transaction_ids))
+        missing = []
+        with self.connection:
+            for txn_id in requested:
+                cursor = self.connection.execute("DELETE FROM transactions WHERE id = ?", (txn_id,))
+                if cursor.rowcount == 0:
+                    missing.append(txn_id)
+            if len(missing) == len(requested):
+                # Nothing removed, so the IDs are as sequential as they were
+                return missing
+            if renumber:
+                self._renumber()
+        self.invalidate()
+        return missing
+
+    def _renumber(self):
+        """
+        Renumbers the IDs sequentially from 0 inside the current database transaction.
+
+        Walking the IDs in ascending order never collides, since every row moves
+        to an ID no larger than its own that has already been vacated.
+        """
+        count, highest = self.connection.execute("SELECT COUNT(*), MAX(id) FROM transactions").fetchone()
+        if not count or highest == count - 1:
+            return
+        ids = [record[0] for record in self.connection.execute("SELECT id FROM transactions ORDER BY id")]
+        self.connection.executemany(
+            "UPDATE transactions SET id = ? WHERE id = ?",
+            ((index, txn_id) for index, txn_id in enumerate(ids) if index != txn_id),
+        )
+
+    def renumber(self):
+        """
+        Renumbers the IDs sequentially from 0, skipping the write if they already are.
+        """
+        with self.connection:
+            self._renumber()
+        self.invalidate()
+
+    def iter_rows(self, category=None, start_date=None, end_date=None, batch_size=1000):
+        """
+        Yields the transactions matching a category and/or an inclusive date range.
+
+        The rows are fetched from an indexed query in batches, never all at once.
+
+        Parameters:
+            category (str): Only yield this category, if given.
+            start_date (str): Only yield transactions on or after this DD/MM/YYYY date, if given.
+            end_date (str): Only yield transactions on or before this DD/MM/YYYY date, if given.
+            batch_size (int): Number of rows fetched from the database at a time.
+
+        Yields:
+            Transaction: The matching transactions, ordered by ID.
+        """
+        where, params = _where_clause(category, start_date, end_date)
+        # A separate cursor, so writes made while iterating don't disturb it
+        cursor = self.connection.cursor()
+        cursor.execute(
+            "SELECT id, amount_cents, description, date, category FROM transactions"
+            + where + " ORDER BY id",
+            params,
+        )
+        try:
+            while True:
+                records = cursor.fetchmany(batch_size)
+                if not records:
+                    return
+                for record in records:
+                    yield record_to_row(record)
+        finally:
+            cursor.close()
+
+    def query(self, category=None, start_date=None, end_date=None):
+        """
+        Returns the transactions matching a category and/or an inclusive date range.
+
+        Parameters:
+            category (str): Only return this category, if given.
+            start_date (str): Only return transactions on or after this DD/MM/YYYY date, if given.
+            end_date (str): Only return transactions on or before this DD/MM/YYYY date, if given.
+
+        Returns:
+            list of Transaction: The matching transactions, ordered by ID.
+        """
+        where, params = _where_clause(category, start_date, end_date)
+        cursor = self.connection.execute(
+            "SELECT id, amount_cents, description, date, category FROM transactions"
+            + where + " ORDER BY id",
+            params,
+        )
+        return [record_to_row(record) for record in cursor]
+
+    def totals(self, category=None, start_date=None, end_date=None):
+        """
+        Calculates the totals of the transactions matching the given filters in SQL.
+
+        Unfiltered and per-category totals come from the running totals, date ranges use the date index.
+
+        Parameters:
+            category (str): Only count this category, if given.
+            start_date (str): Only count transactions on or after this DD/MM/YYYY date, if given.
+            end_date (str): Only count transactions on or before this DD/MM/YYYY date, if given.
+
+        Returns:
+            tuple: Total income, total expenses, and net balance.
+        """
+        if not start_date and not end_date:
+            if category is None:
+                return self.running_totals()
+            return self.category_totals().get(category, (0.0, 0.0, 0.0))
+
+        where, params = _where_clause(category, start_date, end_date)
+        income_cents, expenses_cents = self.connection.execute(
+            "SELECT COALESCE(SUM(CASE WHEN amount_cents >= 0 THEN amount_cents END), 0), "
+            "COALESCE(SUM(CASE WHEN amount_cents < 0 THEN amount_cents END), 0) FROM transactions"
+            + where,
+            params,
+        ).fetchone()
+        total_income = income_cents / 100
+        total_expenses = expenses_cents / 100
+        return total_income, total_expenses, total_income + total_expenses
+
+    def _category_totals_cents(self, query):
+        """
+        Returns:
+            dict: Category name to [count, income cents, expense cents] for the given query.
+        """
+        return {
+            category: [count, income_cents, expenses_cents]
+            for category, count, income_cents, expenses_cents in self.connection.execute(query)
+        }
+
+    def running_totals(self):
+        """
+        Returns:
+            tuple: Total income, total expenses, and net balance from the running totals.
+        """
+        return file_manager.totals_from_categories(
+            self._category_totals_cents("SELECT category, count, income_cents, expenses_cents FROM category_totals")
+        )
+
+    def category_totals(self):
+        """
+        Returns:
+            dict: Category name to (income, expenses, net balance) from the running totals.
+        """
+        totals = self._category_totals_cents(
+            "SELECT category, count, income_cents, expenses_cents FROM category_totals"
+        )
+        return {
+            category: file_manager.totals_from_categories({category: entry})
+            for category, entry in totals.items()
+        }
+
+    def recategorize(self, names, new_name):
+        """
+        Moves every transaction of some categories to another one in a single UPDATE.
+
+        The categories are looked up in the running totals, so the rows are found through the category index.
+
+        Parameters:
+            names (iterable of str): The categories to move, matched ignoring case.
+            new_name (str): The category to move them to.
+
+        Returns:
+            int: The number of transactions moved.
+        """
+        lowered = list({name.lower() for name in names})
+        if not lowered:
+            return 0
+        placeholders = ", ".join("?" * len(lowered))
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE transactions SET category = ? WHERE category IN "
+                f"(SELECT category FROM category_totals WHERE lower(category) IN ({placeholders}) AND category != ?)",
+                (new_name, *lowered, new_name),
+            )
+        self.invalidate()
+        return cursor.rowcount
+
+    def category_counts(self):
+        """
+        Returns:
+            dict: Category name to the number of transactions, from the running totals.
+        """
+        return dict(self.connection.execute("SELECT category, count FROM category_totals"))
+
+    def reconcile_totals(self):
+        """
+        Recomputes the running totals from a full scan and stores the result.
+
+        Returns:
+            bool: True if the running totals matched the scan, False if they had to be corrected.
+        """
+        with self.connection:
+            running = self._category_totals_cents(
+                "SELECT category, count, income_cents, expenses_cents FROM category_totals"
+            )
+            scanned = self._category_totals_cents(SCANNED_TOTALS_QUERY)
+            matched = running == scanned
+            if not matched:
+                print("Running totals were out of date and have been corrected.")
+                self.connection.execute("DELETE FROM category_totals")
+                self.connection.execute(
+                    "INSERT INTO category_totals (category, count, income_cents, expenses_cents) "
+                    + SCANNED_TOTALS_QUERY
+                )
+        return matched
+
+def migrate_csv_to_sqlite(csv_path=None, db_path=None):
+    """
+    Copies every transaction from a CSV file into the SQLite database, replacing its contents.
+
+    Parameters:
+        csv_path (str): The CSV file to read, defaults to file_manager.TRANSACTIONS_FILE.
+        db_path (str): The database to write, defaults to DATABASE_FILE.
+
+    Returns:
+        int: The number of transactions migrated.
+    """
+    csv_store = file_manager.TransactionStore(csv_path or file_manager.TRANSACTIONS_FILE)
+    rows = csv_store.load()
+    if csv_store.malformed:
+        print(f"{len(csv_store.malformed)} malformed records can't be migrated and were left in {csv_store.path}")
+
+    db_store = SQLiteTransactionStore(db_path or DATABASE_FILE)
+    try:
+        db_store.rewrite(rows)
+    finally:
+        db_store.close()
+    return len(rows)
+
+def export_sqlite_to_csv(db_path=None, csv_path=None):
+    """
+    Writes every transaction from the SQLite database into a CSV file, replacing its contents.
+
+    Parameters:
+        db_path (str): The database to read, defaults to DATABASE_FILE.
+        csv_path (str): The CSV file to write, defaults to file_manager.TRANSACTIONS_FILE.
+
+    Returns:
+        int: The number of transactions exported.
+    """
+    db_store = SQLiteTransactionStore(db_path or DATABASE_FILE)
+    try:
+        rows = db_store.load()
+    finally:
+        db_store.close()
+
+    csv_store = file_manager.TransactionStore(csv_path or file_manager.TRANSACTIONS_FILE)
+    csv_store.rewrite(rows)
+    return len(rows)
+
+def main(argv):
+    """
+    Command line entry point: `python sqlite_store.py migrate|export [csv_path] [db_path]`.
+
+    Parameters:
+        argv (list of str): The command line arguments, without the program name.
+
+    Returns:
+        int: The exit code.
+    """
+    if not argv or argv[0] not in ('migrate', 'export'):
+        print("Usage: python sqlite_store.py <migrate / export> [csv_path] [db_path]")
+        return 1
+
+    csv_path = argv[1] if len(argv) > 1 else None
+    db_path = argv[2] if len(argv) > 2 else None
+    if argv[0] == 'migrate':
+        count = migrate_csv_to_sqlite(csv_path, db_path)
+        print(f"Migrated {count} transactions into {db_path or DATABASE_FILE}")
+    else:
+        count = export_sqlite_to_csv(db_path, csv_path)
+        print(f"Exported {count} transactions into {csv_path or file_manager.TRANSACTIONS_FILE}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
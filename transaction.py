@@ -0,0 +1,211 @@
+# transaction.py
+
+import math
+import sys
+
+# Interned category names, indexed by category code
+CATEGORY_NAMES = []
+
+# Category name to category code
+_category_codes = {}
+
+def category_code(name):
+    """
+    Returns the code of a category name, registering it on first use.
+
+    Parameters:
+        name (str): The category name.
+
+    Returns:
+        int: The category code, an index into CATEGORY_NAMES.
+    """
+    code = _category_codes.get(name)
+    if code is None:
+        code = len(CATEGORY_NAMES)
+        CATEGORY_NAMES.append(sys.intern(name))
+        _category_codes[CATEGORY_NAMES[code]] = code
+    return code
+
+def to_cents(amount):
+    """
+    Converts an amount into integer cents.
+
+    Parameters:
+        amount (float or str): The amount.
+
+    Returns:
+        int: The amount in cents.
+
+    Raises:
+        ValueError: If the amount isn't a finite number.
+    """
+    value = float(amount)
+    if not math.isfinite(value):
+        raise ValueError(f"Invalid amount: {amount}")
+    return round(value * 100)
+
+def format_cents(cents):
+    """
+    Formats integer cents as an amount with two decimals, without going through a float.
+
+    Parameters:
+        cents (int): The amount in cents.
+
+    Returns:
+        str: The amount, e.g. '-40.00'.
+    """
+    sign = '-' if cents < 0 else ''
+    whole, fraction = divmod(abs(cents), 100)
+    return f"{sign}{whole}.{fraction:02d}"
+
+def parse_date(date_str):
+    """
+    Converts a DD/MM/YYYY date into a sortable YYYYMMDD integer.
+
+    Only the shape of the date is checked, like everywhere else in the application.
+
+    Parameters:
+        date_str (str): The date in DD/MM/YYYY format.
+
+    Returns:
+        int or None: The date as YYYYMMDD, or None if it can't be parsed.
+    """
+    try:
+        day, month, year = map(int, date_str.split('/'))
+    except (AttributeError, ValueError):
+        return None
+    if not (0 <= day <= 99 and 0 <= month <= 99 and 0 <= year <= 9999):
+        return None
+    return year * 10000 + month * 100 + day
+
+def format_date(date_value):
+    """
+    Formats a YYYYMMDD integer as a DD/MM/YYYY date.
+
+    Parameters:
+        date_value (int): The date as YYYYMMDD.
+
+    Returns:
+        str: The date in DD/MM/YYYY format.
+    """
+    year, rest = divmod(date_value, 10000)
+    month, day = divmod(rest, 100)
+    return f"{day:02d}/{month:02d}/{year:04d}"
+
+class Transaction:
+    """
+    A single transaction, parsed once when it is loaded.
+
+    The amount is kept in integer cents, the date as a YYYYMMDD integer and the
+    category as a code into CATEGORY_NAMES, so hot loops never re-parse strings.
+
+    Attributes:
+        id (int): The unique ID.
+        amount_cents (int): The amount in cents (positive for income, negative for expenses).
+        date_value (int): The date as YYYYMMDD.
+        category_code (int): The category, as an index into CATEGORY_NAMES.
+        description (str): Description of the transaction.
+    """
+
+    __slots__ = ('id', 'amount_cents', 'date_value', 'category_code', 'description')
+
+    def __init__(self, id, amount_cents, date_value, category_code, description):
+        self.id = id
+        self.amount_cents = amount_cents
+        self.date_value = date_value
+        self.category_code = category_code
+        self.description = description
+
+    @classmethod
+    def from_values(cls, id, amount, description, date, category):
+        """
+        Creates a transaction from user-facing values.
+
+        Parameters:
+            id (int or str): The unique ID.
+            amount (float or str): The amount.
+            description (str): Description of the transaction.
+            date (str): Date of the transaction in DD/MM/YYYY format.
+            category (str): Category of the transaction.
+
+        Returns:
+            Transaction: The transaction.
+
+        Raises:
+            ValueError: If the ID, amount or date can't be parsed.
+        """
+        date_value = parse_date(date)
+        if date_value is None:
+            raise ValueError(f"Invalid date format: {date}. Expected DD/MM/YYYY.")
+        return cls(int(id), to_cents(amount), date_value, category_code(category), description)
+
+    @classmethod
+    def from_fields(cls, fields):
+        """
+        Creates a transaction from a CSV record in file_manager.FIELDNAMES order.
+
+        Parameters:
+            fields (list of str): Amount, Description, Date, Category and ID.
+
+        Returns:
+            Transaction: The transaction.
+
+        Raises:
+            ValueError: If the record is malformed.
+        """
+        amount, description, date, category, id = fields
+        return cls.from_values(id, amount, description, date, category)
+
+    def to_fields(self):
+        """
+        Returns:
+            list of str: The transaction as a CSV record in file_manager.FIELDNAMES order.
+        """
+        return [self.amount_text, self.description, self.date, self.category, str(self.id)]
+
+    def copy(self):
+        """
+        Returns:
+            Transaction: A copy of the transaction.
+        """
+        return Transaction(self.id, self.amount_cents, self.date_value, self.category_code, self.description)
+
+    @property
+    def amount(self):
+        """
+        float: The amount (positive for income, negative for expenses).
+        """
+        return self.amount_cents / 100
+
+    @property
+    def amount_text(self):
+        """
+        str: The amount with two decimals.
+        """
+        return format_cents(self.amount_cents)
+
+    @property
+    def date(self):
+        """
+        str: The date in DD/MM/YYYY format.
+        """
+        return format_date(self.date_value)
+
+    @property
+    def category(self):
+        """
+        str: The category name.
+        """
+        return CATEGORY_NAMES[self.category_code]
+
+    def __eq__(self, other):
+        if not isinstance(other, Transaction):
+            return NotImplemented
+        return (self.id, self.amount_cents, self.date_value, self.category_code, self.description) == \
+            (other.id, other.amount_cents, other.date_value, other.category_code, other.description)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return (f"Transaction(id={self.id}, amount={self.amount_text}, description={self.description!r}, "
+                f"date={self.date!r}, category={self.category!r})")
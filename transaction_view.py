@@ -0,0 +1,167 @@
+# transaction_view.py
+
+import os
+
+# Number of transactions materialized as Treeview items at a time
+PAGE_SIZE = int(os.getenv('FINANCE_PAGE_SIZE', '500'))
+
+# Columns of the transaction Treeviews
+COLUMNS = ('Amount', 'Description', 'Date', 'Category')
+
+def row_values(txn):
+    """
+    Formats a transaction for a Treeview row, expenses shown as positive amounts.
+
+    Parameters:
+        txn (Transaction): The transaction.
+
+    Returns:
+        tuple of str: The values of the COLUMNS.
+    """
+    return (f"${abs(txn.amount_cents) / 100:.2f}", txn.description, txn.date, txn.category)
+
+def count_rows(rows, count):
+    """
+    Counts transactions to show, only up to a number for the matches of a search still being found.
+
+    Parameters:
+        rows (list or search_index.MatchList): The transactions.
+        count (int): The number of transactions worth counting.
+
+    Returns:
+        tuple: (number of transactions, True if that is all of them).
+    """
+    if isinstance(rows, list):
+        return len(rows), True
+    found = rows.count_at_least(count)
+    return found, found < count or rows.complete
+
+class TransactionView:
+    """
+    Paged Treeview of transactions that is updated by difference.
+
+    Only one page of PAGE_SIZE transactions exists as Treeview items, so the
+    widget cost doesn't grow with the ledger. The matches of a search are only
+    counted up to the page after the one shown. Items are keyed by transaction ID
+    and the values they show are remembered, so setting new rows only inserts,
+    updates, moves and deletes the items of the page that actually changed.
+    """
+
+    def __init__(self, parent, tag):
+        """
+        Parameters:
+            parent (tk.Widget): The widget to place the view in.
+            tag (str): Tag of the Treeview items, e.g. 'income'.
+        """
+        # Imported here so the module's formatting can be used without Tk
+        import tkinter as tk
+        from tkinter import ttk
+
+        self.tag = tag
+        self.rows = []
+        self.page = 0
+        # Number of rows counted so far, and whether that is all of them
+        self.count = 0
+        self.counted_all = True
+        # Item ID to the values it shows, and the item IDs in display order
+        self.items = {}
+        self.order = []
+
+        # Pager below the Treeview, packed first so it keeps its space
+        pager = tk.Frame(parent)
+        pager.pack(side='bottom', fill='x')
+        self.prev_button = tk.Button(pager, text="< Prev", command=lambda: self.show_page(self.page - 1))
+        self.prev_button.pack(side='left')
+        self.page_label = tk.Label(pager, text="", fg="gray")
+        self.page_label.pack(side='left', padx=10)
+        self.next_button = tk.Button(pager, text="Next >", command=lambda: self.show_page(self.page + 1))
+        self.next_button.pack(side='left')
+
+        self.tree = ttk.Treeview(parent, columns=COLUMNS, show='headings', height=10)
+        for col in COLUMNS:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, anchor="center", width=150)
+        self.tree.pack(side='left', fill="both", expand=True)
+
+        scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscroll=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+
+    def page_count(self):
+        """
+        Returns:
+            int: The number of pages, at least 1.
+        """
+        return max(1, -(-self.count // PAGE_SIZE))
+
+    def set_rows(self, rows):
+        """
+        Shows new transactions, staying on the current page if it still exists.
+
+        Parameters:
+            rows (list of Transaction): The transactions, in display order.
+        """
+        self.rows = rows
+        self.show_page(self.page)
+
+    def show_page(self, page):
+        """
+        Shows a page of the transactions.
+
+        Parameters:
+            page (int): The page number, clamped to the existing pages.
+        """
+        # Counting up to the next page tells whether there is one
+        self.count, self.counted_all = count_rows(self.rows, (max(page, 0) + 2) * PAGE_SIZE)
+        self.page = min(max(page, 0), self.page_count() - 1)
+        start = self.page * PAGE_SIZE
+        self._render(self.rows[start:start + PAGE_SIZE])
+
+        end = min(start + PAGE_SIZE, self.count)
+        total = f"{self.count:,}" if self.counted_all else f"{self.count:,}+"
+        if self.count <= PAGE_SIZE and self.counted_all:
+            text = f"{total} transactions"
+        else:
+            text = f"{start + 1:,}-{end:,} of {total} transactions"
+        self.page_label.config(text=text)
+        self.prev_button.config(state='normal' if self.page > 0 else 'disabled')
+        self.next_button.config(state='normal' if self.page < self.page_count() - 1 else 'disabled')
+
+    def _render(self, visible):
+        """
+        Brings the Treeview items in line with the visible transactions, touching only the ones that changed.
+
+        Parameters:
+            visible (list of Transaction): The transactions of the page, in display order.
+        """
+        wanted = {}
+        wanted_order = []
+        for txn in visible:
+            iid = str(txn.id)
+            if iid in wanted:
+                # Duplicate IDs in a hand-edited file still get an item each
+                iid = f"{iid}:{len(wanted_order)}"
+            wanted[iid] = row_values(txn)
+            wanted_order.append(iid)
+
+        stale = [iid for iid in self.order if iid not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+        current = [iid for iid in self.order if iid in wanted]
+
+        for index, iid in enumerate(wanted_order):
+            values = wanted[iid]
+            shown = self.items.get(iid)
+            if shown is None:
+                self.tree.insert('', index, iid=iid, values=values, tags=(self.tag,))
+                current.insert(index, iid)
+                continue
+            if shown != values:
+                self.tree.item(iid, values=values)
+            if index >= len(current) or current[index] != iid:
+                self.tree.move(iid, '', index)
+                current.remove(iid)
+                current.insert(index, iid)
+
+        self.items = wanted
+        self.order = wanted_order
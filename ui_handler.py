@@ -2,10 +2,11 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from ai_handler import translate_natural_language_to_commands
+
+from transaction_view import TransactionView
 
 class FinanceTrackerUI:
-    def __init__(self, root, command_callback, ai_command_callback):
+    def __init__(self, root, command_callback, ai_command_callback, ai_cancel_callback=None, search_callback=None):
         """
         Initializes the UI components.
 
@@ -13,48 +14,50 @@ class FinanceTrackerUI:
             root (tk.Tk): The root window.
             command_callback (function): The function to call when a command is entered via the command line.
             ai_command_callback (function): The function to call when a command is entered via the AI prompt window.
+            ai_cancel_callback (function): The function to call to cancel the pending AI prompts.
+            search_callback (function): The function to call when the search text changes.
         """
         self.root = root
         self.command_callback = command_callback
         self.ai_command_callback = ai_command_callback
+        self.ai_cancel_callback = ai_cancel_callback
+        self.search_callback = search_callback
         self.root.title("Personal Finance Tracker")
-        self.root.geometry("800x650")  # Updated height to 650px
+        self.root.geometry("800x750")  # Updated height to 750px
         self.create_widgets()
 
     def create_widgets(self):
+        # Frame for the search box
+        search_frame = tk.Frame(self.root)
+        search_frame.pack(fill="x", padx=10, pady=(10, 0))
+
+        tk.Label(search_frame, text="Search:").pack(side='left')
+        self.search_text = tk.StringVar()
+        self.search_text.trace_add('write', self.on_search_changed)
+        search_entry = tk.Entry(search_frame, textvariable=self.search_text, width=40)
+        search_entry.pack(side='left', padx=5)
+
+        clear_button = tk.Button(search_frame, text="Clear", command=lambda: self.search_text.set(""))
+        clear_button.pack(side='left', padx=5)
+
+        tk.Label(search_frame, text="e.g. coffee category:food >5 from:01/01/2026",
+                 fg="gray").pack(side='left', padx=5)
+
         # Frame for Income Transactions
         income_frame = tk.LabelFrame(self.root, text="Income Transactions", padx=10, pady=10)
         income_frame.pack(fill="both", expand=True, padx=10, pady=5)
 
-        # Treeview for displaying income transactions
-        income_columns = ('Amount', 'Description', 'Date', 'Category')
-        self.income_tree = ttk.Treeview(income_frame, columns=income_columns, show='headings', height=10)
-        for col in income_columns:
-            self.income_tree.heading(col, text=col)
-            self.income_tree.column(col, anchor="center", width=150)
-        self.income_tree.pack(side='left', fill="both", expand=True)
-
-        # Scrollbar for the Income Treeview
-        income_scrollbar = ttk.Scrollbar(income_frame, orient=tk.VERTICAL, command=self.income_tree.yview)
-        self.income_tree.configure(yscroll=income_scrollbar.set)
-        income_scrollbar.pack(side='right', fill='y')
+        # Paged Treeview for displaying income transactions
+        self.income_view = TransactionView(income_frame, 'income')
+        self.income_tree = self.income_view.tree
 
         # Frame for Expense Transactions
         expense_frame = tk.LabelFrame(self.root, text="Expense Transactions", padx=10, pady=10)
         expense_frame.pack(fill="both", expand=True, padx=10, pady=5)
 
-        # Treeview for displaying expense transactions
-        expense_columns = ('Amount', 'Description', 'Date', 'Category')
-        self.expense_tree = ttk.Treeview(expense_frame, columns=expense_columns, show='headings', height=10)
-        for col in expense_columns:
-            self.expense_tree.heading(col, text=col)
-            self.expense_tree.column(col, anchor="center", width=150)
-        self.expense_tree.pack(side='left', fill="both", expand=True)
-
-        # Scrollbar for the Expense Treeview
-        expense_scrollbar = ttk.Scrollbar(expense_frame, orient=tk.VERTICAL, command=self.expense_tree.yview)
-        self.expense_tree.configure(yscroll=expense_scrollbar.set)
-        expense_scrollbar.pack(side='right', fill='y')
+        # Paged Treeview for displaying expense transactions
+        self.expense_view = TransactionView(expense_frame, 'expense')
+        self.expense_tree = self.expense_view.tree
 
         # Frame for totals
         totals_frame = tk.Frame(self.root)
@@ -83,6 +86,24 @@ class FinanceTrackerUI:
         ai_button = tk.Button(cmd_frame, text="AI Prompt", command=self.open_ai_prompt_window)
         ai_button.pack(side='left', padx=5)
 
+        # Reports Button
+        reports_button = tk.Button(cmd_frame, text="Reports", command=lambda: self.command_callback("report month"))
+        reports_button.pack(side='left', padx=5)
+
+        # Frame for the status of pending AI prompts
+        ai_status_frame = tk.Frame(self.root)
+        ai_status_frame.pack(fill="x", padx=10, pady=(0, 5))
+
+        self.ai_status_label = tk.Label(ai_status_frame, text="AI: idle", fg="gray")
+        self.ai_status_label.pack(side='left')
+
+        self.ai_cancel_button = tk.Button(ai_status_frame, text="Cancel", state=tk.DISABLED,
+                                          command=self.on_cancel_ai)
+        self.ai_cancel_button.pack(side='left', padx=5)
+
+        # Report window, created on first use
+        self.report_window = None
+
     def on_enter_command(self, event):
         """
         Handles the event when the user presses Enter in the command entry.
@@ -100,48 +121,58 @@ class FinanceTrackerUI:
         # Call the command callback with the user input
         self.command_callback(user_input)
 
-    def add_income_transaction(self, amount, description, date, category):
+    def on_search_changed(self, *args):
         """
-        Adds a transaction to the Income Treeview.
+        Handles a change of the search text, showing the first page of the matches.
+        """
+        self.income_view.page = 0
+        self.expense_view.page = 0
+        if self.search_callback:
+            self.search_callback()
 
-        Parameters:
-            amount (float): The amount of the transaction.
-            description (str): Description of the transaction.
-            date (str): Date of the transaction.
-            category (str): Category of the transaction.
+    def get_search_text(self):
+        """
+        Returns:
+            str: The text of the search box.
         """
-        self.income_tree.insert('', tk.END, values=(
-            f"${amount:.2f}",
-            description,
-            date,
-            category
-        ), tags=('income',))
+        return self.search_text.get()
 
-    def add_expense_transaction(self, amount, description, date, category):
+    def on_cancel_ai(self):
         """
-        Adds a transaction to the Expense Treeview.
+        Handles the event when the user presses the Cancel button of the AI status.
+        """
+        if self.ai_cancel_callback:
+            self.ai_cancel_callback()
+
+    def set_ai_status(self, in_flight, queued):
+        """
+        Updates the AI status line.
 
         Parameters:
-            amount (float): The amount of the transaction (positive value).
-            description (str): Description of the transaction.
-            date (str): Date of the transaction.
-            category (str): Category of the transaction.
+            in_flight (int): Number of prompts currently being translated.
+            queued (int): Number of prompts waiting for their turn.
         """
-        self.expense_tree.insert('', tk.END, values=(
-            f"${amount:.2f}",
-            description,
-            date,
-            category
-        ), tags=('expense',))
+        if not in_flight and not queued:
+            self.ai_status_label.config(text="AI: idle", fg="gray")
+            self.ai_cancel_button.config(state=tk.DISABLED)
+            return
 
-    def clear_transactions(self):
+        text = "AI: translating prompt..."
+        if queued:
+            text += f" ({queued} more queued)"
+        self.ai_status_label.config(text=text, fg="black")
+        self.ai_cancel_button.config(state=tk.NORMAL)
+
+    def show_transactions(self, income, expenses):
         """
-        Clears all transactions from both Treeviews.
+        Shows the transactions in the Treeviews, updating only the rows that changed.
+
+        Parameters:
+            income (list of Transaction): The income transactions, in display order.
+            expenses (list of Transaction): The expense transactions, in display order.
         """
-        for item in self.income_tree.get_children():
-            self.income_tree.delete(item)
-        for item in self.expense_tree.get_children():
-            self.expense_tree.delete(item)
+        self.income_view.set_rows(income)
+        self.expense_view.set_rows(expenses)
 
     def update_totals(self, total_income, total_expenses, net_balance):
         """
@@ -176,6 +207,44 @@ class FinanceTrackerUI:
         """
         messagebox.showerror(title, message)
 
+    def show_report(self, title, headings, rows):
+        """
+        Shows a report in the report window, opening it if needed.
+
+        Parameters:
+            title (str): The title of the report.
+            headings (tuple of str): The column headings.
+            rows (list of tuple): The report rows.
+        """
+        if self.report_window is None or not self.report_window.winfo_exists():
+            self.report_window = tk.Toplevel(self.root)
+            self.report_window.geometry("700x400")
+
+            buttons_frame = tk.Frame(self.report_window)
+            buttons_frame.pack(fill="x", padx=10, pady=5)
+            tk.Button(buttons_frame, text="By Month",
+                      command=lambda: self.command_callback("report month")).pack(side='left', padx=5)
+            tk.Button(buttons_frame, text="By Category",
+                      command=lambda: self.command_callback("report category")).pack(side='left', padx=5)
+
+            report_frame = tk.Frame(self.report_window)
+            report_frame.pack(fill="both", expand=True, padx=10, pady=5)
+            self.report_tree = ttk.Treeview(report_frame, show='headings')
+            self.report_tree.pack(side='left', fill="both", expand=True)
+            report_scrollbar = ttk.Scrollbar(report_frame, orient=tk.VERTICAL, command=self.report_tree.yview)
+            self.report_tree.configure(yscroll=report_scrollbar.set)
+            report_scrollbar.pack(side='right', fill='y')
+
+        self.report_window.title(title)
+        self.report_tree.delete(*self.report_tree.get_children())
+        self.report_tree.configure(columns=headings)
+        for col in headings:
+            self.report_tree.heading(col, text=col)
+            self.report_tree.column(col, anchor="center", width=110)
+        for row in rows:
+            self.report_tree.insert('', tk.END, values=row)
+        self.report_window.lift()
+
     def open_ai_prompt_window(self):
         """
         Opens a new window for entering natural language prompts.
@@ -189,8 +258,16 @@ class FinanceTrackerUI:
         self.prompt_text = tk.Text(prompt_window, wrap='word', height=10, width=60)
         self.prompt_text.pack(padx=10, pady=5)
 
-        submit_button = tk.Button(prompt_window, text="Submit", command=self.submit_ai_prompt)
-        submit_button.pack(pady=10)
+        options_frame = tk.Frame(prompt_window)
+        options_frame.pack(pady=10)
+
+        # Batch mode translates every few lines separately and concurrently, for pasted statements
+        self.batch_mode = tk.BooleanVar(value=False)
+        batch_check = tk.Checkbutton(options_frame, text="Batch mode (one entry per line)", variable=self.batch_mode)
+        batch_check.pack(side='left', padx=5)
+
+        submit_button = tk.Button(options_frame, text="Submit", command=self.submit_ai_prompt)
+        submit_button.pack(side='left', padx=5)
 
     def submit_ai_prompt(self):
         """
@@ -201,8 +278,8 @@ class FinanceTrackerUI:
             self.display_error("Input Error", "Please enter a prompt.")
             return
 
-        # Disable the submit button to prevent multiple submissions
-        # (Optional: Implement loading indicators)
+        # The prompt is translated in the background, so clear the box to allow queueing another one
+        self.prompt_text.delete("1.0", tk.END)
 
         # Call the AI command callback with the user input
-        self.ai_command_callback(user_input)
+        self.ai_command_callback(user_input, self.batch_mode.get())